@@ -0,0 +1,264 @@
+import itertools
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from indicators_batch import _pack, to_wide
+from tracing import traced
+
+# Сетки параметров по умолчанию: для каждого параметра — список значений
+RSI_GRID = {'period': [7, 14, 21, 28], 'lower': [20, 30], 'upper': [70, 80]}
+MACD_GRID = {'fast_period': [8, 12, 16], 'slow_period': [21, 26, 34], 'signal_period': [5, 9, 13]}
+
+METRICS = ['total_return_percent', 'sharpe', 'max_drawdown_percent', 'trades', 'exposure']
+
+# Наибольшее число тикеров в блоке: промежуточные массивы блока (EMA, MACD всех пар) занимают
+# порядка сотни массивов время × тикеры
+BLOCK_TICKERS = 256
+
+
+def expand_grid(grid):
+    """
+    Перечисляет все сочетания значений параметров.
+
+    Параметры:
+        grid (dict): Словарь {параметр: список значений}.
+
+    Возвращает:
+        list: Список словарей {параметр: значение}.
+    """
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def _rolling_means(values, periods):
+    """
+    Скользящие средние по строкам для нескольких окон из одной накопленной суммы.
+
+    Возвращает:
+        dict: {окно: массив той же формы, что и values}; строки без полного окна равны NaN.
+    """
+    cumulative = np.zeros((len(values) + 1, values.shape[1]))
+    np.cumsum(np.nan_to_num(values), axis=0, out=cumulative[1:])
+    counts = np.zeros_like(cumulative)
+    np.cumsum(~np.isnan(values), axis=0, out=counts[1:])
+    means = {}
+    for period in periods:
+        mean = np.full(values.shape, np.nan)
+        window_sum = cumulative[period:] - cumulative[:-period]
+        full = counts[period:] - counts[:-period] == period  # Окно без NaN, как rolling(window=period)
+        mean[period - 1:] = np.where(full, window_sum / period, np.nan)
+        means[period] = mean
+    return means
+
+
+def _rsi_by_period(close, periods):
+    # Те же формулы, что и в data_download.add_rsi; средние для всех периодов — из одних накопленных сумм
+    delta = np.vstack([np.full((1, close.shape[1]), np.nan), np.diff(close, axis=0)])
+    average_up = _rolling_means(np.clip(delta, 0, None), periods)
+    average_down = _rolling_means(-1 * np.clip(delta, None, 0), periods)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {period: 100 - (100 / (1 + average_up[period] / average_down[period])) for period in periods}
+
+
+def _ema(values, span):
+    # Как в data_download.add_macd: ewm(span, adjust=False) для всех столбцов сразу
+    return pd.DataFrame(values).ewm(span=span, adjust=False).mean().to_numpy()
+
+
+def _evaluate(position, returns, valid, cost, periods_per_year):
+    """
+    Рассчитывает показатели стратегии long/flat для всех тикеров.
+
+    Позиция, выбранная по цене закрытия бара, удерживается в течение следующего бара. Комиссия cost
+    (доля от суммы сделки) списывается при каждом входе и выходе.
+
+    Возвращает:
+        dict: {показатель: массив по тикерам}.
+    """
+    held = np.zeros_like(position)
+    held[1:] = position[:-1]
+    held *= valid
+    changes = np.diff(held, axis=0, prepend=0) * valid
+    strategy = held * returns - cost * np.abs(changes)
+
+    equity = np.cumprod(1 + strategy, axis=0)
+    drawdown = 1 - equity / np.maximum.accumulate(equity, axis=0)
+
+    n = valid.sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = strategy.sum(axis=0) / n
+        std = np.sqrt((((strategy - mean) * valid) ** 2).sum(axis=0) / (n - 1))
+        sharpe = np.where(std > 0, mean / std * math.sqrt(periods_per_year), np.nan)
+        exposure = held.sum(axis=0) / n
+    return {
+        'total_return_percent': (equity[-1] - 1) * 100,
+        'sharpe': sharpe,
+        'max_drawdown_percent': drawdown.max(axis=0) * 100,
+        'trades': (changes > 0).sum(axis=0),
+        'exposure': exposure,
+    }
+
+
+def _backtest_block(close, rsi_points, macd_points, cost, periods_per_year):
+    """
+    Рассчитывает показатели всех точек сеток для блока тикеров.
+
+    Параметры:
+        close: Массив цен закрытия время × тикеры, в котором пропущенные бары сдвинуты в конец столбца
+            (см. indicators_batch._pack), поэтому бары каждого тикера идут подряд.
+
+    Возвращает:
+        dict: {'rsi': {показатель: массив точки сетки × тикеры}, 'macd': {...}}.
+    """
+    has_close = ~np.isnan(close)
+    valid = np.zeros_like(close)
+    valid[1:] = has_close[1:] & has_close[:-1]  # Доходность есть у бара, если есть и предыдущий бар
+    with np.errstate(invalid='ignore'):
+        returns = np.nan_to_num(np.vstack([np.zeros((1, close.shape[1])), close[1:] / close[:-1] - 1]))
+
+    results = {}
+    if rsi_points:
+        rsi = _rsi_by_period(close, sorted({point['period'] for point in rsi_points}))
+        rows = []
+        for point in rsi_points:
+            values = rsi[point['period']]
+            # Вход при перепроданности, выход при перекупленности; между ними позиция сохраняется
+            state = np.where(values < point['lower'], 1.0, np.where(values > point['upper'], 0.0, np.nan))
+            position = pd.DataFrame(state).ffill().fillna(0).to_numpy()
+            rows.append(_evaluate(position, returns, valid, cost, periods_per_year))
+        results['rsi'] = {metric: np.stack([row[metric] for row in rows]) for metric in METRICS}
+
+    if macd_points:
+        spans = sorted({point['fast_period'] for point in macd_points}
+                       | {point['slow_period'] for point in macd_points})
+        ema = {span: _ema(close, span) for span in spans}
+        pairs = sorted({(point['fast_period'], point['slow_period']) for point in macd_points})
+        # MACD всех пар рядом по столбцам, чтобы сигнальную линию каждого периода считать одним вызовом ewm
+        macd = np.hstack([ema[fast] - ema[slow] for fast, slow in pairs])
+        signals = {span: _ema(macd, span) for span in sorted({point['signal_period'] for point in macd_points})}
+        width = close.shape[1]
+        rows = []
+        for point in macd_points:
+            pair = pairs.index((point['fast_period'], point['slow_period']))
+            columns = slice(pair * width, (pair + 1) * width)
+            position = (macd[:, columns] > signals[point['signal_period']][:, columns]).astype(np.float64)
+            rows.append(_evaluate(position, returns, valid, cost, periods_per_year))
+        results['macd'] = {metric: np.stack([row[metric] for row in rows]) for metric in METRICS}
+    return results
+
+
+def _backtest_shared(task):
+    """
+    Рассчитывает блок тикеров в процессе пула, читая цены из общей памяти.
+    """
+    name, shape, start, stop, rsi_points, macd_points, cost, periods_per_year = task
+    memory = shared_memory.SharedMemory(name=name)
+    try:
+        prices = np.ndarray(shape, dtype=np.float64, buffer=memory.buf)
+        close = np.array(prices[:, start:stop])  # Копия только своего блока тикеров
+    finally:
+        memory.close()
+    return _backtest_block(close, rsi_points, macd_points, cost, periods_per_year)
+
+
+def _table(points, tickers, metrics):
+    n_points, n_tickers = len(points), len(tickers)
+    table = pd.DataFrame({name: np.repeat([point[name] for point in points], n_tickers) for name in points[0]})
+    table['ticker'] = pd.Categorical(np.tile(np.asarray(tickers, dtype=object), n_points), categories=tickers)
+    for metric in METRICS:
+        table[metric] = metrics[metric].reshape(-1)
+    return table
+
+
+@traced()
+def sweep(prices, rsi_grid=None, macd_grid=None, cost=0.0, periods_per_year=252, workers=1):
+    """
+    Бэктест стратегий RSI и MACD для всех сочетаний параметров и всех тикеров.
+
+    Стратегия RSI покупает, когда RSI опускается ниже lower, и закрывает позицию, когда RSI поднимается
+    выше upper. Стратегия MACD держит позицию, пока MACD выше сигнальной линии. Сигнал бара исполняется
+    по цене закрытия, позиция удерживается со следующего бара. Сочетания MACD с fast_period >= slow_period
+    пропускаются. MACD совпадает с add_macd до бита, RSI — с add_rsi с точностью до округления.
+
+    Индикаторы для всей сетки считаются пакетно с общими промежуточными результатами: скользящие средние
+    роста и падения цены для любого периода RSI получаются из одних накопленных сумм, EMA каждого периода
+    считается один раз для всех пар MACD, а сигнальные линии всех пар — одним вызовом ewm. С workers > 1
+    тикеры распределяются по пулу процессов, цены передаются через общую память
+    (multiprocessing.shared_memory), а не копиями DataFrame.
+
+    Параметры:
+        prices: Широкий DataFrame цен закрытия (строки — время, столбцы — тикеры; NaN — нет бара)
+            или словарь {тикер: DataFrame}.
+        rsi_grid (dict, optional): Значения параметров period, lower и upper (по умолчанию RSI_GRID;
+            пустой словарь — не проверять стратегию RSI).
+        macd_grid (dict, optional): Значения параметров fast_period, slow_period и signal_period
+            (по умолчанию MACD_GRID; пустой словарь — не проверять стратегию MACD).
+        cost (float, optional): Комиссия за вход и за выход в долях от суммы сделки (по умолчанию 0).
+        periods_per_year (int, optional): Число баров в году для годового коэффициента Шарпа (по умолчанию 252).
+        workers (int, optional): Число процессов (по умолчанию 1 — расчет в текущем процессе).
+
+    Возвращает:
+        dict: {'rsi': DataFrame, 'macd': DataFrame}. Строка таблицы — точка сетки и тикер: столбцы
+        параметров, ticker, total_return_percent, sharpe, max_drawdown_percent, trades и exposure
+        (доля баров в позиции).
+    """
+    if isinstance(prices, dict):
+        prices = to_wide(prices)
+    rsi_points = expand_grid(RSI_GRID if rsi_grid is None else rsi_grid) if rsi_grid != {} else []
+    macd_points = [point for point in (expand_grid(MACD_GRID if macd_grid is None else macd_grid)
+                                       if macd_grid != {} else [])
+                   if point['fast_period'] < point['slow_period']]
+    tickers = list(prices.columns)
+    # Бары каждого тикера сдвигаются к началу столбца: пропуски не разрывают EMA и окна
+    close, _, _ = _pack(prices.sort_index().to_numpy(dtype=np.float64))
+
+    workers = max(1, min(int(workers or os.cpu_count() or 1), len(tickers) or 1))
+    # Хотя бы по два блока на процесс
+    n_blocks = max(workers * 2 if workers > 1 else 1, math.ceil(len(tickers) / BLOCK_TICKERS))
+    bounds = np.linspace(0, len(tickers), n_blocks + 1, dtype=int)
+    blocks = [(start, stop) for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+    if workers == 1:
+        blocks = [_backtest_block(close[:, start:stop], rsi_points, macd_points, cost, periods_per_year)
+                  for start, stop in blocks]
+    else:
+        memory = shared_memory.SharedMemory(create=True, size=max(1, close.nbytes))
+        try:
+            np.ndarray(close.shape, dtype=np.float64, buffer=memory.buf)[:] = close
+            tasks = [(memory.name, close.shape, start, stop, rsi_points, macd_points, cost, periods_per_year)
+                     for start, stop in blocks]
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                blocks = list(pool.map(_backtest_shared, tasks))
+        finally:
+            memory.close()
+            memory.unlink()
+
+    results = {}
+    for strategy, points in (('rsi', rsi_points), ('macd', macd_points)):
+        if points:
+            metrics = {metric: np.hstack([block[strategy][metric] for block in blocks]) for metric in METRICS}
+            results[strategy] = _table(points, tickers, metrics)
+    return results
+
+
+def best_parameters(table, metric='sharpe'):
+    """
+    Выбирает для каждого тикера точку сетки с наибольшим значением показателя.
+
+    Параметры:
+        table: Таблица результатов sweep для одной стратегии.
+        metric (str, optional): Показатель для выбора (по умолчанию 'sharpe'; для max_drawdown_percent
+            выбирается наименьшее значение).
+
+    Возвращает:
+        data: DataFrame с одной строкой на тикер, для которого показатель определен.
+    """
+    values = table[metric].dropna()  # Тикеры, у которых показатель не определен ни для одной точки, пропускаются
+    if metric == 'max_drawdown_percent':
+        values = -values
+    best = values.groupby(table.loc[values.index, 'ticker'], observed=True).idxmax()
+    return table.loc[best].reset_index(drop=True)
@@ -0,0 +1,152 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import data_download as dd
+import data_providers
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты запросов по алгоритму «ведро с токенами».
+
+    Параметры:
+        rate (float): Сколько запросов в секунду разрешено в среднем.
+        capacity (int, optional): Сколько запросов можно выполнить подряд без ожидания (по умолчанию равно rate).
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Забирает один токен, при необходимости ожидая его появления.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class RateLimitedProvider(data_providers.DataProvider):
+    """
+    Поставщик, ограничивающий частоту обращений к другому поставщику. Чтение из локального хранилища
+    поставщика не вызывает, поэтому ограничение действует только на настоящие запросы.
+
+    Параметры:
+        provider (DataProvider): Поставщик, к которому передаются запросы.
+        limiter (TokenBucket): Ограничитель частоты запросов.
+    """
+
+    def __init__(self, provider, limiter):
+        self.provider = provider
+        self.limiter = limiter
+
+    def history(self, ticker, period=None, start=None, end=None, interval='1d'):
+        self.limiter.acquire()
+        return self.provider.history(ticker, period=period, start=start, end=end, interval=interval)
+
+
+def _fetch_with_retries(ticker, retries, backoff, fetch_kwargs):
+    """
+    Загружает данные одного тикера, повторяя запрос с экспоненциальной задержкой при ошибках.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return dd.fetch_stock_data(ticker, **fetch_kwargs)
+        except Exception:
+            if attempt == retries:
+                raise
+            # Задержка растет как backoff * 2^attempt, случайная добавка разводит повторы разных потоков
+            time.sleep(backoff * 2 ** attempt * (1 + random.random() * 0.1))
+
+
+def fetch_many(tickers, period=None, start_date=None, end_date=None, max_workers=8, rate=5.0, burst=None,
+               retries=3, backoff=0.5, use_cache=True, provider=None, store=None, interval='1d', compact=False):
+    """
+    Параллельно загружает данные о ценах акций для списка тикеров.
+
+    Запросы выполняются в пуле потоков ограниченного размера, частота обращений к поставщику
+    ограничивается TokenBucket (данные из локального хранилища читаются без ожидания), а ошибочные запросы
+    повторяются с экспоненциальной задержкой.
+
+    Параметры:
+        tickers (list): Список тикеров (например, ['AAPL', 'MSFT']).
+        period (str, optional): Период для данных (по умолчанию '1mo' для одного месяца).
+        start_date (str, optional): Начальная дата в формате 'ГГГГ-ММ-ДД'.
+        end_date (str, optional): Дата окончания в формате 'ГГГГ-ММ-ДД'.
+        max_workers (int, optional): Число потоков загрузки (по умолчанию 8).
+        rate (float, optional): Допустимое число запросов в секунду или None без ограничения (по умолчанию 5).
+        burst (int, optional): Сколько запросов можно выполнить подряд без ожидания (по умолчанию равно rate).
+        retries (int, optional): Число повторных попыток при ошибке (по умолчанию 3).
+        backoff (float, optional): Начальная задержка перед повтором в секундах (по умолчанию 0.5).
+        use_cache (bool, optional): Использовать ли локальное хранилище котировок (по умолчанию True).
+        provider (DataProvider, optional): Поставщик данных.
+        store (OHLCVStore, optional): Хранилище котировок.
+        interval (str, optional): Интервал баров: '1d' или внутридневной ('1m', '5m', '1h', ...) (по умолчанию '1d').
+        compact (bool, optional): Вернуть данные в компактном представлении (см. intraday.to_compact)
+            (по умолчанию False).
+
+    Возвращает:
+        tuple: (results, errors), где results — словарь {тикер: DataFrame}, а errors — словарь
+        {тикер: текст ошибки} для тикеров, которые не удалось загрузить.
+    """
+    if rate:
+        provider = RateLimitedProvider(provider or data_providers.get_default_provider(), TokenBucket(rate, burst))
+    fetch_kwargs = {'period': period, 'start_date': start_date, 'end_date': end_date,
+                    'use_cache': use_cache, 'provider': provider, 'store': store, 'interval': interval,
+                    'compact': compact}
+    unique_tickers = list(dict.fromkeys(tickers))  # Убираем повторы, сохраняя порядок
+
+    results = {}
+    errors = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {ticker: executor.submit(_fetch_with_retries, ticker, retries, backoff, fetch_kwargs)
+                   for ticker in unique_tickers}
+        for ticker, future in futures.items():
+            try:
+                data = future.result()
+            except Exception as e:
+                errors[ticker] = f"{type(e).__name__}: {e}"
+                continue
+            if data.empty:
+                errors[ticker] = "Не удалось получить данные для указанных параметров."
+            else:
+                results[ticker] = data
+
+    return results, errors
+
+
+def to_long_format(results, compact=False):
+    """
+    Объединяет словарь {тикер: DataFrame} в один DataFrame в длинном формате со столбцом 'Ticker'.
+
+    Параметры:
+        results (dict): Результат fetch_many.
+        compact (bool, optional): Вернуть данные в компактном представлении: цены float32, целочисленный
+            объем и категориальный столбец 'Ticker' (по умолчанию False).
+
+    Возвращает:
+        data: DataFrame с данными всех тикеров.
+    """
+    if not results:
+        return pd.DataFrame()
+    frames = [data.assign(Ticker=ticker) for ticker, data in results.items()]
+    data = pd.concat(frames)
+    if compact:
+        from intraday import to_compact
+        data = to_compact(data)
+    return data
@@ -0,0 +1,72 @@
+"""
+Бенчмарк backtest.sweep против перебора параметров повторными вызовами add_rsi и add_macd для каждого тикера.
+
+Запуск из корня проекта: python -m benchmarks.bench_backtest --rows 2500 --tickers 100 --workers 4
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import backtest
+import data_download as dd
+from benchmarks.synthetic import random_walk_close
+
+
+def loop_per_combination(wide, rsi_points, macd_points):
+    """
+    Перебирает параметры существующими функциями: для каждого тикера и сочетания параметров
+    индикатор рассчитывается заново. Возвращает позиции стратегий {(стратегия, номер точки, тикер): позиция}.
+    """
+    positions = {}
+    for ticker in wide.columns:
+        data = pd.DataFrame({'Close': wide[ticker].dropna()})
+        for number, point in enumerate(rsi_points):
+            rsi = dd.add_rsi(data.copy(), period=point['period'])['RSI']
+            state = np.where(rsi < point['lower'], 1.0, np.where(rsi > point['upper'], 0.0, np.nan))
+            positions['rsi', number, ticker] = pd.Series(state).ffill().fillna(0).to_numpy()
+        for number, point in enumerate(macd_points):
+            macd = dd.add_macd(data.copy(), point['fast_period'], point['slow_period'], point['signal_period'])
+            positions['macd', number, ticker] = (macd['MACD'] > macd['Signal']).to_numpy(dtype=np.float64)
+    return positions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк перебора параметров стратегий")
+    parser.add_argument('--rows', type=int, default=2500, help="Число баров")
+    parser.add_argument('--tickers', type=int, default=100, help="Число тикеров")
+    parser.add_argument('--workers', type=int, default=4, help="Число процессов для sweep")
+    args = parser.parse_args()
+
+    wide = random_walk_close(args.rows, args.tickers)
+    rsi_points = backtest.expand_grid(backtest.RSI_GRID)
+    macd_points = [point for point in backtest.expand_grid(backtest.MACD_GRID)
+                   if point['fast_period'] < point['slow_period']]
+
+    start = time.perf_counter()
+    loop_per_combination(wide, rsi_points, macd_points)
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    single = backtest.sweep(wide)
+    single_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pooled = backtest.sweep(wide, workers=args.workers)
+    pooled_time = time.perf_counter() - start
+
+    for strategy in single:
+        pd.testing.assert_frame_equal(single[strategy], pooled[strategy])
+
+    points = len(rsi_points) + len(macd_points)
+    print(f"Баров: {args.rows}, тикеров: {args.tickers}, точек сетки: {points}")
+    print(f"Цикл add_rsi/add_macd (только индикаторы): {loop_time:8.3f} с")
+    print(f"sweep, 1 процесс:                          {single_time:8.3f} с  (x{loop_time / single_time:.1f})")
+    print(f"sweep, {args.workers} процесса(ов):                    {pooled_time:8.3f} с  "
+          f"(x{loop_time / pooled_time:.1f})")
+    print("Результаты пула совпадают с расчетом в одном процессе.")
+
+
+if __name__ == '__main__':
+    main()
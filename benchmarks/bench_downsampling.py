@@ -0,0 +1,70 @@
+"""
+Бенчмарк прореживания графиков: размер HTML-файлов и время построения PNG и HTML в зависимости от длины ряда
+для трех отдельных HTML-файлов, одного файла с подграфиками и прореживания методами LTTB и минимум/максимум.
+
+Запуск из корня проекта: python -m benchmarks.bench_downsampling --rows 1000 10000 100000 --max-points 2000
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import matplotlib
+
+matplotlib.use('Agg')
+
+import data_download as dd  # noqa: E402
+import data_plotting  # noqa: E402
+import downsampling  # noqa: E402
+from benchmarks.synthetic import random_walk_ohlcv  # noqa: E402
+
+
+def _render(data, directory, **kwargs):
+    """
+    Строит графики и возвращает (время, суммарный размер файлов в байтах).
+    """
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        files = data_plotting.create_and_save_plot(data, 'BENCH', period='bench', show=False, output_dir=directory,
+                                                   **kwargs)
+    elapsed = time.perf_counter() - start
+    return elapsed, sum(os.path.getsize(name) for name in files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк прореживания графиков")
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000, 10_000, 100_000], help="Длина ряда")
+    parser.add_argument('--max-points', type=int, default=2000, help="Наибольшее число точек на линии")
+    args = parser.parse_args()
+
+    variants = [
+        ('html: 3 файла', {'formats': ('html',)}),
+        ('html: 1 файл', {'formats': ('html',), 'html_layout': 'combined'}),
+        ('html: 1 файл + lttb', {'formats': ('html',), 'html_layout': 'combined', 'max_points': args.max_points}),
+        ('html: 1 файл + minmax', {'formats': ('html',), 'html_layout': 'combined', 'max_points': args.max_points,
+                                   'downsample_method': 'minmax'}),
+        ('png', {'formats': ('png',)}),
+        ('png + lttb', {'formats': ('png',), 'max_points': args.max_points}),
+        ('png + minmax', {'formats': ('png',), 'max_points': args.max_points, 'downsample_method': 'minmax'}),
+    ]
+
+    print(f"{'строк':>10} {'вариант':>24} {'время, с':>9} {'размер, МБ':>11}")
+    for rows in args.rows:
+        data = random_walk_ohlcv(rows, freq='min')
+        data = dd.add_macd(dd.add_rsi(dd.add_moving_average(data)))
+        for method in downsampling.METHODS:
+            start = time.perf_counter()
+            sampled = downsampling.downsample(data, args.max_points, method=method)
+            print(f"{rows:>10} {'прореживание ' + method:>24} {time.perf_counter() - start:>9.3f} "
+                  f"{len(sampled):>8} строк")
+        with tempfile.TemporaryDirectory() as directory:
+            for name, kwargs in variants:
+                elapsed, size = _render(data, directory, **kwargs)
+                print(f"{rows:>10} {name:>24} {elapsed:>9.3f} {size / 2 ** 20:>11.2f}")
+        data_plotting.clear_figure_templates()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Бенчмарк экспорта: время записи и чтения и размер файла для CSV (export_data_to_csv), Parquet и Feather.
+
+Запуск из корня проекта: python -m benchmarks.bench_export --rows 100000 1000000
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import data_download as dd
+import data_export
+from benchmarks.synthetic import random_walk_ohlcv
+
+
+def _timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # Функции экспорта печатают сообщения о сохранении
+        result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def _size(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+    return os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк форматов экспорта")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000], help="Число строк")
+    args = parser.parse_args()
+
+    print(f"{'строк':>10} {'формат':>22} {'запись, с':>10} {'чтение, с':>10} {'Close+даты, с':>14} {'размер, МБ':>11}")
+    for rows in args.rows:
+        data = random_walk_ohlcv(rows, freq='min')
+        data = dd.add_macd(dd.add_rsi(dd.add_moving_average(data)))
+        last_month = data.index[-1] - data.index.freq * (rows // 12)
+        with tempfile.TemporaryDirectory() as directory:
+            variants = [
+                ('csv (export_data_to_csv)', 'data.csv', None),
+                ('parquet zstd', 'data.parquet', 'zstd'),
+                ('parquet snappy', 'data_snappy.parquet', 'snappy'),
+                ('feather zstd', 'data.feather', 'zstd'),
+                ('feather uncompressed', 'data_raw.feather', 'uncompressed'),
+            ]
+            for name, filename, compression in variants:
+                path = os.path.join(directory, filename)
+                if compression is None:
+                    _, write_time = _timed(dd.export_data_to_csv, data, path)
+                else:
+                    _, write_time = _timed(data_export.export_data, data, path, compression=compression)
+                _, read_time = _timed(data_export.load_exported_data, path)
+                _, subset_time = _timed(data_export.load_exported_data, path, columns=['Close'],
+                                        start_date=last_month.strftime('%Y-%m-%d'))
+                print(f"{rows:>10} {name:>22} {write_time:>10.3f} {read_time:>10.3f} {subset_time:>14.3f} "
+                      f"{_size(path) / 2 ** 20:>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
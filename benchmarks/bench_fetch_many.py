@@ -0,0 +1,55 @@
+"""
+Бенчмарк fetch_many против последовательных вызовов fetch_stock_data.
+
+Используется FakeProvider с искусственной задержкой, поэтому сеть не нужна.
+Запуск из корня проекта: python -m benchmarks.bench_fetch_many --tickers 200 --latency 0.05
+"""
+import argparse
+import tempfile
+import time
+
+import batch_download
+import data_cache
+import data_download as dd
+import data_providers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк параллельной загрузки тикеров")
+    parser.add_argument('--tickers', type=int, default=100, help="Число тикеров")
+    parser.add_argument('--latency', type=float, default=0.05, help="Задержка одного запроса в секундах")
+    parser.add_argument('--workers', type=int, default=16, help="Число потоков fetch_many")
+    parser.add_argument('--rate', type=float, default=200.0, help="Лимит запросов в секунду")
+    args = parser.parse_args()
+
+    tickers = [f"T{i:04d}" for i in range(args.tickers)]
+    provider = data_providers.FakeProvider(latency=args.latency)
+
+    start = time.perf_counter()
+    for ticker in tickers:
+        dd.fetch_stock_data(ticker, period='1y', use_cache=False, provider=provider)
+    sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results, errors = batch_download.fetch_many(tickers, period='1y', max_workers=args.workers, rate=args.rate,
+                                                use_cache=False, provider=provider)
+    concurrent = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        store = data_cache.OHLCVStore(cache_dir)
+        batch_download.fetch_many(tickers, period='1y', max_workers=args.workers, rate=args.rate,
+                                  provider=provider, store=store)
+        start = time.perf_counter()
+        batch_download.fetch_many(tickers, period='1y', max_workers=args.workers, rate=args.rate,
+                                  provider=provider, store=store)
+        cached = time.perf_counter() - start
+
+    print(f"Тикеров: {args.tickers}, задержка запроса: {args.latency} с")
+    print(f"Последовательно:          {sequential:8.3f} с")
+    print(f"fetch_many ({args.workers} потоков): {concurrent:8.3f} с  (x{sequential / concurrent:.1f})")
+    print(f"fetch_many из кэша:       {cached:8.3f} с")
+    print(f"Загружено: {len(results)}, ошибок: {len(errors)}")
+
+
+if __name__ == '__main__':
+    main()
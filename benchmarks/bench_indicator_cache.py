@@ -0,0 +1,85 @@
+"""
+Бенчмарк indicator_cache.IndicatorCache против add_moving_average, add_rsi и add_macd на копии данных:
+полный расчет, попадание в память и на диск, а также поток новых баров, при котором кэш продлевает ряд.
+
+Запуск из корня проекта: python -m benchmarks.bench_indicator_cache --rows 10000 --updates 50
+"""
+import argparse
+import tempfile
+import time
+
+import pandas as pd
+
+import data_download as dd
+from benchmarks.synthetic import random_walk_ohlcv
+from indicator_cache import IndicatorCache
+
+
+def with_indicators(data):
+    return dd.add_macd(dd.add_rsi(dd.add_moving_average(data.copy())))
+
+
+def timed(function, repeat):
+    """
+    Возвращает лучшее время из repeat запусков.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк кэша индикаторов")
+    parser.add_argument('--rows', type=int, default=10_000, help="Число баров истории")
+    parser.add_argument('--updates', type=int, default=50, help="Сколько раз к ряду добавляются новые бары")
+    parser.add_argument('--new-bars', type=int, default=1, help="Число баров в одном обновлении")
+    parser.add_argument('--repeat', type=int, default=5, help="Число повторов (берется лучшее время)")
+    args = parser.parse_args()
+
+    data = random_walk_ohlcv(args.rows + args.updates * args.new_bars, freq='min')
+    history = data.iloc[:args.rows]
+    before = history.copy()
+
+    plain_time = timed(lambda: with_indicators(history), args.repeat)
+    cache = IndicatorCache()
+    start = time.perf_counter()
+    cache.indicators(history)
+    miss_time = time.perf_counter() - start
+    hit_time = timed(lambda: cache.indicators(history), args.repeat)
+
+    with tempfile.TemporaryDirectory() as directory:
+        IndicatorCache(cache_dir=directory).indicators(history)
+        disk_time = timed(lambda: IndicatorCache(cache_dir=directory).indicators(history), args.repeat)
+
+    # Поток новых баров: add_* пересчитывают ряд целиком, кэш досчитывает только новые бары
+    lengths = [args.rows + step * args.new_bars for step in range(1, args.updates + 1)]
+    start = time.perf_counter()
+    for length in lengths:
+        expected = with_indicators(data.iloc[:length])
+    plain_stream_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for length in lengths:
+        result = cache.indicators(data.iloc[:length])
+    cache_stream_time = time.perf_counter() - start
+
+    pd.testing.assert_frame_equal(result, expected, check_exact=True)
+    pd.testing.assert_frame_equal(history, before)  # Исходные данные не изменились
+
+    print(f"Баров: {args.rows}, обновлений: {args.updates} по {args.new_bars} бар(ов)")
+    print(f"add_* на копии данных:       {plain_time * 1000:9.2f} мс")
+    print(f"Кэш, полный расчет:          {miss_time * 1000:9.2f} мс")
+    print(f"Кэш, попадание в память:     {hit_time * 1000:9.2f} мс  (x{plain_time / hit_time:.1f})")
+    print(f"Кэш, попадание на диск:      {disk_time * 1000:9.2f} мс  (x{plain_time / disk_time:.1f})")
+    print(f"Поток баров, add_*:          {plain_stream_time / args.updates * 1000:9.2f} мс на обновление")
+    print(f"Поток баров, кэш:            {cache_stream_time / args.updates * 1000:9.2f} мс на обновление  "
+          f"(x{plain_stream_time / cache_stream_time:.1f}, "
+          f"второе продление длинного ряда прогоняет историю через калькуляторы)")
+    print(f"Счетчики: {cache.metrics()}")
+    print("Результаты совпадают с add_moving_average, add_rsi и add_macd.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Бенчмарк indicators_batch.compute_indicators_batch против цикла по тикерам с add_moving_average, add_rsi и add_macd.
+
+Запуск из корня проекта: python -m benchmarks.bench_indicators --rows 2500 --tickers 500
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import data_download as dd
+import indicators_batch
+from benchmarks.synthetic import random_walk_close
+
+
+def loop_per_ticker(wide):
+    """
+    Рассчитывает индикаторы существующими функциями, вызывая их для каждого тикера по отдельности.
+    """
+    results = {}
+    for ticker in wide.columns:
+        data = pd.DataFrame({'Close': wide[ticker].dropna()})
+        data = dd.add_moving_average(data)
+        data = dd.add_rsi(data)
+        data = dd.add_macd(data)
+        results[ticker] = data
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк пакетного расчета индикаторов")
+    parser.add_argument('--rows', type=int, default=2500, help="Число баров")
+    parser.add_argument('--tickers', type=int, default=500, help="Число тикеров")
+    parser.add_argument('--repeat', type=int, default=3, help="Число повторов (берется лучшее время)")
+    args = parser.parse_args()
+
+    wide = random_walk_close(args.rows, args.tickers)
+
+    loop_time = batch_time = float('inf')
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        looped = loop_per_ticker(wide)
+        loop_time = min(loop_time, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        batched = indicators_batch.compute_indicators_batch(wide)
+        batch_time = min(batch_time, time.perf_counter() - start)
+
+    # Проверяем, что результаты совпадают с точностью до бита
+    for ticker, data in looped.items():
+        for column in batched:
+            expected = data[column].to_numpy()
+            actual = batched[column][ticker].loc[data.index].to_numpy()
+            if not np.array_equal(expected, actual, equal_nan=True):
+                raise AssertionError(f"Результат {column} для {ticker} не совпадает")
+
+    print(f"Баров: {args.rows}, тикеров: {args.tickers}")
+    print(f"Цикл по тикерам:         {loop_time:8.3f} с")
+    print(f"compute_indicators_batch: {batch_time:8.3f} с  (x{loop_time / batch_time:.1f})")
+    print("Результаты совпадают.")
+
+
+if __name__ == '__main__':
+    main()
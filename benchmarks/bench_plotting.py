@@ -0,0 +1,72 @@
+"""
+Бенчмарк построения графиков: новая фигура на каждый график, заготовка фигуры и render_many в пуле процессов
+по сравнению со временем расчета индикаторов для тех же тикеров.
+
+Запуск из корня проекта: python -m benchmarks.bench_plotting --charts 100 --rows 250 --workers 4
+"""
+import argparse
+import contextlib
+import io
+import tempfile
+import time
+
+import matplotlib
+
+matplotlib.use('Agg')
+
+import data_download as dd  # noqa: E402
+import data_plotting  # noqa: E402
+from benchmarks.synthetic import random_walk_ohlcv  # noqa: E402
+
+
+def _indicators(charts):
+    return {ticker: dd.add_macd(dd.add_rsi(dd.add_moving_average(data))) for ticker, data in charts.items()}
+
+
+def _sequential(charts, directory, formats, reuse_figure):
+    with contextlib.redirect_stdout(io.StringIO()):
+        for ticker, data in charts.items():
+            data_plotting.create_and_save_plot(data, ticker, period='bench', show=False, output_dir=directory,
+                                               formats=formats, reuse_figure=reuse_figure)
+    data_plotting.clear_figure_templates()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк построения графиков без экрана")
+    parser.add_argument('--charts', type=int, default=100, help="Число тикеров")
+    parser.add_argument('--rows', type=int, default=250, help="Число баров на тикер")
+    parser.add_argument('--workers', type=int, default=None, help="Число процессов для render_many")
+    parser.add_argument('--formats', nargs='+', default=['png'], choices=['png', 'html'], help="Какие файлы создавать")
+    args = parser.parse_args()
+    formats = tuple(args.formats)
+
+    raw = {f"T{i:04d}": random_walk_ohlcv(args.rows, seed=i) for i in range(args.charts)}
+    start = time.perf_counter()
+    charts = _indicators(raw)
+    indicators_time = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        _sequential(charts, directory, formats, reuse_figure=False)
+        fresh_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _sequential(charts, directory, formats, reuse_figure=True)
+        reuse_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _, errors = data_plotting.render_many(charts, output_dir=directory, period='bench', formats=formats,
+                                              workers=args.workers)
+        pool_time = time.perf_counter() - start
+
+    print(f"{args.charts} тикеров × {args.rows} баров, форматы: {', '.join(formats)}")
+    print(f"расчет индикаторов:            {indicators_time:8.3f} с")
+    print(f"новая фигура на график:        {fresh_time:8.3f} с ({fresh_time / args.charts * 1000:.1f} мс/график)")
+    print(f"заготовка фигуры:              {reuse_time:8.3f} с ({reuse_time / args.charts * 1000:.1f} мс/график)")
+    print(f"render_many:                   {pool_time:8.3f} с ({pool_time / args.charts * 1000:.1f} мс/график)")
+    if errors:
+        print(f"ошибки: {errors}")
+
+
+if __name__ == '__main__':
+    main()
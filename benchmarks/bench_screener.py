@@ -0,0 +1,58 @@
+"""
+Бенчмарк screener.Screener: полный проход по истории и инкрементальные проходы по одному новому бару.
+
+Запуск из корня проекта: python -m benchmarks.bench_screener --rows 2500 --tickers 5000 --new-bars 20
+"""
+import argparse
+import time
+
+import pandas as pd
+
+import screener
+from benchmarks.synthetic import random_walk_close
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк скринера")
+    parser.add_argument('--rows', type=int, default=2500, help="Число баров истории")
+    parser.add_argument('--tickers', type=int, default=5000, help="Число тикеров")
+    parser.add_argument('--new-bars', type=int, default=20, help="Число новых баров, обрабатываемых по одному")
+    args = parser.parse_args()
+
+    wide = random_walk_close(args.rows + args.new_bars, args.tickers)
+    history = wide.iloc[:args.rows]
+
+    start = time.perf_counter()
+    full = screener.screen(wide)
+    full_time = time.perf_counter() - start
+
+    scanner = screener.Screener()
+    start = time.perf_counter()
+    parts = [scanner.scan(history)]
+    history_time = time.perf_counter() - start
+
+    bar_times = []
+    for row in range(args.rows, len(wide)):
+        start = time.perf_counter()
+        parts.append(scanner.scan(wide.iloc[row:row + 1]))
+        bar_times.append(time.perf_counter() - start)
+
+    # Инкрементальные проходы должны найти те же события, что и полный проход
+    incremental = pd.concat(parts, ignore_index=True)
+    key = ['timestamp', 'ticker', 'rule']
+    expected = full.sort_values(key).reset_index(drop=True)
+    actual = incremental.sort_values(key).reset_index(drop=True)
+    if not expected.equals(actual):
+        raise AssertionError("События инкрементальных проходов не совпадают с полным проходом")
+
+    bar_times.sort()
+    print(f"Баров: {args.rows}, тикеров: {args.tickers}, событий: {len(full)}")
+    print(f"Полный проход:                  {full_time:8.3f} с")
+    print(f"Проход по истории:              {history_time:8.3f} с")
+    print(f"Один новый бар (медиана):       {bar_times[len(bar_times) // 2] * 1000:8.1f} мс")
+    print(f"Один новый бар (худший):        {bar_times[-1] * 1000:8.1f} мс")
+    print("События совпадают.")
+
+
+if __name__ == '__main__':
+    main()
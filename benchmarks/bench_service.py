@@ -0,0 +1,84 @@
+"""
+Бенчмарк service.IndicatorService с FakeProvider: одновременные одинаковые запросы, попадания в кэш
+и запросы с разными параметрами.
+
+Запуск из корня проекта: python -m benchmarks.bench_service --clients 50 --latency 0.2
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from data_providers import FakeProvider
+from service import IndicatorService
+
+
+async def request(port, path):
+    """
+    Отправляет запрос GET и возвращает (код ответа, заголовки, тело).
+    """
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n".encode())
+    await writer.drain()
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    headers = {name.lower(): value.strip() for name, _, value in (line.partition(':') for line in lines[1:] if line)}
+    body = await reader.readexactly(int(headers['content-length']))
+    writer.close()
+    return int(lines[0].split(' ')[1]), headers, body
+
+
+async def run(clients, latency, cached_requests):
+    service = IndicatorService(provider=FakeProvider(latency=latency), use_cache=False)
+    server = await service.start(port=0)
+    port = server.sockets[0].getsockname()[1]
+    path = '/indicators?ticker=AAPL&period=1y&rsi_period=14'
+    try:
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(request(port, path) for _ in range(clients)))
+        concurrent_time = time.perf_counter() - start
+        bodies = {body for _, _, body in responses}
+        sources = [headers.get('x-cache') for _, headers, _ in responses]
+        if len(bodies) != 1 or any(status != 200 for status, _, _ in responses):
+            raise AssertionError("Одинаковые запросы получили разные ответы")
+
+        start = time.perf_counter()
+        for _ in range(cached_requests):
+            status, headers, _ = await request(port, path)
+            if headers.get('x-cache') != 'hit':
+                raise AssertionError("Повторный запрос не попал в кэш")
+        cached_time = (time.perf_counter() - start) / cached_requests
+
+        # Разные параметры считаются параллельно в пуле потоков
+        start = time.perf_counter()
+        paths = [f'/statistics?ticker=T{number}&period=1y' for number in range(8)]
+        await asyncio.gather(*(request(port, other) for other in paths))
+        parallel_time = time.perf_counter() - start
+
+        status, _, body = await request(port, '/indicators?ticker=AAPL&period=1y&format=arrow')
+        arrow_bytes = len(body)
+        _, _, metrics = await request(port, '/metrics')
+    finally:
+        server.close()
+        await server.wait_closed()
+        service.close()
+
+    print(f"{clients} одинаковых запросов: {concurrent_time:.3f} с, "
+          f"из них рассчитано {sources.count('miss')}, объединено {sources.count('coalesced')}")
+    print(f"Ответ из кэша: {cached_time * 1000:.2f} мс на запрос")
+    print(f"8 разных запросов с задержкой поставщика {latency} с: {parallel_time:.3f} с")
+    print(f"Ответ в формате Arrow: {arrow_bytes} байт")
+    print(f"Счетчики: {json.loads(metrics)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк сервиса индикаторов")
+    parser.add_argument('--clients', type=int, default=50, help="Число одновременных одинаковых запросов")
+    parser.add_argument('--latency', type=float, default=0.2, help="Задержка FakeProvider в секундах")
+    parser.add_argument('--cached-requests', type=int, default=200, help="Число запросов, попадающих в кэш")
+    args = parser.parse_args()
+    asyncio.run(run(args.clients, args.latency, args.cached_requests))
+
+
+if __name__ == '__main__':
+    main()
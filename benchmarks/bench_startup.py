@@ -0,0 +1,75 @@
+"""
+Бенчмарк холодного запуска: время импорта точек входа по данным python -X importtime и проверка, что тяжелые
+библиотеки не импортируются раньше, чем нужны.
+
+Запуск из корня проекта: python -m benchmarks.bench_startup --budget-ms 300
+Код завершения 1, если время импорта превышает бюджет или при запуске импортирована запрещенная библиотека.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+# Точки входа и библиотеки, которые не должны импортироваться при их загрузке
+ENTRY_POINTS = {
+    'main': ('yfinance', 'pandas', 'matplotlib', 'plotly'),
+    'pipeline': ('yfinance', 'pandas', 'matplotlib', 'plotly'),
+    'data_download': ('yfinance', 'matplotlib', 'plotly'),
+    'data_plotting': ('yfinance', 'plotly'),
+}
+_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def import_profile(module):
+    """
+    Импортирует модуль в новом процессе с -X importtime.
+
+    Возвращает:
+        tuple: (суммарное время импорта в мс, словарь {модуль: собственное время в мс}).
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"], cwd=root,
+                               capture_output=True, text=True, check=True)
+    total = 0
+    modules = {}
+    for line in completed.stderr.splitlines():
+        match = _LINE.match(line)
+        if match is None:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        modules[name] = int(self_us) / 1000
+        if len(indent) == 1:  # Импорты верхнего уровня; их суммарное время включает вложенные
+            total += int(cumulative_us)
+    return total / 1000, modules
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк холодного запуска точек входа")
+    parser.add_argument('--budget-ms', type=float, default=300.0, help="Допустимое время импорта main, мс")
+    parser.add_argument('--repeat', type=int, default=5, help="Число запусков (берется медиана)")
+    parser.add_argument('--top', type=int, default=10, help="Сколько самых медленных модулей показать")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for entry, forbidden in ENTRY_POINTS.items():
+        runs = [import_profile(entry) for _ in range(args.repeat)]
+        median = statistics.median(total for total, _ in runs)
+        modules = runs[-1][1]
+        imported = sorted({name.split('.')[0] for name in modules} & set(forbidden))
+        print(f"{entry}: {median:.1f} мс (медиана из {args.repeat})")
+        slowest = sorted(modules.items(), key=lambda item: item[1], reverse=True)[:args.top]
+        for name, self_ms in slowest:
+            print(f"    {self_ms:8.1f} мс  {name}")
+        if imported:
+            print(f"    ОШИБКА: при импорте {entry} загружены {', '.join(imported)}")
+            failed = True
+        if entry == 'main' and median > args.budget_ms:
+            print(f"    ОШИБКА: импорт main дольше бюджета {args.budget_ms:.0f} мс")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
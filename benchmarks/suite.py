@@ -0,0 +1,269 @@
+"""
+Набор бенчмарков публичных функций проекта на синтетических котировках без сети.
+
+Для каждой функции и размера данных измеряются лучшее время из нескольких повторов и пиковая память
+(tracemalloc, отдельным запуском, чтобы не искажать время). Результаты записываются в JSON; при передаче
+файла с результатами предыдущего запуска (--baseline) выводится сравнение, и при замедлении сверх порога
+программа завершается с кодом 1.
+
+Запуск из корня проекта:
+    python -m benchmarks.suite --output bench.json
+    python -m benchmarks.suite --preset full --output bench.json
+    python -m benchmarks.suite --baseline bench.json --threshold 0.2 --filter add_
+"""
+import argparse
+import contextlib
+import copy
+import gc
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import matplotlib
+
+matplotlib.use('Agg')
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import backtest  # noqa: E402
+import data_download as dd  # noqa: E402
+import data_export  # noqa: E402
+import data_plotting  # noqa: E402
+import downsampling  # noqa: E402
+import indicator_cache  # noqa: E402
+import indicators_batch  # noqa: E402
+import intraday  # noqa: E402
+import price_statistics  # noqa: E402
+import screener  # noqa: E402
+import streaming_indicators  # noqa: E402
+from benchmarks.synthetic import random_walk_close, random_walk_ohlcv  # noqa: E402
+
+# Наборы размеров: число строк для функций одного тикера и число тикеров для пакетных функций
+PRESETS = {
+    'quick': {'rows': [1_000, 100_000], 'tickers': [1, 500]},
+    'full': {'rows': [1_000, 10_000, 100_000, 1_000_000, 10_000_000], 'tickers': [1, 100, 1_000, 5_000]},
+}
+BATCH_ROWS = 2_500  # Число баров у каждого тикера в пакетных бенчмарках (около 10 лет)
+STREAM_BARS = 10_000  # Наибольшее число баров для замера потоковых калькуляторов
+PLOT_MAX_POINTS = 2_000  # Для графиков длиннее этого ряд прореживается, как рекомендуется для длинных историй
+
+
+def _with_indicators(data):
+    return dd.add_macd(dd.add_rsi(dd.add_moving_average(data.copy())))
+
+
+def single_ticker_cases(rows, directory):
+    """
+    Возвращает бенчмарки функций одного тикера: список (имя, функция без аргументов).
+    """
+    data = random_walk_ohlcv(rows, freq='min')
+    full = _with_indicators(data)
+    stats = price_statistics.compute_price_statistics(data)
+    # Потоковые калькуляторы обновляются по одному бару, поэтому замеряется не больше STREAM_BARS баров
+    close = data['Close'].to_numpy()
+    calculators = streaming_indicators.StreamingIndicators.from_history(close[:100])
+    tail = close[-min(rows, STREAM_BARS):]
+    # Кэш индикаторов с уже посчитанным RSI: замеряется попадание (хеш цен закрытия и сборка нового DataFrame)
+    cache = indicator_cache.IndicatorCache()
+    cache.rsi(data)
+    csv_path = os.path.join(directory, 'bench.csv')
+    parquet_path = os.path.join(directory, 'bench.parquet')
+    with contextlib.redirect_stdout(io.StringIO()):
+        data_export.export_data(full, parquet_path)  # Файл для замера чтения
+    plot_kwargs = {'show': False, 'output_dir': directory, 'period': 'bench', 'formats': ('png',),
+                   'max_points': PLOT_MAX_POINTS if rows > PLOT_MAX_POINTS else None}
+
+    return [
+        ('add_moving_average', lambda: dd.add_moving_average(data.copy())),
+        ('add_rsi', lambda: dd.add_rsi(data.copy())),
+        ('add_macd', lambda: dd.add_macd(data.copy())),
+        ('IndicatorCache.rsi(hit)', lambda: cache.rsi(data)),
+        ('compute_price_statistics', lambda: price_statistics.compute_price_statistics(data)),
+        ('calculate_and_display_average_price', lambda: dd.calculate_and_display_average_price(data)),
+        ('calculate_and_display_standard_deviation', lambda: dd.calculate_and_display_standard_deviation(data)),
+        ('notify_if_strong_fluctuations', lambda: dd.notify_if_strong_fluctuations(data, 10, stats=stats)),
+        ('StreamingIndicators.update_many', lambda: calculators.update_many(tail)),
+        ('export_data_to_csv', lambda: dd.export_data_to_csv(full, csv_path)),
+        ('export_data(parquet)', lambda: data_export.export_data(full, parquet_path)),
+        ('load_exported_data(parquet)', lambda: data_export.load_exported_data(parquet_path)),
+        ('to_compact', lambda: intraday.to_compact(data, 'BENCH')),
+        ('resample_stream(1h)', lambda: sum(len(bars) for bars in intraday.resample_stream(
+            (data.iloc[start:start + 100_000] for start in range(0, rows, 100_000)), '1h'))),
+        ('downsample(lttb)', lambda: downsampling.downsample(full, PLOT_MAX_POINTS)),
+        ('create_and_save_plot', lambda: data_plotting.create_and_save_plot(full, 'BENCH', **plot_kwargs)),
+    ]
+
+
+def batch_cases(tickers):
+    """
+    Возвращает бенчмарки пакетных функций для многих тикеров: список (имя, функция без аргументов).
+    """
+    wide = random_walk_close(BATCH_ROWS, tickers)
+    # Инкрементальный скринер: состояние после всей истории, кроме последнего бара (копируется для каждого запуска)
+    scanner = screener.Screener()
+    scanner.scan(wide.iloc[:-1])
+    return [
+        ('compute_indicators_batch', lambda: indicators_batch.compute_indicators_batch(wide)),
+        ('compute_price_statistics_batch', lambda: price_statistics.compute_price_statistics_batch(wide)),
+        ('screen', lambda: screener.screen(wide)),
+        ('backtest.sweep', lambda: backtest.sweep(wide)),
+        ('Screener.scan(1 bar)', lambda: copy.deepcopy(scanner).scan(wide.iloc[-1:])),
+    ]
+
+
+def measure(function, repeat):
+    """
+    Измеряет лучшее время из repeat запусков и пиковую память отдельного запуска.
+
+    Возвращает:
+        tuple: (время в секундах, пиковая память в МБ).
+    """
+    best = float('inf')
+    with contextlib.redirect_stdout(io.StringIO()):  # Функции проекта печатают сообщения
+        for _ in range(repeat):
+            gc.collect()
+            start = time.perf_counter()
+            function()
+            best = min(best, time.perf_counter() - start)
+
+        gc.collect()
+        tracemalloc.start()
+        try:
+            function()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return best, peak / 2 ** 20
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(rows, tickers, repeat=3, name_filter=None):
+    """
+    Запускает все бенчмарки для указанных размеров.
+
+    Параметры:
+        rows (list): Число строк для функций одного тикера.
+        tickers (list): Число тикеров для пакетных функций.
+        repeat (int, optional): Число повторов для замера времени (по умолчанию 3).
+        name_filter (str, optional): Запускать только бенчмарки, в имени которых есть эта строка.
+
+    Возвращает:
+        dict: Описание окружения и список результатов.
+    """
+    results = []
+
+    def run(cases, size):
+        for name, function in cases:
+            if name_filter and name_filter not in name:
+                continue
+            seconds, peak_mb = measure(function, repeat)
+            result = {'name': name, **size, 'seconds': seconds, 'peak_memory_mb': peak_mb}
+            results.append(result)
+            label = ', '.join(f"{key}={value}" for key, value in size.items())
+            print(f"{name:>42} {label:>22} {seconds:>10.4f} с {peak_mb:>10.1f} МБ", flush=True)
+
+    with tempfile.TemporaryDirectory() as directory:
+        for n_rows in rows:
+            run(single_ticker_cases(n_rows, directory), {'rows': n_rows, 'tickers': 1})
+        for n_tickers in tickers:
+            run(batch_cases(n_tickers), {'rows': BATCH_ROWS, 'tickers': n_tickers})
+    data_plotting.clear_figure_templates()
+
+    return {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'repeat': repeat,
+        'results': results,
+    }
+
+
+def _key(result):
+    return result['name'], result['rows'], result['tickers']
+
+
+def compare(current, baseline, threshold=0.2, min_seconds=0.001):
+    """
+    Сравнивает результаты с предыдущим запуском.
+
+    Параметры:
+        current (dict): Результаты run_suite.
+        baseline (dict): Результаты предыдущего запуска.
+        threshold (float, optional): Допустимое относительное замедление или рост памяти (по умолчанию 0.2 — 20%).
+        min_seconds (float, optional): Замедления меньше этого значения в секундах не считаются регрессией,
+            чтобы не реагировать на шум коротких замеров (по умолчанию 0.001).
+
+    Возвращает:
+        list: Описания регрессий (пустой список, если регрессий нет).
+    """
+    previous = {_key(result): result for result in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        old = previous.get(_key(result))
+        if old is None:
+            continue
+        ratio = result['seconds'] / old['seconds'] if old['seconds'] > 0 else 1.0
+        memory_ratio = result['peak_memory_mb'] / old['peak_memory_mb'] if old['peak_memory_mb'] > 0 else 1.0
+        label = f"{result['name']} (rows={result['rows']}, tickers={result['tickers']})"
+        print(f"{label:>66} время x{ratio:5.2f} память x{memory_ratio:5.2f}")
+        if ratio > 1 + threshold and result['seconds'] - old['seconds'] > min_seconds:
+            regressions.append(f"{label}: время {old['seconds']:.4f} → {result['seconds']:.4f} с")
+        if memory_ratio > 1 + threshold and result['peak_memory_mb'] - old['peak_memory_mb'] > 1:
+            regressions.append(f"{label}: память {old['peak_memory_mb']:.1f} → {result['peak_memory_mb']:.1f} МБ")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Набор бенчмарков на синтетических данных")
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='quick', help="Набор размеров данных")
+    parser.add_argument('--rows', type=int, nargs='+', help="Число строк (вместо набора размеров)")
+    parser.add_argument('--tickers', type=int, nargs='+', help="Число тикеров (вместо набора размеров)")
+    parser.add_argument('--repeat', type=int, default=3, help="Число повторов (берется лучшее время)")
+    parser.add_argument('--filter', help="Запускать только бенчмарки, в имени которых есть эта строка")
+    parser.add_argument('--output', help="JSON-файл для результатов")
+    parser.add_argument('--baseline', help="JSON-файл с результатами предыдущего запуска для сравнения")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Допустимое замедление (0.2 — 20%%)")
+    args = parser.parse_args(argv)
+
+    preset = PRESETS[args.preset]
+    report = run_suite(args.rows or preset['rows'], args.tickers or preset['tickers'], repeat=args.repeat,
+                       name_filter=args.filter)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Результаты сохранены в {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print("Регрессии производительности:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print("Регрессий нет.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""
+Генератор синтетических котировок для бенчмарков без сети.
+"""
+import numpy as np
+import pandas as pd
+
+
+def random_walk_close(n_rows, n_tickers, seed=0, ragged=True):
+    """
+    Генерирует широкий DataFrame цен закрытия (время × тикер) в виде случайного блуждания.
+
+    Параметры:
+        n_rows (int): Число баров.
+        n_tickers (int): Число тикеров.
+        seed (int, optional): Начальное значение генератора случайных чисел (по умолчанию 0).
+        ragged (bool, optional): Если True, у части тикеров история начинается позже и есть пропуски баров.
+
+    Возвращает:
+        data: DataFrame с индексом из рабочих дней и столбцами T0000, T0001, ...
+    """
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0003, 0.02, (n_rows, n_tickers))
+    close = 100 * np.exp(np.cumsum(returns, axis=0))
+    if ragged:
+        # У каждого четвертого тикера история начинается позже, у каждого десятого есть пропуски
+        starts = rng.integers(0, max(1, n_rows // 2), n_tickers)
+        for column in range(0, n_tickers, 4):
+            close[:starts[column], column] = np.nan
+        gaps = rng.random((n_rows, n_tickers)) < 0.01
+        gaps[:, np.arange(n_tickers) % 10 != 0] = False
+        close[gaps] = np.nan
+    index = pd.bdate_range('2000-01-03', periods=n_rows, name='Date')
+    return pd.DataFrame(close, index=index, columns=[f"T{i:04d}" for i in range(n_tickers)])
+
+
+def random_walk_ohlcv(n_rows, seed=0, freq='B', tz='America/New_York'):
+    """
+    Генерирует DataFrame с котировками OHLCV одного тикера в том же виде, что возвращает yfinance.
+
+    Параметры:
+        n_rows (int): Число баров.
+        seed (int, optional): Начальное значение генератора случайных чисел (по умолчанию 0).
+        freq (str, optional): Частота баров, например 'B' для рабочих дней или 'min' для минутных (по умолчанию 'B').
+        tz (str, optional): Часовой пояс индекса (по умолчанию 'America/New_York').
+
+    Возвращает:
+        data: DataFrame со столбцами Open, High, Low, Close, Volume, Dividends, Stock Splits.
+    """
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, n_rows)))
+    open_ = close * (1 + rng.normal(0, 0.005, n_rows))
+    spread = np.abs(rng.normal(0, 0.01, n_rows)) * close
+    index = pd.date_range('2000-01-03', periods=n_rows, freq=freq, name='Date', tz=tz)
+    return pd.DataFrame({
+        'Open': open_,
+        'High': np.maximum(open_, close) + spread,
+        'Low': np.minimum(open_, close) - spread,
+        'Close': close,
+        'Volume': rng.integers(1_000_000, 50_000_000, n_rows),
+        'Dividends': 0.0,
+        'Stock Splits': 0.0,
+    }, index=index)
@@ -0,0 +1,285 @@
+import importlib.util
+import json
+import os
+import re
+import threading
+
+import pandas as pd
+
+from data_providers import INTRADAY_INTERVALS, period_to_start
+
+# pyarrow нужен pandas для чтения и записи Parquet; проверяем, что он установлен, не импортируя его при запуске
+_HAS_PARQUET = importlib.util.find_spec('pyarrow') is not None
+
+DEFAULT_CACHE_DIR = os.environ.get('STOCKS_CACHE_DIR', 'stock_cache')
+# Как долго верить пустому ответу поставщика за прошедшие даты (до начала торгов, праздники),
+# прежде чем запросить их снова: ошибка загрузки за это время успевает пройти
+EMPTY_RECHECK_INTERVAL = pd.Timedelta(days=7)
+
+
+def _naive_dates(index):
+    """
+    Возвращает индекс дат без часового пояса для сравнения с границами диапазона.
+    """
+    if getattr(index, 'tz', None) is not None:
+        return index.tz_localize(None)
+    return index
+
+
+class OHLCVStore:
+    """
+    Локальное хранилище котировок: один файл Parquet (или pickle, если pyarrow не установлен) на тикер
+    и интервал баров.
+
+    Рядом с файлом данных хранится JSON с границами уже загруженного диапазона. При запросе
+    хранилище загружает у поставщика только недостающие участки до и после сохраненного диапазона
+    и дописывает их в файл.
+
+    Параметры:
+        cache_dir (str, optional): Каталог для файлов хранилища (по умолчанию 'stock_cache'
+            или значение переменной окружения STOCKS_CACHE_DIR).
+        refresh_interval (pd.Timedelta, optional): Как долго считать свежим сегодняшний бар
+            (по умолчанию 1 час).
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, refresh_interval=pd.Timedelta(hours=1)):
+        self.cache_dir = cache_dir
+        self.refresh_interval = refresh_interval
+        self.stats = {'hits': 0, 'partial_hits': 0, 'misses': 0, 'rows_fetched': 0}
+        self._lock = threading.Lock()  # Защищает stats и _ticker_locks при загрузке из нескольких потоков
+        self._ticker_locks = {}
+
+    def _count(self, key, value=1):
+        with self._lock:
+            self.stats[key] += value
+
+    def _ticker_lock(self, ticker, interval='1d'):
+        with self._lock:
+            return self._ticker_locks.setdefault((ticker, interval), threading.Lock())
+
+    def _path(self, ticker, suffix, interval='1d'):
+        safe = re.sub(r'[^A-Za-z0-9._^=-]', '_', ticker)
+        if interval != '1d':
+            safe = f"{safe}@{interval}"  # Дневные бары хранятся под именем тикера, остальные — с интервалом
+        return os.path.join(self.cache_dir, f"{safe}.{suffix}")
+
+    def _data_path(self, ticker, interval='1d'):
+        return self._path(ticker, 'parquet' if _HAS_PARQUET else 'pkl', interval)
+
+    def load(self, ticker, interval='1d'):
+        """
+        Читает сохраненные данные и границы диапазона для тикера.
+
+        Возвращает:
+            tuple: (DataFrame, dict) или (None, None), если тикера нет в хранилище.
+        """
+        data_path = self._data_path(ticker, interval)
+        meta_path = self._path(ticker, 'json', interval)
+        if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+            return None, None
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+        data = pd.read_parquet(data_path) if _HAS_PARQUET else pd.read_pickle(data_path)
+        return data, meta
+
+    def save(self, ticker, data, meta, interval='1d'):
+        """
+        Сохраняет данные тикера и границы загруженного диапазона.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        data_path = self._data_path(ticker, interval)
+        tmp_path = data_path + '.tmp'
+        if _HAS_PARQUET:
+            data.to_parquet(tmp_path)
+        else:
+            data.to_pickle(tmp_path)
+        os.replace(tmp_path, data_path)  # Атомарная замена, чтобы не оставить поврежденный файл
+        self.save_meta(ticker, meta, interval)
+
+    def save_meta(self, ticker, meta, interval='1d'):
+        """
+        Сохраняет только границы диапазона и отметки о пустых ответах поставщика, не переписывая данные.
+        """
+        with open(self._path(ticker, 'json', interval), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+    def clear(self, ticker, interval='1d'):
+        """
+        Удаляет данные тикера из хранилища.
+        """
+        for path in (self._data_path(ticker, interval), self._path(ticker, 'json', interval)):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def get(self, ticker, provider, period=None, start=None, end=None, interval='1d'):
+        """
+        Возвращает данные тикера за период или диапазон дат, догружая у поставщика только недостающие участки.
+
+        Параметры:
+            ticker (str): Тикер акции.
+            provider (DataProvider): Поставщик данных для недостающих участков.
+            period (str, optional): Период для данных ('1mo', '1y', 'max', ...).
+            start (str, optional): Начальная дата диапазона.
+            end (str, optional): Дата окончания диапазона (не включается).
+            interval (str, optional): Интервал баров: '1d' или внутридневной ('1m', '5m', '1h', ...)
+                (по умолчанию '1d').
+
+        Возвращает:
+            data: DataFrame с данными о ценах акций.
+        """
+        with self._ticker_lock(ticker, interval):
+            return self._get(ticker, provider, period, start, end, interval)
+
+    def _get(self, ticker, provider, period, start, end, interval):
+        now = pd.Timestamp.now()
+        today = now.normalize()
+        if start is not None:
+            start = pd.Timestamp(start)
+            end = pd.Timestamp(end) if end is not None else today + pd.Timedelta(days=1)
+        else:
+            start = period_to_start(period or '1mo', today)  # None для периода 'max'
+            end = today + pd.Timedelta(days=1)
+
+        cached, meta = self.load(ticker, interval)
+        if cached is None:
+            self._count('misses')
+            ranges = [(start, end)]
+        else:
+            cached_start = pd.Timestamp(meta['start']) if meta['start'] else None
+            cached_end = pd.Timestamp(meta['end'])
+            ranges = []
+            # Поставщик уже вернул пустой ответ за даты до сохраненного диапазона (например, до начала торгов)
+            before = self._empty_check(meta, 'empty_before', now, EMPTY_RECHECK_INTERVAL)
+            checked_start = before is not None and (before['start'] is None or
+                                                    (start is not None and start >= pd.Timestamp(before['start'])))
+            if start is None and cached_start is not None and not checked_start:
+                ranges.append((None, cached_start))
+            elif start is not None and cached_start is not None and start < cached_start and not checked_start:
+                ranges.append((start, cached_start))
+            if end > cached_end:
+                # Сегодняшний бар еще формируется: перезагружаем его не чаще refresh_interval
+                # Внутридневные бары перезагружаем не реже, чем появляется новый бар
+                refresh_interval = min(self.refresh_interval, INTRADAY_INTERVALS.get(interval, self.refresh_interval))
+                fresh = now - pd.Timestamp(meta['fetched_at']) < refresh_interval
+                # После праздников новых баров нет: пустой ответ запоминается в метаданных, но диапазон
+                # не считается загруженным. Участок до сегодняшнего дня проверяется снова через refresh_interval,
+                # участок в прошлом — через EMPTY_RECHECK_INTERVAL
+                after = self._empty_check(meta, 'empty_after', now, EMPTY_RECHECK_INTERVAL)
+                if after is not None and pd.Timestamp(after['end']) > pd.Timestamp(after['checked_at']).normalize():
+                    after = self._empty_check(meta, 'empty_after', now, refresh_interval)
+                recently_checked = after is not None and end <= pd.Timestamp(after['end'])
+                # Биржи не торгуют в выходные: если в недостающем участке нет рабочих дней, запрашивать нечего
+                no_trading_days = len(pd.bdate_range(cached_end, min(end, today + pd.Timedelta(days=1)),
+                                                     inclusive='left')) == 0
+                if not ((cached_end >= today and fresh) or recently_checked or no_trading_days):
+                    ranges.append((cached_end, end))
+
+        if not ranges:
+            self._count('hits')
+        else:
+            if cached is not None:
+                self._count('partial_hits')
+            parts = [] if cached is None else [cached]
+            covered_start = False  # Загружен ли участок до сохраненного диапазона
+            empty_checked = False  # Получен ли от поставщика пустой ответ, который нужно запомнить
+            last_bar = None  # Последний бар, полученный от поставщика
+            for range_start, range_end in ranges:
+                if range_start is None:
+                    fetched = provider.history(ticker, period='max', interval=interval)
+                else:
+                    fetched = provider.history(ticker, start=range_start.strftime('%Y-%m-%d'),
+                                               end=range_end.strftime('%Y-%m-%d'), interval=interval)
+                self._count('rows_fetched', len(fetched))
+                if fetched.empty:
+                    if meta is not None:
+                        if range_start == cached_end:
+                            meta['empty_after'] = {'end': range_end.strftime('%Y-%m-%d'), 'checked_at': now.isoformat()}
+                        else:
+                            meta['empty_before'] = {'start': range_start.strftime('%Y-%m-%d') if range_start else None,
+                                                    'checked_at': now.isoformat()}
+                        empty_checked = True
+                    continue  # При ошибке yfinance возвращает пустой DataFrame: диапазон не считается загруженным
+                parts.append(fetched)
+                if meta is None or range_end == cached_start:
+                    covered_start = True
+                fetched_last = _naive_dates(fetched.index).max()
+                last_bar = fetched_last if last_bar is None else max(last_bar, fetched_last)
+
+            if not parts:
+                return pd.DataFrame()  # Поставщик ничего не вернул (например, неизвестный тикер)
+            if last_bar is None:
+                # Новых баров нет: границы в хранилище не меняются, сохраняются только отметки о проверке
+                if empty_checked:
+                    self.save_meta(ticker, meta, interval)
+                return self._select(cached, start, end)
+
+            cached = pd.concat(parts)
+            cached = cached[~cached.index.duplicated(keep='last')].sort_index()
+
+            # Диапазон в хранилище остается непрерывным и заканчивается на дне после последнего полученного бара;
+            # сегодняшний бар не считается загруженным окончательно
+            received_end = last_bar.normalize() + pd.Timedelta(days=1)
+            if meta is None:
+                new_start, new_end = start, received_end
+            else:
+                old_start = pd.Timestamp(meta['start']) if meta['start'] else None
+                new_start = old_start
+                if covered_start:
+                    new_start = None if start is None or old_start is None else min(start, old_start)
+                new_end = max(pd.Timestamp(meta['end']), received_end)
+            old_meta = meta or {}
+            meta = {
+                'start': new_start.strftime('%Y-%m-%d') if new_start is not None else None,
+                'end': min(new_end, today).strftime('%Y-%m-%d'),
+                'fetched_at': now.isoformat(),
+            }
+            # Отметки о пустых ответах относятся к границам диапазона и сохраняются, пока граница не сдвинулась
+            if 'empty_before' in old_meta and old_meta['start'] == meta['start']:
+                meta['empty_before'] = old_meta['empty_before']
+            if 'empty_after' in old_meta and old_meta['end'] == meta['end']:
+                meta['empty_after'] = old_meta['empty_after']
+            self.save(ticker, cached, meta, interval)
+
+        return self._select(cached, start, end)
+
+    @staticmethod
+    def _empty_check(meta, key, now, valid_for):
+        """
+        Возвращает отметку о пустом ответе поставщика из метаданных или None, если ее нет или она устарела.
+        """
+        check = meta.get(key)
+        if check is None or now - pd.Timestamp(check['checked_at']) >= valid_for:
+            return None
+        return check
+
+    @staticmethod
+    def _select(data, start, end):
+        dates = _naive_dates(data.index)
+        mask = dates < end
+        if start is not None:
+            mask &= dates >= start
+        return data[mask]
+
+
+_default_store = None
+
+
+def get_default_store():
+    """
+    Возвращает хранилище котировок по умолчанию.
+    """
+    global _default_store
+    if _default_store is None:
+        _default_store = OHLCVStore()
+    return _default_store
+
+
+def set_default_store(store):
+    """
+    Устанавливает хранилище котировок по умолчанию.
+
+    Параметры:
+        store (OHLCVStore): Новое хранилище или None для хранилища в каталоге по умолчанию.
+    """
+    global _default_store
+    _default_store = store
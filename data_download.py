@@ -1,30 +1,64 @@
-import yfinance as yf
+import math
+from dataclasses import fields
+
 import pandas as pd
 
+import data_cache
+import data_providers
+from price_statistics import PriceStatistics, compute_price_statistics
+from tracing import traced
+
 
-def fetch_stock_data(ticker, period=None, start_date=None, end_date=None):
+@traced()
+def fetch_stock_data(ticker, period=None, start_date=None, end_date=None, use_cache=True, provider=None, store=None,
+                     interval='1d', compact=False):
     """
     Загружает данные о ценах акций для указанного тикера и периода или конкретных дат.
 
+    Сначала данные читаются из локального хранилища, у поставщика загружаются только недостающие диапазоны дат.
+
     Параметры:
         ticker (str): Тикер акции (например, 'AAPL' для Apple Inc).
         period (str, optional): Период для данных (по умолчанию '1mo' для одного месяца).
         start_date (str, optional): Начальная дата в формате 'ГГГГ-ММ-ДД'.
         end_date (str, optional): Дата окончания в формате 'ГГГГ-ММ-ДД'.
+        use_cache (bool, optional): Использовать ли локальное хранилище котировок (по умолчанию True).
+        provider (DataProvider, optional): Поставщик данных (по умолчанию data_providers.get_default_provider()).
+        store (OHLCVStore, optional): Хранилище котировок (по умолчанию data_cache.get_default_store()).
+        interval (str, optional): Интервал баров: '1d' для дневных или внутридневной, например '1m', '5m', '1h'
+            (по умолчанию '1d').
+        compact (bool, optional): Вернуть данные в компактном представлении: цены float32, целочисленный объем
+            и категориальный столбец 'Ticker' (по умолчанию False). Уменьшает объем памяти для длинной
+            внутридневной истории.
 
     Возвращает:
         data: DataFrame с данными о ценах акций.
     """
-    if start_date and end_date:
-        data = yf.Ticker(ticker).history(start=start_date, end=end_date)
-    elif period:
-        data = yf.Ticker(ticker).history(period=period)
-    else:
-        data = yf.Ticker(ticker).history(period='1mo')  # по умолчанию загружаем данные за 1 месяц
+    if provider is None:
+        provider = data_providers.get_default_provider()
 
+    if not use_cache:
+        if start_date and end_date:
+            data = provider.history(ticker, start=start_date, end=end_date, interval=interval)
+        else:
+            # по умолчанию загружаем данные за 1 месяц
+            data = provider.history(ticker, period=period or '1mo', interval=interval)
+    else:
+        if store is None:
+            store = data_cache.get_default_store()
+        if start_date and end_date:
+            data = store.get(ticker, provider, start=start_date, end=end_date, interval=interval)
+        else:
+            # по умолчанию загружаем данные за 1 месяц
+            data = store.get(ticker, provider, period=period or '1mo', interval=interval)
+
+    if compact and not data.empty:
+        from intraday import to_compact
+        data = to_compact(data, ticker)
     return data
 
 
+@traced()
 def add_moving_average(data, window_size=5):
     """
     Добавляет столбец с скользящим средним к DataFrame с данными о ценах акций.
@@ -41,47 +75,56 @@ def add_moving_average(data, window_size=5):
     return data
 
 
-def calculate_and_display_average_price(data):
+def _price_statistics(data, stats):
     """
-    Вычисляет и выводит среднюю цену закрытия акций.
+    Возвращает переданную статистику или рассчитывает ее один раз, если она не передана.
 
     Параметры:
         data: DataFrame с данными о ценах акций.
+        stats (PriceStatistics): Уже рассчитанная статистика или None.
+
+    Возвращает:
+        PriceStatistics: Статистика цен закрытия. Если в столбце 'Close' нет ни одной цены, все показатели равны NaN
+        (функции вывода печатают nan, как pandas). Или None, если данные не подходят (ошибка уже выведена).
     """
-    if not isinstance(data, pd.DataFrame):
-        print("Ошибка: Переданные данные не являются DataFrame.")
-        return
+    if stats is None:
+        stats = compute_price_statistics(data)  # При неподходящих данных выводит сообщение об ошибке
+        if stats is None and isinstance(data, pd.DataFrame) and 'Close' in data.columns:
+            stats = PriceStatistics(**{**{field.name: math.nan for field in fields(PriceStatistics)}, 'count': 0})
+    return stats
 
-    if 'Close' not in data.columns:
-        print("Ошибка: В DataFrame отсутствует колонка 'Close'.")
+
+@traced()
+def calculate_and_display_average_price(data, stats=None):
+    """
+    Вычисляет и выводит среднюю цену закрытия акций.
+
+    Параметры:
+        data: DataFrame с данными о ценах акций.
+        stats (PriceStatistics, optional): Уже рассчитанная статистика, чтобы не просматривать данные повторно.
+    """
+    stats = _price_statistics(data, stats)
+    if stats is None:
         return
 
-    average_price = data['Close'].mean()  # Вычисляем среднее значение по столбцу 'Close'
-    print(f"Средняя цена закрытия: {average_price:.2f}")
+    print(f"Средняя цена закрытия: {stats.mean:.2f}")
 
 
-def notify_if_strong_fluctuations(data, threshold):
+@traced()
+def notify_if_strong_fluctuations(data, threshold, stats=None):
     """
     Уведомляет пользователя, если цена акций колебалась более чем на заданный процент за период.
 
     Параметры:
         data: DataFrame с данными о ценах акций.
         threshold (float): Введенное пороговое значение в процентах для определения сильных колебаний.
+        stats (PriceStatistics, optional): Уже рассчитанная статистика, чтобы не просматривать данные повторно.
     """
-    if not isinstance(data, pd.DataFrame):
-        print("Ошибка: Переданные данные не являются DataFrame.")
-        return
-
-    if 'Close' not in data.columns:
-        print("Ошибка: В DataFrame отсутствует колонка 'Close'.")
+    stats = _price_statistics(data, stats)
+    if stats is None:
         return
 
-    # Вычисляем максимальное и минимальное значения цены закрытия
-    max_price = data['Close'].max()
-    min_price = data['Close'].min()
-
-    # Вычисляем разницу в процентах
-    price_fluctuation = ((max_price - min_price) / min_price) * 100
+    price_fluctuation = stats.fluctuation_percent  # Разница между максимальной и минимальной ценой в процентах
 
     # Сравниваем разницу с пороговым значением
     if price_fluctuation > threshold:
@@ -92,6 +135,7 @@ def notify_if_strong_fluctuations(data, threshold):
               f"{threshold}%.")
 
 
+@traced()
 def export_data_to_csv(data, filename):
     """
     Экспортирует данные о ценах акций в CSV файл.
@@ -111,6 +155,7 @@ def export_data_to_csv(data, filename):
         print(f"Произошла ошибка при сохранении данных в файл: {e}")
 
 
+@traced()
 def add_rsi(data, period=14):
     """
     Добавляет столбец с индексом относительной силы (RSI) к DataFrame.
@@ -141,6 +186,7 @@ def add_rsi(data, period=14):
     return data
 
 
+@traced()
 def add_macd(data, fast_period=12, slow_period=26, signal_period=9):
     """
     Добавляет столбцы MACD, Signal и Histogram к DataFrame.
@@ -174,20 +220,17 @@ def add_macd(data, fast_period=12, slow_period=26, signal_period=9):
     return data
 
 
-def calculate_and_display_standard_deviation(data):
+@traced()
+def calculate_and_display_standard_deviation(data, stats=None):
     """
     Вычисляет и выводит стандартное отклонение цены закрытия акций.
 
     Параметры:
         data: DataFrame с данными о ценах акций.
+        stats (PriceStatistics, optional): Уже рассчитанная статистика, чтобы не просматривать данные повторно.
     """
-    if not isinstance(data, pd.DataFrame):
-        print("Ошибка: Переданные данные не являются DataFrame.")
-        return
-
-    if 'Close' not in data.columns:
-        print("Ошибка: В DataFrame отсутствует колонка 'Close'.")
+    stats = _price_statistics(data, stats)
+    if stats is None:
         return
 
-    std_dev = data['Close'].std()
-    print(f"Стандартное отклонение цены закрытия: {std_dev:.2f}")
+    print(f"Стандартное отклонение цены закрытия: {stats.std:.2f}")
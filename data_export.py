@@ -0,0 +1,328 @@
+import glob
+import json
+import os
+import warnings
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+    _HAS_ARROW = True
+except ImportError:
+    _HAS_ARROW = False
+
+from tracing import traced
+
+FORMATS = ('csv', 'parquet', 'feather')
+
+
+def _infer_format(filename):
+    """
+    Определяет формат файла по расширению: .csv (в том числе .csv.gz), .parquet, .feather или .arrow.
+    """
+    name = filename.lower()
+    if '.csv' in name:
+        return 'csv'
+    if name.endswith(('.feather', '.arrow', '.ipc')):
+        return 'feather'
+    return 'parquet'
+
+
+def _index_column(schema):
+    """
+    Возвращает имя столбца, в котором pandas сохранил индекс DataFrame.
+    """
+    metadata = schema.pandas_metadata or {}
+    for column in metadata.get('index_columns', []):
+        if isinstance(column, str):
+            return column
+    return None
+
+
+def _localize(value, tz):
+    """
+    Приводит границу диапазона дат к часовому поясу индекса.
+    """
+    value = pd.Timestamp(value)
+    if tz is not None and value.tzinfo is None:
+        return value.tz_localize(tz)
+    if tz is None and value.tzinfo is not None:
+        return value.tz_localize(None)
+    return value
+
+
+def _tz_path(filename):
+    """
+    Возвращает путь к файлу рядом с CSV, в котором хранится часовой пояс индекса.
+    """
+    return filename + '.tz.json'
+
+
+def _write_csv_tz(filename, index):
+    """
+    Сохраняет часовой пояс индекса рядом с CSV: в тексте CSV остаются только смещения от UTC.
+    """
+    tz = getattr(index, 'tz', None)
+    if tz is None:
+        if os.path.exists(_tz_path(filename)):
+            os.remove(_tz_path(filename))
+        return
+    name = getattr(tz, 'key', None) or getattr(tz, 'zone', None) or str(tz)
+    with open(_tz_path(filename), 'w', encoding='utf-8') as f:
+        json.dump({'tz': name}, f)
+
+
+def _read_csv_tz(filename):
+    """
+    Возвращает часовой пояс индекса, сохраненный рядом с CSV, или None, если его нет.
+    """
+    try:
+        with open(_tz_path(filename), encoding='utf-8') as f:
+            return json.load(f)['tz']
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _parse_csv_index(index, tz=None):
+    """
+    Преобразует даты из CSV в DatetimeIndex. Если известен часовой пояс индекса, даты приводятся к нему.
+    Иначе даты с разными смещениями от UTC (летнее и зимнее время) приводятся к UTC.
+    """
+    if tz is not None:
+        return pd.to_datetime(index, utc=True).tz_convert(tz)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', FutureWarning)  # pandas предупреждает о датах с разными смещениями
+        try:
+            parsed = pd.to_datetime(index)
+        except ValueError:
+            parsed = None
+    if not isinstance(parsed, pd.DatetimeIndex):
+        parsed = pd.to_datetime(index, utc=True)
+    return parsed
+
+
+def _last_index(filename, fmt):
+    """
+    Возвращает последнее значение индекса в уже существующем файле или None, если файла нет.
+    """
+    if not os.path.exists(filename):
+        return None
+    if fmt == 'csv':
+        # Читаем только конец файла, а не весь файл
+        with open(filename, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 4096))
+            at_start = f.tell() == 0
+            lines = f.read().decode('utf-8').strip().splitlines()
+        if at_start and len(lines) < 2:
+            return None  # В файле только заголовок
+        return pd.Timestamp(lines[-1].split(',', 1)[0])
+    if fmt == 'parquet':
+        if os.path.isdir(filename):
+            parts = sorted(glob.glob(os.path.join(filename, 'part-*.parquet')))
+            if not parts:
+                return None
+            filename = parts[-1]
+        schema = pq.read_schema(filename)
+    else:
+        with pa.memory_map(filename) as source:
+            schema = pa.ipc.open_file(source).schema
+    # Читаем только столбец индекса; индекс RangeIndex хранится в метаданных и восстанавливается без столбцов
+    index_column = _index_column(schema)
+    columns = [index_column] if index_column is not None else []
+    if fmt == 'parquet':
+        table = pq.read_table(filename, columns=columns)
+    else:
+        table = feather.read_table(filename, columns=columns, memory_map=True)
+    return table.to_pandas().index.max()
+
+
+@traced()
+def export_data(data, filename, fmt=None, compression='zstd', append=False):
+    """
+    Экспортирует данные о ценах акций в CSV, Parquet или Feather (Arrow) файл.
+
+    Форматы Parquet и Feather хранят типы столбцов и индекс с часовым поясом без преобразования в текст,
+    сжимаются и читаются быстрее CSV. Для CSV часовой пояс индекса сохраняется в файл filename + '.tz.json',
+    по которому load_exported_data и iter_exported_data восстанавливают его при чтении.
+
+    Параметры:
+        data: DataFrame с данными о ценах акций.
+        filename (str): Имя файла для сохранения данных.
+        fmt (str, optional): Формат 'csv', 'parquet' или 'feather' (по умолчанию определяется по расширению).
+        compression (str, optional): Сжатие для Parquet и Feather: 'zstd', 'lz4', 'snappy' (только Parquet)
+            или 'uncompressed' (по умолчанию 'zstd'). Для CSV сжатие определяется по расширению, например .csv.gz.
+        append (bool, optional): Дописать только строки, которых еще нет в файле, то есть с индексом позже
+            последнего сохраненного (по умолчанию False). Для Parquet новые строки записываются отдельным
+            файлом в каталог filename, Feather-файл перезаписывается целиком.
+
+    Возвращает:
+        int: Число записанных строк или None, если произошла ошибка.
+    """
+    if not isinstance(data, pd.DataFrame):
+        print("Ошибка: Переданные данные не являются DataFrame.")
+        return None
+
+    fmt = fmt or _infer_format(filename)
+    if fmt not in FORMATS:
+        print(f"Ошибка: Неизвестный формат '{fmt}'. Доступные форматы: {', '.join(FORMATS)}.")
+        return None
+    if fmt != 'csv' and not _HAS_ARROW:
+        print(f"Ошибка: Для формата '{fmt}' установите пакет pyarrow.")
+        return None
+
+    try:
+        if append:
+            last = _last_index(filename, fmt)
+            if last is not None:
+                data = data[data.index > _localize(last, getattr(data.index, 'tz', None))]
+            if data.empty:
+                print(f"Новых строк для файла {filename} нет.")
+                return 0
+
+        written = len(data)
+        if fmt == 'csv':
+            exists = append and os.path.exists(filename)
+            data.to_csv(filename, index=True, mode='a' if exists else 'w', header=not exists)
+            _write_csv_tz(filename, data.index)
+        elif fmt == 'parquet':
+            if append and (os.path.isdir(filename) or not os.path.exists(filename)):
+                os.makedirs(filename, exist_ok=True)
+                part = len(glob.glob(os.path.join(filename, 'part-*.parquet')))
+                data.to_parquet(os.path.join(filename, f"part-{part:05d}.parquet"), compression=compression)
+            else:
+                if append:
+                    data = pd.concat([pq.read_table(filename).to_pandas(), data])
+                data.to_parquet(filename, compression=compression)
+        else:
+            if append and os.path.exists(filename):
+                data = pd.concat([feather.read_table(filename).to_pandas(), data])
+            feather.write_feather(pa.Table.from_pandas(data, preserve_index=True), filename, compression=compression)
+        print(f"Данные успешно сохранены в файл: {filename}")
+        return written
+    except Exception as e:
+        print(f"Произошла ошибка при сохранении данных в файл: {e}")
+        return None
+
+
+@traced()
+def load_exported_data(filename, columns=None, start_date=None, end_date=None, fmt=None, memory_map=True):
+    """
+    Загружает данные, сохраненные export_data или export_data_to_csv, читая только нужные столбцы и даты.
+
+    Параметры:
+        filename (str): Имя файла (или каталога с частями Parquet).
+        columns (list, optional): Какие столбцы читать (по умолчанию все).
+        start_date (str, optional): Начальная дата в формате 'ГГГГ-ММ-ДД' (включительно).
+        end_date (str, optional): Дата окончания в формате 'ГГГГ-ММ-ДД' (включительно).
+        fmt (str, optional): Формат 'csv', 'parquet' или 'feather' (по умолчанию определяется по расширению).
+        memory_map (bool, optional): Отображать файл в память вместо чтения (по умолчанию True). Для Feather
+            без сжатия чтение тогда не копирует данные.
+
+    Возвращает:
+        data: DataFrame с данными о ценах акций или None, если произошла ошибка.
+    """
+    fmt = fmt or _infer_format(filename)
+    if not os.path.exists(filename):
+        print(f"Ошибка: Файл {filename} не найден.")
+        return None
+    if fmt != 'csv' and not _HAS_ARROW:
+        print(f"Ошибка: Для формата '{fmt}' установите пакет pyarrow.")
+        return None
+
+    try:
+        if fmt == 'csv':
+            header = pd.read_csv(filename, nrows=0)
+            usecols = None if columns is None else [header.columns[0]] + list(columns)
+            data = pd.read_csv(filename, index_col=0, usecols=usecols, memory_map=memory_map)
+            data.index = _parse_csv_index(data.index, _read_csv_tz(filename))
+            tz = getattr(data.index, 'tz', None)
+            if start_date is not None:
+                data = data[data.index >= _localize(start_date, tz)]
+            if end_date is not None:
+                data = data[data.index <= _localize(end_date, tz)]
+            return data
+
+        if fmt == 'parquet':
+            parts = sorted(glob.glob(os.path.join(filename, 'part-*.parquet'))) if os.path.isdir(filename) else [
+                filename]
+            schema = pq.read_schema(parts[0])
+        else:
+            schema = feather.read_table(filename, columns=[], memory_map=memory_map).schema
+        index_column = _index_column(schema)
+        read_columns = None if columns is None else list(columns) + ([index_column] if index_column else [])
+
+        # Фильтр по датам применяется к таблице Arrow, для Parquet — еще до чтения групп строк
+        condition = None
+        if index_column is not None and (start_date is not None or end_date is not None):
+            field = pc.field(index_column)
+            index_type = schema.field(index_column).type
+            tz = getattr(index_type, 'tz', None)
+            if start_date is not None:
+                condition = field >= pa.scalar(_localize(start_date, tz), type=index_type)
+            if end_date is not None:
+                upper = field <= pa.scalar(_localize(end_date, tz), type=index_type)
+                condition = upper if condition is None else condition & upper
+
+        if fmt == 'parquet':
+            table = pq.read_table(filename, columns=read_columns, filters=condition, memory_map=memory_map)
+        else:
+            table = feather.read_table(filename, columns=read_columns, memory_map=memory_map)
+            if condition is not None:
+                table = table.filter(condition)
+        return table.to_pandas()
+    except Exception as e:
+        print(f"Произошла ошибка при чтении данных из файла: {e}")
+        return None
+
+
+def iter_exported_data(filename, chunk_rows=1_000_000, columns=None, fmt=None):
+    """
+    Читает данные, сохраненные export_data или export_data_to_csv, порциями, не загружая файл целиком.
+
+    Параметры:
+        filename (str): Имя файла (или каталога с частями Parquet).
+        chunk_rows (int, optional): Наибольшее число строк в порции (по умолчанию 1 000 000).
+        columns (list, optional): Какие столбцы читать (по умолчанию все).
+        fmt (str, optional): Формат 'csv', 'parquet' или 'feather' (по умолчанию определяется по расширению).
+
+    Возвращает:
+        generator: Порции данных (DataFrame) в порядке строк файла. Даты из CSV возвращаются в часовом поясе,
+        сохраненном export_data; для CSV без него (например, от export_data_to_csv) — в UTC.
+    """
+    fmt = fmt or _infer_format(filename)
+    if fmt == 'csv':
+        header = pd.read_csv(filename, nrows=0)
+        usecols = None if columns is None else [header.columns[0]] + list(columns)
+        tz = _read_csv_tz(filename)
+        for chunk in pd.read_csv(filename, index_col=0, usecols=usecols, chunksize=chunk_rows):
+            # Все порции приводятся к одному поясу: иначе порции с летним и зимним временем получат разные смещения
+            chunk.index = pd.to_datetime(chunk.index, utc=True)
+            if tz is not None:
+                chunk.index = chunk.index.tz_convert(tz)
+            yield chunk
+        return
+
+    if not _HAS_ARROW:
+        raise RuntimeError(f"Для формата '{fmt}' установите пакет pyarrow.")
+    if fmt == 'parquet':
+        parts = sorted(glob.glob(os.path.join(filename, 'part-*.parquet'))) if os.path.isdir(filename) else [filename]
+        for part in parts:
+            parquet_file = pq.ParquetFile(part)
+            index_column = _index_column(parquet_file.schema_arrow)
+            read_columns = None if columns is None else list(columns) + ([index_column] if index_column else [])
+            for batch in parquet_file.iter_batches(batch_size=chunk_rows, columns=read_columns):
+                yield batch.to_pandas()
+    else:
+        with pa.memory_map(filename) as source:
+            reader = pa.ipc.open_file(source)
+            index_column = _index_column(reader.schema)
+            for i in range(reader.num_record_batches):
+                table = pa.Table.from_batches([reader.get_batch(i)])
+                if columns is not None:
+                    table = table.select(list(columns) + ([index_column] if index_column else []))
+                for start in range(0, len(table), chunk_rows):
+                    yield table.slice(start, chunk_rows).to_pandas()
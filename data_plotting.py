@@ -1,10 +1,97 @@
 import matplotlib.pyplot as plt  # Импортируем matplotlib для построения графиков
 import pandas as pd  # Импортируем pandas для работы с данными
 import matplotlib.dates as mdates  # Импортируем для форматирования дат на графиках
-import plotly.express as px
+from matplotlib.collections import PolyCollection
+import numpy as np
+import contextlib
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
 
+from downsampling import downsample
+from price_statistics import compute_price_statistics
+from tracing import trace_stage, traced
 
-def create_and_save_plot(data, ticker, period=None, use_date_range=False, filename=None, plot_style='default'):
+_figure_templates = {}  # Заготовки фигур с тремя подграфиками по стилям, чтобы не создавать их заново
+_active_style = None  # Стиль, примененный последним вызовом plt.style.use
+
+
+def _get_figure(plot_style, reuse_figure):
+    """
+    Возвращает фигуру с тремя подграфиками для указанного стиля.
+
+    Стиль применяется только при его смене. При reuse_figure=True используется заранее созданная
+    заготовка фигуры, подграфики которой очищаются, вместо вызова plt.subplots.
+    """
+    global _active_style
+    if plot_style != _active_style:
+        plt.style.use(plot_style)  # Применяем выбранный стиль
+        _active_style = plot_style
+
+    if not reuse_figure:
+        return plt.subplots(3, 1, figsize=(12, 10), sharex=True)
+
+    template = _figure_templates.get(plot_style)
+    if template is None:
+        template = _figure_templates[plot_style] = plt.subplots(3, 1, figsize=(12, 10), sharex=True)
+    else:
+        fig, axes = template
+        for ax in axes:
+            ax.clear()
+        # Возвращаем поля по умолчанию, чтобы tight_layout дал тот же результат, что и для новой фигуры
+        fig.subplots_adjust(**{name: plt.rcParams[f'figure.subplot.{name}']
+                               for name in ('left', 'right', 'bottom', 'top', 'wspace', 'hspace')})
+    return template
+
+
+def _plot_histogram(ax, dates, values, **kwargs):
+    """
+    Рисует столбчатую гистограмму одной коллекцией прямоугольников.
+
+    Выглядит так же, как ax.bar (ширина столбца 0.8 дня для дневных баров, для внутридневных — 0.8 интервала
+    между барами), но не создает отдельный объект на каждый столбец, поэтому строится и отрисовывается намного
+    быстрее на длинных рядах.
+    """
+    x = mdates.date2num(dates)
+    values = np.nan_to_num(np.asarray(values, dtype=float))
+    step = min(1.0, float(np.median(np.diff(x)))) if len(x) > 1 else 1.0
+    left = x - 0.4 * step
+    right = x + 0.4 * step
+    rectangles = np.stack([
+        np.column_stack([left, np.zeros_like(values)]),
+        np.column_stack([left, values]),
+        np.column_stack([right, values]),
+        np.column_stack([right, np.zeros_like(values)]),
+    ], axis=1)
+    collection = PolyCollection(rectangles, **kwargs)
+    ax.add_collection(collection)
+    ax.sticky_edges.y.append(0)  # Как у ax.bar: ось y не получает отступ ниже нуля
+    ax.autoscale_view()
+    return collection
+
+
+def _file_prefix(ticker, period):
+    """
+    Возвращает начало имени файла графика: тикер и период или только тикер, если период не задан.
+    """
+    return f"{ticker}_{period}" if period else ticker
+
+
+def clear_figure_templates():
+    """
+    Закрывает заготовки фигур, созданные create_and_save_plot с reuse_figure=True.
+    """
+    global _active_style
+    for fig, _ in _figure_templates.values():
+        plt.close(fig)
+    _figure_templates.clear()
+    _active_style = None
+
+
+@traced()
+def create_and_save_plot(data, ticker, period=None, use_date_range=False, filename=None, plot_style='default',
+                         show=True, output_dir=None, formats=('png', 'html'), reuse_figure=True, max_points=None,
+                         downsample_method='lttb', html_layout='separate'):
     """
     Создает и сохраняет график цен акций, скользящего среднего, RSI и MACD.
 
@@ -13,14 +100,59 @@ def create_and_save_plot(data, ticker, period=None, use_date_range=False, filena
         ticker (str): Тикер акции.
         period (str, optional): Период для данных (используется для имени файла, если use_date_range=False).
         use_date_range (bool, optional): Флаг, указывающий, что используется диапазон дат (по умолчанию False).
-        filename (str, optional): Имя файла для сохранения графика (по умолчанию None).
+        filename (str, optional): Имя файла для сохранения графика (по умолчанию None). Если имя не задано,
+            HTML-файлы называются по тикеру и периоду, например AAPL_1y_stock_price_chart.html; прежние версии
+            добавляли к ним имя PNG-файла (AAPL_1y_stock_indicators_chart.png_stock_price_chart.html).
         plot_style (str, optional): Стиль графика (по умолчанию 'default').
+        show (bool, optional): Открывать ли интерактивные графики в браузере (по умолчанию True). Для запуска
+            без экрана, например на сервере, передайте False.
+        output_dir (str, optional): Каталог для файлов с графиками, если имя файла формируется автоматически.
+        formats (tuple, optional): Какие файлы создавать: 'png' (matplotlib) и/или 'html' (plotly)
+            (по умолчанию оба).
+        reuse_figure (bool, optional): Использовать одну заготовку фигуры matplotlib для всех вызовов вместо
+            создания новой (по умолчанию True). При False фигура закрывается после сохранения.
+        max_points (int, optional): Наибольшее число точек на каждой линии графика. Длинные ряды прореживаются
+            с сохранением пиков и провалов (по умолчанию None — все точки).
+        downsample_method (str, optional): Метод прореживания: 'lttb' или 'minmax' (по умолчанию 'lttb').
+        html_layout (str, optional): 'separate' — три HTML-файла (цена, RSI, MACD), 'combined' — один HTML-файл
+            с тремя подграфиками, в который plotly.js встраивается один раз (по умолчанию 'separate').
+
+    Возвращает:
+        list: Имена сохраненных файлов или None, если в данных нет информации о дате.
     """
-    plt.style.use(plot_style)  # Применяем выбранный стиль
+    saved_files = []
+    stats = compute_price_statistics(data) if 'Close' in data.columns else None  # По всем данным, до прореживания
+    with trace_stage('downsample', rows=len(data)):
+        data = downsample(data, max_points, method=downsample_method)  # Первая и последняя даты сохраняются
+    if 'png' in formats:
+        fig, (ax1, ax2, ax3) = _get_figure(plot_style, reuse_figure)  # Фигура с 3 подграфиками, разделяющими ось x
+        try:
+            png_filename = _draw_matplotlib_chart(fig, ax1, ax2, ax3, data, ticker, period, use_date_range,
+                                                  filename, output_dir, stats)
+        finally:
+            if not reuse_figure:
+                plt.close(fig)  # Закрываем фигуру, чтобы память не росла от вызова к вызову
+        if png_filename is None:
+            return None
+        saved_files.append(png_filename)
+
+    if 'html' in formats:
+        if html_layout == 'combined':
+            saved_files.append(_save_plotly_report(data, ticker, period, use_date_range, filename, show, output_dir))
+        else:
+            saved_files += _save_plotly_charts(data, ticker, period, use_date_range, filename, show, output_dir)
+    return saved_files
 
-    fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(12, 10), sharex=True)  # Создаем фигуру и 3
-    # подграфика, разделяющие ось x
 
+@traced()
+def _draw_matplotlib_chart(fig, ax1, ax2, ax3, data, ticker, period, use_date_range, filename, output_dir,
+                           stats=None):
+    """
+    Строит график цены, RSI и MACD на готовых подграфиках и сохраняет его в PNG.
+
+    Возвращает:
+        str: Имя сохраненного файла или None, если в данных нет информации о дате.
+    """
     # График цены и скользящего среднего
     if 'Date' not in data:  # Проверяем, есть ли колонка Date в DataFrame
         if pd.api.types.is_datetime64_any_dtype(data.index):  # Если нет, проверяем является ли индекс DataFrame датой
@@ -36,7 +168,7 @@ def create_and_save_plot(data, ticker, period=None, use_date_range=False, filena
 
         else:  # Если индекс не является датой, выводим ошибку
             print("Информация о дате отсутствует или не имеет распознаваемого формата.")
-            return
+            return None
     else:  # Если колонка Date есть в DataFrame
         if not pd.api.types.is_datetime64_any_dtype(data['Date']):  # Проверяем является ли колонка Date датой
             data['Date'] = pd.to_datetime(data['Date'])  # Если нет, преобразуем в формат даты
@@ -67,33 +199,53 @@ def create_and_save_plot(data, ticker, period=None, use_date_range=False, filena
         ax3.plot(dates, data['MACD'], label='MACD', color='blue')  # Строим график MACD на третьем подграфике
         ax3.plot(dates, data['Signal'], label='Signal',
                  color='red')  # Строим график сигнальной линии на третьем подграфике
-        ax3.bar(dates, data['Histogram'], label='Histogram',
-                color='grey')  # Строим гистограмму на третьем подграфике
+        _plot_histogram(ax3, dates, data['Histogram'], label='Histogram',
+                        color='grey')  # Строим гистограмму на третьем подграфике
         ax3.set_ylabel("MACD")  # Устанавливаем подпись оси y для третьего подграфика
         ax3.legend()  # Добавляем легенду на третьем подграфике
         ax3.grid(True)  # Включаем сетку на третьем подграфике
 
     # Добавляем стандартное отклонение на график цены
     if 'Close' in data.columns:
-        std_dev = data['Close'].std()
-        ax1.axhline(y=data['Close'].mean() + std_dev, color='green', linestyle='--', alpha=0.5,
-                    label='Mean + Std Dev')
-        ax1.axhline(y=data['Close'].mean() - std_dev, color='red', linestyle='--', alpha=0.5,
-                    label='Mean - Std Dev')
+        stats = stats or compute_price_statistics(data)
+        if stats is not None:  # None, если в столбце 'Close' нет ни одного значения
+            ax1.axhline(y=stats.mean + stats.std, color='green', linestyle='--', alpha=0.5,
+                        label='Mean + Std Dev')
+            ax1.axhline(y=stats.mean - stats.std, color='red', linestyle='--', alpha=0.5,
+                        label='Mean - Std Dev')
         ax1.legend()
 
-    plt.tight_layout()  # Устанавливаем layout чтобы графики не перекрывались
+    with trace_stage('matplotlib.tight_layout'):
+        fig.tight_layout()  # Устанавливаем layout чтобы графики не перекрывались
 
-    if filename is None:  # Проверяем, передано ли имя файла
+    png_filename = filename  # Имя PNG-файла; filename остается исходным для имен HTML-файлов ниже
+    if png_filename is None:  # Проверяем, передано ли имя файла
         if use_date_range:
             start_date = data.index.min().strftime('%Y-%m-%d')
             end_date = data.index.max().strftime('%Y-%m-%d')
-            filename = f"{ticker}_{start_date}_to_{end_date}_stock_indicators_chart.png"  # Формируем имя файла если
-            # сами указали диапазон дат
+            png_filename = f"{ticker}_{start_date}_to_{end_date}_stock_indicators_chart.png"  # Формируем имя файла
+            # если сами указали диапазон дат
         else:
-            filename = f"{ticker}_{period}_stock_indicators_chart.png"  # Формируем имя файла по умолчанию
-    plt.savefig(filename)  # Сохраняем график в файл
-    print(f"График сохранен как {filename}")  # Выводим сообщение о сохранении графика
+            # Формируем имя файла по умолчанию
+            png_filename = f"{_file_prefix(ticker, period)}_stock_indicators_chart.png"
+        if output_dir is not None:
+            os.makedirs(output_dir, exist_ok=True)
+            png_filename = os.path.join(output_dir, png_filename)
+    with trace_stage('matplotlib.savefig', rows=len(data)):
+        fig.savefig(png_filename)  # Сохраняем график в файл
+    print(f"График сохранен как {png_filename}")  # Выводим сообщение о сохранении графика
+    return png_filename
+
+
+@traced()
+def _save_plotly_charts(data, ticker, period, use_date_range, filename, show, output_dir):
+    """
+    Создает интерактивные графики цены, RSI и MACD и сохраняет их в HTML.
+
+    Возвращает:
+        list: Имена сохраненных HTML-файлов.
+    """
+    import plotly.express as px  # plotly импортируется только для HTML-графиков
 
     # Создаем первый интерактивный график для цены закрытия акции и скользящего среднего
     graph1 = px.line(data, x=data.index, y=['Close', 'Moving_Average'], title=f"{ticker} Цена акций с течением времени")
@@ -116,9 +268,10 @@ def create_and_save_plot(data, ticker, period=None, use_date_range=False, filena
     graph3.add_bar(x=data.index, y=data['Histogram'], name='Histogram')
 
     # Отображаем графики
-    graph1.show()
-    graph2.show()
-    graph3.show()
+    if show:
+        graph1.show()
+        graph2.show()
+        graph3.show()
 
     # Формируем имена файлов для сохранения графиков
     if filename is None:
@@ -132,16 +285,143 @@ def create_and_save_plot(data, ticker, period=None, use_date_range=False, filena
             filename2 = f"{ticker}_{start_date}_to_{end_date}_rsi_chart.html"
             filename3 = f"{ticker}_{start_date}_to_{end_date}_macd_chart.html"
         else:
-            filename1 = f"{ticker}_{period}_stock_price_chart.html"
-            filename2 = f"{ticker}_{period}_rsi_chart.html"
-            filename3 = f"{ticker}_{period}_macd_chart.html"
+            filename1 = f"{_file_prefix(ticker, period)}_stock_price_chart.html"
+            filename2 = f"{_file_prefix(ticker, period)}_rsi_chart.html"
+            filename3 = f"{_file_prefix(ticker, period)}_macd_chart.html"
+        if output_dir is not None:
+            os.makedirs(output_dir, exist_ok=True)
+            filename1 = os.path.join(output_dir, filename1)
+            filename2 = os.path.join(output_dir, filename2)
+            filename3 = os.path.join(output_dir, filename3)
     else:
         filename1 = f"{filename}_stock_price_chart.html"
         filename2 = f"{filename}_rsi_chart.html"
         filename3 = f"{filename}_macd_chart.html"
 
     # Сохраняем графики в HTML-файлы
-    graph1.write_html(filename1)
-    graph2.write_html(filename2)
-    graph3.write_html(filename3)
+    with trace_stage('plotly.write_html', rows=len(data)):
+        graph1.write_html(filename1)
+        graph2.write_html(filename2)
+        graph3.write_html(filename3)
     print(f"Графики сохранены как {filename1}, {filename2}, {filename3}")
+    return [filename1, filename2, filename3]
+
+
+@traced()
+def _save_plotly_report(data, ticker, period, use_date_range, filename, show, output_dir):
+    """
+    Создает один интерактивный график с тремя подграфиками (цена, RSI, MACD) и общей осью дат и сохраняет его
+    в HTML-файл, в который plotly.js встраивается один раз.
+
+    Возвращает:
+        str: Имя сохраненного HTML-файла.
+    """
+    import plotly.graph_objects as go  # plotly импортируется только для HTML-графиков
+    from plotly.subplots import make_subplots
+
+    fig = make_subplots(rows=3, cols=1, shared_xaxes=True, vertical_spacing=0.05, row_heights=[0.5, 0.25, 0.25],
+                        subplot_titles=(f"{ticker} Цена акций с течением времени", f"{ticker} RSI", f"{ticker} MACD"))
+    x = data.index
+    for column in ('Close', 'Moving_Average'):
+        if column in data.columns:
+            fig.add_trace(go.Scatter(x=x, y=data[column], mode='lines', name=column), row=1, col=1)
+    if 'RSI' in data.columns:
+        fig.add_trace(go.Scatter(x=x, y=data['RSI'], mode='lines', name='RSI'), row=2, col=1)
+        # Стандартные уровни перекупленности и перепроданности
+        fig.add_hline(y=70, line_dash='dash', line_color='red', row=2, col=1)
+        fig.add_hline(y=30, line_dash='dash', line_color='green', row=2, col=1)
+    for column in ('MACD', 'Signal'):
+        if column in data.columns:
+            fig.add_trace(go.Scatter(x=x, y=data[column], mode='lines', name=column), row=3, col=1)
+    if 'Histogram' in data.columns:
+        fig.add_trace(go.Bar(x=x, y=data['Histogram'], name='Histogram'), row=3, col=1)
+    fig.update_layout(height=900, xaxis3_title="Дата")
+    fig.update_yaxes(title_text="Цена", row=1, col=1)
+    fig.update_yaxes(title_text="RSI", row=2, col=1)
+    fig.update_yaxes(title_text="MACD", row=3, col=1)
+
+    if show:
+        fig.show()
+
+    if filename is None:
+        if use_date_range:
+            start_date = data.index.min().strftime('%Y-%m-%d')
+            end_date = data.index.max().strftime('%Y-%m-%d')
+            report_filename = f"{ticker}_{start_date}_to_{end_date}_chart.html"
+        else:
+            report_filename = f"{_file_prefix(ticker, period)}_chart.html"
+        if output_dir is not None:
+            os.makedirs(output_dir, exist_ok=True)
+            report_filename = os.path.join(output_dir, report_filename)
+    else:
+        report_filename = f"{filename}_chart.html"
+
+    with trace_stage('plotly.write_html', rows=len(data)):
+        fig.write_html(report_filename, include_plotlyjs=True)
+    print(f"График сохранен как {report_filename}")
+    return report_filename
+
+
+def _init_render_worker():
+    """
+    Настраивает процесс пула для построения графиков без экрана.
+    """
+    plt.switch_backend('Agg')
+
+
+def _render_chart(task):
+    """
+    Строит графики одного тикера в процессе пула и возвращает (тикер, файлы, текст ошибки).
+    """
+    ticker, data, kwargs = task
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            files = create_and_save_plot(data, ticker, show=False, **kwargs)
+        if files is None:
+            return ticker, [], "Информация о дате отсутствует или не имеет распознаваемого формата."
+        return ticker, files, None
+    except Exception as e:
+        return ticker, [], f"{type(e).__name__}: {e}"
+
+
+def render_many(charts, output_dir=None, period=None, use_date_range=False, plot_style='default',
+                formats=('png', 'html'), workers=None, max_points=None, downsample_method='lttb',
+                html_layout='separate'):
+    """
+    Строит и сохраняет графики для многих тикеров в пуле процессов без отображения на экране.
+
+    Каждый процесс использует одну заготовку фигуры matplotlib для всех своих тикеров.
+
+    Параметры:
+        charts (dict): Словарь {тикер: DataFrame} с ценами и рассчитанными индикаторами.
+        output_dir (str, optional): Каталог для файлов с графиками.
+        period (str, optional): Период для данных (используется для имен файлов; без него в имени только тикер).
+        use_date_range (bool, optional): Формировать имена файлов по диапазону дат (по умолчанию False).
+        plot_style (str, optional): Стиль графика (по умолчанию 'default').
+        formats (tuple, optional): Какие файлы создавать: 'png' и/или 'html' (по умолчанию оба).
+        workers (int, optional): Число процессов (по умолчанию число ядер).
+        max_points (int, optional): Наибольшее число точек на каждой линии графика (по умолчанию все точки).
+        downsample_method (str, optional): Метод прореживания: 'lttb' или 'minmax' (по умолчанию 'lttb').
+        html_layout (str, optional): 'separate' (три HTML-файла) или 'combined' (один файл)
+            (по умолчанию 'separate').
+
+    Возвращает:
+        tuple: (files, errors), где files — словарь {тикер: список файлов}, а errors — словарь
+        {тикер: текст ошибки} для тикеров, графики которых построить не удалось.
+    """
+    kwargs = {'period': period, 'use_date_range': use_date_range, 'plot_style': plot_style,
+              'output_dir': output_dir, 'formats': formats, 'max_points': max_points,
+              'downsample_method': downsample_method, 'html_layout': html_layout}
+    tasks = [(ticker, data, kwargs) for ticker, data in charts.items()]
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(tasks) // (workers * 4))  # Передаем задачи пачками, чтобы меньше тратить на обмен
+
+    files = {}
+    errors = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_render_worker) as pool:
+        for ticker, saved, error in pool.map(_render_chart, tasks, chunksize=chunksize):
+            if error is None:
+                files[ticker] = saved
+            else:
+                errors[ticker] = error
+    return files, errors
@@ -0,0 +1,212 @@
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+from tracing import traced
+
+# Столбцы, которые возвращает yfinance для дневных данных
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'Dividends', 'Stock Splits']
+
+# Внутридневные интервалы баров в формате yfinance и их длительность
+INTRADAY_INTERVALS = {
+    '1m': pd.Timedelta(minutes=1),
+    '2m': pd.Timedelta(minutes=2),
+    '5m': pd.Timedelta(minutes=5),
+    '15m': pd.Timedelta(minutes=15),
+    '30m': pd.Timedelta(minutes=30),
+    '60m': pd.Timedelta(hours=1),
+    '90m': pd.Timedelta(minutes=90),
+    '1h': pd.Timedelta(hours=1),
+}
+MARKET_OPEN = pd.Timedelta(hours=9, minutes=30)  # Время открытия и закрытия основной сессии (Нью-Йорк)
+MARKET_CLOSE = pd.Timedelta(hours=16)
+
+
+def is_intraday(interval):
+    """
+    Возвращает True для внутридневного интервала баров ('1m', '5m', '1h', ...).
+    """
+    return interval in INTRADAY_INTERVALS
+
+
+def period_to_start(period, today=None):
+    """
+    Переводит период в формате yfinance ('5d', '1mo', '1y', 'ytd', ...) в дату начала.
+
+    Параметры:
+        period (str): Период для данных.
+        today (pd.Timestamp, optional): Текущая дата (по умолчанию сегодняшняя дата).
+
+    Возвращает:
+        pd.Timestamp: Дата начала периода или None для периода 'max'.
+    """
+    today = pd.Timestamp(today if today is not None else pd.Timestamp.today()).normalize()
+    if period == 'max':
+        return None
+    if period == 'ytd':
+        return pd.Timestamp(year=today.year, month=1, day=1)
+
+    # Разбираем число и единицу измерения: '5d', '1mo', '10y'
+    units = {'d': 'days', 'wk': 'weeks', 'mo': 'months', 'y': 'years'}
+    for suffix, unit in units.items():
+        if period.endswith(suffix) and period[:-len(suffix)].isdigit():
+            return today - pd.DateOffset(**{unit: int(period[:-len(suffix)])})
+    raise ValueError(f"Неизвестный период: {period}")
+
+
+class DataProvider:
+    """
+    Интерфейс поставщика данных о ценах акций.
+
+    Поставщик должен реализовать метод history, совместимый с yf.Ticker(ticker).history:
+    возвращать DataFrame со столбцами OHLCV и индексом из дат. Параметр interval задает длительность бара
+    ('1d' для дневных баров, '1m', '5m', '1h' и т. д. для внутридневных).
+    """
+
+    def history(self, ticker, period=None, start=None, end=None, interval='1d'):
+        raise NotImplementedError
+
+
+class YahooProvider(DataProvider):
+    """
+    Поставщик данных, загружающий котировки через yfinance.
+    """
+
+    @traced()
+    def history(self, ticker, period=None, start=None, end=None, interval='1d'):
+        import yfinance as yf  # Импортируется только при обращении к сети: при попадании в кэш не нужен
+        if start is not None:
+            return yf.Ticker(ticker).history(start=start, end=end, interval=interval)
+        return yf.Ticker(ticker).history(period=period or '1mo', interval=interval)
+
+
+class FakeProvider(DataProvider):
+    """
+    Локальный поставщик синтетических данных для тестов и бенчмарков без сети.
+
+    Для каждого тикера генерируется детерминированное случайное блуждание по рабочим дням,
+    поэтому повторные запросы одного и того же диапазона возвращают одинаковые данные.
+    Внутридневные бары каждого дня строятся от цены открытия до цены закрытия дневного бара
+    и генерируются только для запрошенных дней.
+
+    Параметры:
+        latency (float, optional): Искусственная задержка каждого запроса в секундах (по умолчанию 0).
+        base_date (str, optional): Первая дата синтетической истории (по умолчанию '2000-01-03').
+        today (str, optional): Дата, считающаяся сегодняшней (по умолчанию сегодняшняя дата).
+        failures (dict, optional): Сколько раз подряд запрос по тикеру должен завершиться ошибкой
+            ConnectionError перед успешным ответом (для проверки повторных попыток).
+    """
+
+    def __init__(self, latency=0.0, base_date='2000-01-03', today=None, failures=None):
+        self.latency = latency
+        self.failures = dict(failures or {})
+        self.base_date = pd.Timestamp(base_date)
+        self.today = pd.Timestamp(today).normalize() if today is not None else None
+        self.calls = []  # Журнал запросов: (ticker, start, end)
+        self._frames = {}  # Сгенерированная дневная история по тикерам
+
+    def _generate(self, ticker):
+        # Генерируем всю историю от base_date, чтобы значения не зависели от запрошенного диапазона
+        dates = pd.date_range(self.base_date, self._today())
+        dates = dates[dates.dayofweek < 5]  # Только рабочие дни
+        rng = np.random.default_rng(zlib.crc32(ticker.encode()))
+        returns = rng.normal(0.0003, 0.02, len(dates))
+        close = 100 * np.exp(np.cumsum(returns))
+        spread = np.abs(rng.normal(0, 0.01, len(dates))) * close
+        open_ = close * (1 + rng.normal(0, 0.005, len(dates)))
+        return pd.DataFrame({
+            'Open': open_,
+            'High': np.maximum(open_, close) + spread,
+            'Low': np.minimum(open_, close) - spread,
+            'Close': close,
+            'Volume': rng.integers(1_000_000, 50_000_000, len(dates)),
+            'Dividends': 0.0,
+            'Stock Splits': 0.0,
+        }, index=pd.DatetimeIndex(dates, name='Date').tz_localize('America/New_York'))
+
+    def _generate_intraday(self, ticker, daily, interval):
+        # Каждый день генерируется со своим начальным значением, чтобы бары не зависели от запрошенного диапазона
+        step = INTRADAY_INTERVALS[interval]
+        offsets = pd.timedelta_range(MARKET_OPEN, MARKET_CLOSE - pd.Timedelta(1), freq=step)
+        n_bars = len(offsets)
+        seed = zlib.crc32(f"{ticker}@{interval}".encode())
+        frames = []
+        for day, bar in zip(daily.index, daily.itertuples(index=False)):
+            rng = np.random.default_rng((seed, day.toordinal()))
+            # Броуновский мост от логарифма цены открытия до логарифма цены закрытия дня
+            steps = np.cumsum(rng.normal(0, 0.02 / np.sqrt(n_bars), n_bars))
+            fraction = np.arange(1, n_bars + 1) / n_bars
+            log_close = (np.log(bar.Open) + fraction * (np.log(bar.Close) - np.log(bar.Open))
+                         + steps - fraction * steps[-1])
+            close = np.exp(log_close)
+            open_ = np.concatenate(([bar.Open], close[:-1]))
+            spread = np.abs(rng.normal(0, 0.002, n_bars)) * close
+            weights = rng.random(n_bars)
+            frames.append(pd.DataFrame({
+                'Open': open_,
+                'High': np.maximum(open_, close) + spread,
+                'Low': np.minimum(open_, close) - spread,
+                'Close': close,
+                'Volume': (weights / weights.sum() * bar.Volume).astype(np.int64),
+                'Dividends': 0.0,
+                'Stock Splits': 0.0,
+            }, index=day.tz_localize(None) + offsets))
+        if not frames:
+            return daily.iloc[:0]
+        data = pd.concat(frames)
+        data.index = data.index.tz_localize('America/New_York').rename('Datetime')  # Так называет индекс yfinance
+        return data
+
+    def _today(self):
+        return self.today if self.today is not None else pd.Timestamp.today().normalize()
+
+    @traced()
+    def history(self, ticker, period=None, start=None, end=None, interval='1d'):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.failures.get(ticker, 0) > 0:
+            self.failures[ticker] -= 1
+            raise ConnectionError(f"Искусственный сбой загрузки данных для {ticker}")
+
+        if start is None:
+            start = period_to_start(period or '1mo', self._today())
+        start = pd.Timestamp(start) if start is not None else self.base_date
+        end = pd.Timestamp(end) if end is not None else self._today() + pd.Timedelta(days=1)
+        end = min(end, self._today() + pd.Timedelta(days=1))  # Данных из будущего нет
+        if interval != '1d' and not is_intraday(interval):
+            raise ValueError(f"Интервал '{interval}' не поддерживается FakeProvider.")
+        self.calls.append((ticker, start, end))
+
+        data = self._frames.get(ticker)
+        if data is None:
+            data = self._frames[ticker] = self._generate(ticker)
+        dates = data.index.tz_localize(None)
+        mask = (dates >= start) & (dates < end)
+        if is_intraday(interval):
+            return self._generate_intraday(ticker, data[mask], interval)
+        return data[mask]
+
+
+_default_provider = None
+
+
+def get_default_provider():
+    """
+    Возвращает поставщика данных по умолчанию (YahooProvider, если не задан другой).
+    """
+    global _default_provider
+    if _default_provider is None:
+        _default_provider = YahooProvider()
+    return _default_provider
+
+
+def set_default_provider(provider):
+    """
+    Устанавливает поставщика данных по умолчанию, например FakeProvider для тестов.
+
+    Параметры:
+        provider (DataProvider): Новый поставщик данных или None для возврата к YahooProvider.
+    """
+    global _default_provider
+    _default_provider = provider
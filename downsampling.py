@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+
+METHODS = ('lttb', 'minmax')
+
+
+def _positions(data):
+    """
+    Возвращает координаты точек по оси x: время индекса в наносекундах или номера строк.
+    """
+    if 'Date' in data:
+        return pd.DatetimeIndex(pd.to_datetime(data['Date'])).asi8.astype(np.float64)
+    if pd.api.types.is_datetime64_any_dtype(data.index):
+        return data.index.asi8.astype(np.float64)
+    return np.arange(len(data), dtype=np.float64)
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Выбирает точки ряда алгоритмом Largest-Triangle-Three-Buckets.
+
+    Первая и последняя точки сохраняются, остальные делятся на n_out - 2 корзины. Из каждой корзины берется точка,
+    образующая треугольник наибольшей площади с точкой, выбранной в предыдущей корзине, и средней точкой следующей
+    корзины, поэтому пики и провалы остаются на графике.
+
+    Параметры:
+        x: Массив координат по оси x (по возрастанию).
+        y: Массив значений без NaN.
+        n_out (int): Сколько точек оставить.
+
+    Возвращает:
+        numpy.ndarray: Номера выбранных точек по возрастанию.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n) if n_out >= n else np.unique([0, n - 1])[:max(n_out, 0)]
+
+    edges = (np.arange(n_out - 1) * (n - 2) / (n_out - 2)).astype(np.int64) + 1
+    edges[-1] = n - 1
+    # Средние точки корзин считаются заранее для всех корзин сразу
+    x_sums = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    y_sums = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    x_means = np.append(x_sums / counts, x[-1])
+    y_means = np.append(y_sums / counts, y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for bucket in range(n_out - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        ax, ay = x[previous], y[previous]
+        bx, by = x_means[bucket + 1], y_means[bucket + 1]
+        # Удвоенная площадь треугольника; знак не важен
+        areas = np.abs((ax - bx) * (y[start:stop] - ay) - (ax - x[start:stop]) * (by - ay))
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def minmax_indices(y, n_out):
+    """
+    Выбирает точки ряда корзинами минимум/максимум: ряд делится на (n_out - 2) // 2 корзин, из каждой берутся
+    точки с минимальным и максимальным значением. Первая и последняя точки сохраняются.
+
+    Параметры:
+        y: Массив значений без NaN.
+        n_out (int): Сколько точек оставить (не больше).
+
+    Возвращает:
+        numpy.ndarray: Номера выбранных точек по возрастанию.
+    """
+    n = len(y)
+    n_buckets = (n_out - 2) // 2
+    if n_out >= n or n_buckets < 1:
+        return np.arange(n) if n_out >= n else np.unique([0, n - 1])[:max(n_out, 0)]
+
+    # Корзины одинаковой длины; хвост последней корзины дополняется значениями, которые не могут быть выбраны
+    size = -(-n // n_buckets)
+    n_buckets = -(-n // size)  # Без корзин, целиком состоящих из дополнения
+    padding = size * n_buckets - n
+    low = np.concatenate((y, np.full(padding, np.inf))).reshape(n_buckets, size)
+    high = np.concatenate((y, np.full(padding, -np.inf))).reshape(n_buckets, size)
+    offsets = np.arange(n_buckets) * size
+    minima = offsets + low.argmin(axis=1)
+    maxima = offsets + high.argmax(axis=1)
+    return np.unique(np.concatenate(([0, n - 1], minima, maxima)))
+
+
+def select_indices(x, y, n_out, method='lttb'):
+    """
+    Выбирает не более n_out точек ряда методом 'lttb' или 'minmax'. NaN пропускаются.
+
+    Возвращает:
+        numpy.ndarray: Номера выбранных точек исходного ряда по возрастанию.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    valid = np.flatnonzero(~np.isnan(y))
+    if method == 'lttb':
+        chosen = lttb_indices(np.asarray(x, dtype=np.float64)[valid], y[valid], n_out)
+    elif method == 'minmax':
+        chosen = minmax_indices(y[valid], n_out)
+    else:
+        raise ValueError(f"Неизвестный метод прореживания '{method}'. Доступные методы: {', '.join(METHODS)}.")
+    return valid[chosen]
+
+
+def downsample(data, max_points, method='lttb', columns=None):
+    """
+    Прореживает данные для построения графика, сохраняя видимые пики и провалы.
+
+    Для каждого столбца точки выбираются отдельно, а в результат попадают строки, выбранные хотя бы для одного
+    столбца. Бюджет точек делится между столбцами, поэтому ни один ряд на графике не получит больше max_points точек.
+
+    Параметры:
+        data: DataFrame с данными о ценах акций и индикаторами.
+        max_points (int): Наибольшее число точек на ряд.
+        method (str, optional): 'lttb' (Largest-Triangle-Three-Buckets) или 'minmax' (минимум и максимум
+            в каждой корзине) (по умолчанию 'lttb').
+        columns (list, optional): По каким столбцам выбирать точки (по умолчанию Close и индикаторы,
+            которые есть в данных).
+
+    Возвращает:
+        data: DataFrame с выбранными строками в исходном порядке или исходный DataFrame, если строк не больше
+        max_points.
+    """
+    if max_points is None or len(data) <= max_points:
+        return data
+    if columns is None:
+        columns = [column for column in ('Close', 'Moving_Average', 'RSI', 'MACD', 'Signal', 'Histogram')
+                   if column in data.columns]
+    if not columns:
+        return data
+
+    x = _positions(data)
+    budget = max(3, max_points // len(columns))
+    rows = np.unique(np.concatenate([select_indices(x, data[column].to_numpy(dtype=np.float64), budget, method)
+                                     for column in columns]))
+    return data.iloc[rows]
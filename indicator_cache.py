@@ -0,0 +1,467 @@
+import copy
+import glob
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import data_download as dd
+import streaming_indicators as si
+from tracing import traced
+
+DEFAULT_CACHE_DIR = os.environ.get('STOCKS_INDICATOR_CACHE_DIR')  # None — только кэш в памяти
+DEFAULT_MAX_BYTES = 256 * 2 ** 20
+DEFAULT_MAX_DISK_BYTES = 1024 * 2 ** 20
+
+FINGERPRINT_BARS = 64  # По первым барам ряда ищутся записи, которые можно продлить
+EXTEND_MAX_BARS = 1_000  # Больше новых баров быстрее пересчитать целиком средствами pandas
+# Наибольшая длина истории, которую сразу прогоняют через потоковый калькулятор без сохраненного состояния:
+# на более длинной истории прогон по одному бару медленнее полного пересчета pandas, поэтому он выполняется
+# только при втором продлении ряда, когда видно, что ряд продлевается регулярно
+REPLAY_MAX_BARS = 500
+# Калькуляторы, которые восстанавливают состояние по истории одним векторизованным расчетом, а не прогоном по барам
+VECTORIZED_HISTORY = (si.StreamingMACD,)
+
+# Индикатор → (функция расчета, столбцы результата, потоковый калькулятор с теми же параметрами)
+INDICATORS = {
+    'moving_average': (dd.add_moving_average, ('Moving_Average',), si.StreamingSMA),
+    'rsi': (dd.add_rsi, ('RSI',), si.StreamingRSI),
+    'macd': (dd.add_macd, ('MACD', 'Signal', 'Histogram'), si.StreamingMACD),
+}
+
+
+def _digest(values):
+    """
+    Возвращает хеш содержимого массива (blake2b, 16 байт).
+    """
+    return hashlib.blake2b(np.ascontiguousarray(values).data, digest_size=16).digest()
+
+
+def _digests(values, lengths):
+    """
+    Возвращает хеши начальных отрезков массива заданной длины и всего массива за один проход:
+    {длина: хеш}.
+    """
+    values = np.ascontiguousarray(values)
+    hasher = hashlib.blake2b(digest_size=16)
+    digests = {}
+    position = 0
+    for length in sorted(lengths) + [len(values)]:
+        hasher.update(values[position:length].data)
+        digests[length] = hasher.copy().digest()
+        position = length
+    return digests
+
+
+def _read_only(arrays):
+    for array in arrays:
+        array.flags.writeable = False
+    return arrays
+
+
+class IndicatorCache:
+    """
+    Кэш индикаторов по содержимому цен закрытия: результаты add_moving_average, add_rsi и add_macd
+    возвращаются в новом DataFrame, исходные данные не изменяются, а массивы в кэше доступны только для чтения.
+
+    Если к уже посчитанному ряду только добавились новые бары, кэш находит запись для начала ряда и
+    досчитывает индикатор для новых баров потоковыми калькуляторами (streaming_indicators); результат
+    совпадает с полным расчетом бит в бит.
+
+    Пример:
+        cache = get_default_cache()
+        data = cache.rsi(data, period=14)
+        print(cache.metrics())
+
+    Ключ записи — индикатор, параметры, тип данных, число баров и хеш массива 'Close'; индекс DataFrame
+    в ключ не входит, результат собирается на индексе переданных данных.
+
+    Параметры:
+        max_bytes (int, optional): Наибольший объем массивов в памяти (по умолчанию 256 МБ).
+        max_disk_bytes (int, optional): Наибольший объем файлов в cache_dir (по умолчанию 1 ГБ). При превышении
+            удаляются файлы, к которым дольше всего не обращались.
+        cache_dir (str, optional): Каталог для записей на диске (по умолчанию значение переменной окружения
+            STOCKS_INDICATOR_CACHE_DIR; None — только кэш в памяти). Файлы читаются через pickle, поэтому
+            каталог не должен быть доступен для записи посторонним.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, cache_dir=DEFAULT_CACHE_DIR,
+                 max_disk_bytes=DEFAULT_MAX_DISK_BYTES):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.stats = {'hits': 0, 'disk_hits': 0, 'extensions': 0, 'misses': 0,
+                      'rows_computed': 0, 'rows_extended': 0, 'disk_evictions': 0}
+        self._entries = OrderedDict()  # ключ → запись, от давно использованных к недавним
+        self._prefixes = {}  # (индикатор, параметры, тип, отпечаток первых баров) → множество ключей
+        self._bytes = 0
+        self._disk_bytes = None  # Объем файлов в cache_dir; None — еще не подсчитан
+        self._lock = threading.Lock()  # Кэш используется из потоков сервиса и пакетной обработки
+
+    @traced()
+    def moving_average(self, data, window_size=5):
+        """
+        Возвращает копию данных со столбцом 'Moving_Average' (как add_moving_average).
+
+        Параметры:
+            data: DataFrame с данными о ценах акций.
+            window_size (int, optional): Размер окна для расчета скользящего среднего (по умолчанию 5).
+
+        Возвращает:
+            data: Новый DataFrame с добавленным столбцом или None, если произошла ошибка.
+        """
+        return self._assign(data, [('moving_average', (window_size,))])
+
+    @traced()
+    def rsi(self, data, period=14):
+        """
+        Возвращает копию данных со столбцом 'RSI' (как add_rsi).
+
+        Параметры:
+            data: DataFrame с данными о ценах акций.
+            period (int, optional): Период для расчета RSI (по умолчанию 14).
+
+        Возвращает:
+            data: Новый DataFrame с добавленным столбцом или None, если произошла ошибка.
+        """
+        return self._assign(data, [('rsi', (period,))])
+
+    @traced()
+    def macd(self, data, fast_period=12, slow_period=26, signal_period=9):
+        """
+        Возвращает копию данных со столбцами 'MACD', 'Signal' и 'Histogram' (как add_macd).
+
+        Параметры:
+            data: DataFrame с данными о ценах акций.
+            fast_period (int, optional): Период для быстрого EMA (по умолчанию 12).
+            slow_period (int, optional): Период для медленного EMA (по умолчанию 26).
+            signal_period (int, optional): Период для сигнальной линии EMA (по умолчанию 9).
+
+        Возвращает:
+            data: Новый DataFrame с добавленными столбцами или None, если произошла ошибка.
+        """
+        return self._assign(data, [('macd', (fast_period, slow_period, signal_period))])
+
+    @traced()
+    def indicators(self, data, window_size=5, rsi_period=14, fast_period=12, slow_period=26, signal_period=9):
+        """
+        Возвращает копию данных со столбцами 'Moving_Average', 'RSI', 'MACD', 'Signal' и 'Histogram'.
+        Цены закрытия хешируются один раз для всех индикаторов.
+
+        Параметры:
+            data: DataFrame с данными о ценах акций.
+            window_size (int, optional): Размер окна для расчета скользящего среднего (по умолчанию 5).
+            rsi_period (int, optional): Период для расчета RSI (по умолчанию 14).
+            fast_period (int, optional): Период для быстрого EMA (по умолчанию 12).
+            slow_period (int, optional): Период для медленного EMA (по умолчанию 26).
+            signal_period (int, optional): Период для сигнальной линии EMA (по умолчанию 9).
+
+        Возвращает:
+            data: Новый DataFrame с добавленными столбцами или None, если произошла ошибка.
+        """
+        return self._assign(data, [('moving_average', (window_size,)), ('rsi', (rsi_period,)),
+                                   ('macd', (fast_period, slow_period, signal_period))])
+
+    def metrics(self):
+        """
+        Возвращает счетчики кэша, долю запросов без полного пересчета (hit_rate), число записей и объем в памяти.
+        """
+        with self._lock:
+            result = dict(self.stats, entries=len(self._entries), bytes=self._bytes)
+        requests = result['hits'] + result['disk_hits'] + result['extensions'] + result['misses']
+        result['hit_rate'] = (requests - result['misses']) / requests if requests else 0.0
+        return result
+
+    def clear(self, disk=False):
+        """
+        Очищает кэш в памяти и, если disk=True, удаляет записи на диске.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._prefixes.clear()
+            self._bytes = 0
+        if disk and self.cache_dir:
+            for path in glob.glob(os.path.join(glob.escape(self.cache_dir), '*.pkl')):
+                os.remove(path)
+            with self._lock:
+                self._disk_bytes = 0
+
+    def _assign(self, data, requests):
+        if not isinstance(data, pd.DataFrame):
+            print("Ошибка: Переданные данные не являются DataFrame.")
+            return None
+
+        if 'Close' not in data.columns:
+            print("Ошибка: В DataFrame отсутствует колонка 'Close'.")
+            return None
+        columns = {}
+        for (indicator, _), arrays in zip(requests, self._lookup(data['Close'].to_numpy(), requests)):
+            columns.update(zip(INDICATORS[indicator][1], arrays))
+        # assign создает новый DataFrame и копирует массивы, поэтому изменения результата не затронут кэш
+        return data.assign(**columns)
+
+    def _lookup(self, close, requests):
+        """
+        Возвращает массивы индикаторов для цен закрытия close по списку запросов [(индикатор, параметры), ...].
+        """
+        if close.dtype.hasobject:
+            return [self._compute(indicator, params, close)['columns'] for indicator, params in requests]
+
+        dtype = close.dtype.name
+        fingerprint = _digest(close[:FINGERPRINT_BARS]) if len(close) >= FINGERPRINT_BARS else None
+        prefix_keys = [(indicator, params, dtype, fingerprint) if fingerprint is not None else None
+                       for indicator, params in requests]
+        candidates = [self._candidates(prefix_key, close) for prefix_key in prefix_keys]
+        digests = _digests(close, {key[3] for found in candidates for key in found})
+        return [self._columns(indicator, params, close, prefix_key, found, digests)
+                for (indicator, params), prefix_key, found in zip(requests, prefix_keys, candidates)]
+
+    def _columns(self, indicator, params, close, prefix_key, candidates, digests):
+        """
+        Возвращает массивы одного индикатора: из памяти, с диска, продлением записи для начала ряда
+        или полным расчетом.
+        """
+        key = (indicator, params, close.dtype.name, len(close), digests[len(close)])
+        entry = self._get(key)
+        if entry is not None:
+            self._count('hits')
+            return entry['columns']
+
+        entry = self._load(self._path(key, prefix_key))
+        if entry is not None:
+            self._count('disk_hits')
+            self._put(key, prefix_key, entry)
+            return entry['columns']
+
+        previous = self._find_prefix(candidates, digests)
+        if previous is not None:
+            previous_key, entry = previous
+            if self._replay_pays_off(indicator, previous_key[3], entry):
+                entry = self._extend(indicator, params, entry, close)
+                self._count('extensions')
+                self._count('rows_extended', len(close) - previous_key[3])
+            else:
+                # Пересчет целиком быстрее прогона истории; при следующем продлении история будет прогнана
+                entry = dict(self._compute(indicator, params, close), replay=True)
+            self._discard(previous_key, prefix_key)  # Новая запись заменяет исходную
+        else:
+            entry = self._compute(indicator, params, close)
+        self._put(key, prefix_key, entry)
+        self._save(self._path(key, prefix_key), entry)
+        return entry['columns']
+
+    def _compute(self, indicator, params, close):
+        function, columns, _ = INDICATORS[indicator]
+        frame = function(pd.DataFrame({'Close': close}), *params)
+        self._count('misses')
+        self._count('rows_computed', len(close))
+        return {'columns': _read_only(tuple(frame[column].to_numpy() for column in columns)), 'state': None}
+
+    def _candidates(self, prefix_key, close):
+        """
+        Возвращает записи, которые могут совпадать с началом close и которые выгодно продлить:
+        {ключ: путь к файлу или None для записи в памяти}.
+        """
+        # Потоковые калькуляторы повторяют pandas бит в бит только для float64 (add_rsi считает разности в типе данных)
+        if prefix_key is None or close.dtype != np.float64:
+            return {}
+        with self._lock:
+            found = {key: None for key in self._prefixes.get(prefix_key, ())}
+        for path in self._disk_candidates(prefix_key):
+            length, digest = os.path.basename(path)[:-len('.pkl')].rsplit('-', 2)[1:]
+            found.setdefault(prefix_key[:3] + (int(length), bytes.fromhex(digest)), path)
+        return {key: path for key, path in found.items() if 0 < len(close) - key[3] <= EXTEND_MAX_BARS}
+
+    def _find_prefix(self, candidates, digests):
+        """
+        Возвращает самую длинную запись, совпадающую с началом ряда, в виде (ключ, запись) или None.
+        """
+        for key in sorted(candidates, key=lambda key: key[3], reverse=True):
+            length, digest = key[3:]
+            if digests[length] != digest:
+                continue
+            entry = self._get(key) if candidates[key] is None else self._load(candidates[key])
+            if entry is None:
+                continue
+            return key, entry
+        return None
+
+    @staticmethod
+    def _replay_pays_off(indicator, length, entry):
+        """
+        Проверяет, выгоднее ли продлить запись длины length потоковым калькулятором, чем пересчитать ряд целиком.
+        """
+        return (entry['state'] is not None or length <= REPLAY_MAX_BARS or entry.get('replay', False)
+                or INDICATORS[indicator][2] in VECTORIZED_HISTORY)
+
+    def _extend(self, indicator, params, entry, close):
+        """
+        Досчитывает индикатор для баров, добавленных после записи entry, и возвращает новую запись.
+        """
+        _, columns, calculator_class = INDICATORS[indicator]
+        length = len(entry['columns'][0])
+        if entry['state'] is None:
+            calculator = calculator_class.from_history(close[:length], *params)
+        else:
+            calculator = copy.deepcopy(entry['state'])  # Состояние исходной записи может продлевать другой поток
+        values = np.array(calculator.update_many(close[length:]), dtype=np.float64).reshape(len(close) - length, -1)
+        arrays = tuple(np.concatenate([old, values[:, number]]) for number, old in enumerate(entry['columns']))
+        return {'columns': _read_only(arrays), 'state': calculator}
+
+    def _count(self, name, value=1):
+        with self._lock:
+            self.stats[name] += value
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _put(self, key, prefix_key, entry):
+        entry['prefix_key'] = prefix_key
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = entry
+            self._bytes += sum(array.nbytes for array in entry['columns'])
+            if prefix_key is not None:
+                self._prefixes.setdefault(prefix_key, set()).add(key)
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= sum(array.nbytes for array in entry['columns'])
+        keys = self._prefixes.get(entry['prefix_key'])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._prefixes[entry['prefix_key']]
+
+    def _discard(self, key, prefix_key):
+        with self._lock:
+            self._remove(key)
+        path = self._path(key, prefix_key)
+        if path is not None and os.path.exists(path):
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+            except OSError:
+                return  # Файл мог удалить другой процесс
+            with self._lock:
+                if self._disk_bytes is not None:
+                    self._disk_bytes -= size
+
+    def _path(self, key, prefix_key):
+        if not self.cache_dir:
+            return None
+        indicator, params, dtype, length, digest = key
+        fingerprint = prefix_key[3].hex() if prefix_key is not None else 'short'
+        name = f"{indicator}-{'_'.join(map(str, params))}-{dtype}-{fingerprint}-{length}-{digest.hex()}.pkl"
+        return os.path.join(self.cache_dir, name)
+
+    def _disk_candidates(self, prefix_key):
+        if not self.cache_dir:
+            return []
+        indicator, params, dtype, fingerprint = prefix_key
+        pattern = f"{indicator}-{'_'.join(map(str, params))}-{dtype}-{fingerprint.hex()}-*.pkl"
+        return glob.glob(os.path.join(glob.escape(self.cache_dir), pattern))
+
+    def _load(self, path):
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as file:
+                entry = pickle.load(file)
+        except Exception as e:
+            print(f"Не удалось прочитать запись кэша индикаторов {path}: {e}")
+            return None
+        _read_only(entry['columns'])
+        try:
+            os.utime(path)  # Время изменения файла служит временем последнего обращения для очистки каталога
+        except OSError:
+            pass
+        return entry
+
+    def _save(self, path, entry):
+        if path is None:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temporary, 'wb') as file:
+                pickle.dump({'columns': entry['columns'], 'state': entry['state'],
+                             'replay': entry.get('replay', False)}, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, path)  # Читатели видят либо старый файл, либо полностью записанный новый
+        except OSError as e:
+            print(f"Не удалось сохранить запись кэша индикаторов {path}: {e}")
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            return
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes += os.path.getsize(path)
+            over_budget = self._disk_bytes is None or self._disk_bytes > self.max_disk_bytes
+        if over_budget:
+            self._trim_disk(keep=path)
+
+    def _trim_disk(self, keep=None):
+        """
+        Пересчитывает объем файлов в каталоге кэша и, если он больше max_disk_bytes, удаляет файлы
+        от давно использованных к недавним. Файл keep (только что записанный) не удаляется.
+        """
+        files = []
+        for path in glob.glob(os.path.join(glob.escape(self.cache_dir), '*.pkl')):
+            try:
+                info = os.stat(path)
+            except OSError:
+                continue  # Файл удалил другой процесс
+            files.append((info.st_mtime, info.st_size, path))
+        total = sum(size for _, size, _ in files)
+        evicted = 0
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+        with self._lock:
+            self._disk_bytes = total
+            self.stats['disk_evictions'] += evicted
+
+
+_default_cache = None
+
+
+def get_default_cache():
+    """
+    Возвращает кэш индикаторов по умолчанию.
+    """
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = IndicatorCache()
+    return _default_cache
+
+
+def set_default_cache(cache):
+    """
+    Устанавливает кэш индикаторов по умолчанию.
+
+    Параметры:
+        cache (IndicatorCache): Новый кэш или None для кэша с параметрами по умолчанию.
+    """
+    global _default_cache
+    _default_cache = cache
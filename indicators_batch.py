@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+
+from tracing import traced
+
+
+def to_wide(results, column='Close'):
+    """
+    Собирает столбец из словаря {тикер: DataFrame} в широкий DataFrame (время × тикер).
+
+    Параметры:
+        results (dict): Словарь с данными тикеров, например результат batch_download.fetch_many.
+        column (str, optional): Какой столбец взять из каждого DataFrame (по умолчанию 'Close').
+
+    Возвращает:
+        data: DataFrame, в котором строки — даты, а столбцы — тикеры. Отсутствующие бары заполнены NaN.
+    """
+    return pd.concat({ticker: data[column] for ticker, data in results.items()}, axis=1).sort_index()
+
+
+def _pack(values):
+    """
+    Сдвигает значения каждого столбца к началу, убирая NaN.
+
+    После упаковки у всех тикеров история начинается с первой строки, поэтому скользящие окна и EMA
+    считаются так же, как по отдельному DataFrame тикера без пропущенных баров.
+
+    Возвращает:
+        tuple: (packed, order, mask), где order — исходные номера строк для каждой упакованной строки.
+    """
+    mask = ~np.isnan(values)
+    if mask.all():
+        return values, None, mask
+    order = np.argsort(~mask, axis=0, kind='stable')  # Сначала строки со значениями, в исходном порядке
+    packed = np.take_along_axis(values, order, axis=0)
+    return packed, order, mask
+
+
+def _unpack(packed, order, mask):
+    """
+    Возвращает упакованный результат на исходные строки; на месте пропущенных баров остается NaN.
+    """
+    if order is None:
+        return packed
+    result = np.empty_like(packed)
+    np.put_along_axis(result, order, packed, axis=0)
+    result[~mask] = np.nan
+    return result
+
+
+def _as_array(prices):
+    if isinstance(prices, pd.DataFrame):
+        return prices.to_numpy(dtype=np.float64)
+    values = np.asarray(prices, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[:, None]
+    if values.ndim != 2:
+        raise ValueError("Ожидается двумерный массив цен закрытия (время × тикер).")
+    return values
+
+
+def _wrap(result, prices):
+    if isinstance(prices, pd.DataFrame):
+        return pd.DataFrame(result, index=prices.index, columns=prices.columns)
+    return result
+
+
+def _moving_average(close, window_size):
+    return close.rolling(window=window_size).mean()
+
+
+def _rsi(close, period):
+    # Те же операции, что и в data_download.add_rsi, но сразу для всех столбцов
+    delta = close.diff()
+    up = delta.clip(lower=0)
+    down = -1 * delta.clip(upper=0)
+    average_up = up.rolling(window=period).mean()
+    average_down = down.rolling(window=period).mean()
+    rs = average_up / average_down
+    return 100 - (100 / (1 + rs))
+
+
+def _macd(close, fast_period, slow_period, signal_period):
+    # Те же операции, что и в data_download.add_macd, но сразу для всех столбцов
+    fast_ema = close.ewm(span=fast_period, adjust=False).mean()
+    slow_ema = close.ewm(span=slow_period, adjust=False).mean()
+    macd = fast_ema - slow_ema
+    signal = macd.ewm(span=signal_period, adjust=False).mean()
+    return macd, signal, macd - signal
+
+
+@traced()
+def compute_indicators_batch(prices, window_size=5, rsi_period=14, fast_period=12, slow_period=26, signal_period=9,
+                             indicators=('Moving_Average', 'RSI', 'MACD')):
+    """
+    Рассчитывает скользящее среднее, RSI и MACD сразу для всех тикеров.
+
+    Принимает цены закрытия в широком формате (строки — время, столбцы — тикеры). NaN означает, что у тикера
+    нет бара в эту дату (например, акция еще не торговалась): такие строки исключаются из расчета для этого
+    тикера, поэтому результат совпадает с вызовом add_moving_average, add_rsi и add_macd для DataFrame
+    каждого тикера по отдельности.
+
+    Параметры:
+        prices: Широкий DataFrame или двумерный массив NumPy с ценами закрытия.
+        window_size (int, optional): Размер окна скользящего среднего (по умолчанию 5).
+        rsi_period (int, optional): Период для расчета RSI (по умолчанию 14).
+        fast_period (int, optional): Период для быстрого EMA (по умолчанию 12).
+        slow_period (int, optional): Период для медленного EMA (по умолчанию 26).
+        signal_period (int, optional): Период для сигнальной линии EMA (по умолчанию 9).
+        indicators (tuple, optional): Какие индикаторы рассчитывать: 'Moving_Average', 'RSI', 'MACD'.
+
+    Возвращает:
+        dict: Словарь {'Moving_Average', 'RSI', 'MACD', 'Signal', 'Histogram'} с результатами того же
+        типа и формы, что и prices.
+    """
+    packed, order, mask = _pack(_as_array(prices))
+    close = pd.DataFrame(packed)
+
+    computed = {}
+    if 'Moving_Average' in indicators:
+        computed['Moving_Average'] = _moving_average(close, window_size)
+    if 'RSI' in indicators:
+        computed['RSI'] = _rsi(close, rsi_period)
+    if 'MACD' in indicators:
+        computed['MACD'], computed['Signal'], computed['Histogram'] = _macd(close, fast_period, slow_period,
+                                                                           signal_period)
+
+    return {name: _wrap(_unpack(frame.to_numpy(), order, mask), prices) for name, frame in computed.items()}
+
+
+def batch_moving_average(prices, window_size=5):
+    """
+    Рассчитывает скользящее среднее для всех тикеров (см. compute_indicators_batch).
+
+    Возвращает:
+        Результат того же типа и формы, что и prices.
+    """
+    return compute_indicators_batch(prices, window_size=window_size, indicators=('Moving_Average',))['Moving_Average']
+
+
+def batch_rsi(prices, period=14):
+    """
+    Рассчитывает RSI для всех тикеров (см. compute_indicators_batch).
+
+    Возвращает:
+        Результат того же типа и формы, что и prices.
+    """
+    return compute_indicators_batch(prices, rsi_period=period, indicators=('RSI',))['RSI']
+
+
+def batch_macd(prices, fast_period=12, slow_period=26, signal_period=9):
+    """
+    Рассчитывает MACD, сигнальную линию и гистограмму для всех тикеров (см. compute_indicators_batch).
+
+    Возвращает:
+        dict: Словарь {'MACD', 'Signal', 'Histogram'} с результатами того же типа и формы, что и prices.
+    """
+    return compute_indicators_batch(prices, fast_period=fast_period, slow_period=slow_period,
+                                    signal_period=signal_period, indicators=('MACD',))
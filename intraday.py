@@ -0,0 +1,149 @@
+import numpy as np
+import pandas as pd
+
+# Как агрегируются столбцы OHLCV при передискретизации; остальные столбцы берутся по последнему бару
+OHLCV_AGGREGATION = {
+    'Open': 'first',
+    'High': 'max',
+    'Low': 'min',
+    'Close': 'last',
+    'Volume': 'sum',
+    'Dividends': 'sum',
+    'Stock Splits': 'max',
+}
+
+
+def to_compact(data, ticker=None):
+    """
+    Переводит данные в компактное представление: цены и другие вещественные столбцы — float32,
+    объем — наименьший подходящий целочисленный тип, тикер — категориальный столбец.
+
+    float32 хранит около 7 значащих цифр, чего достаточно для цен акций, и вдвое уменьшает объем памяти.
+
+    Параметры:
+        data: DataFrame с данными о ценах акций.
+        ticker (str, optional): Если указан, добавляется категориальный столбец 'Ticker' с этим значением.
+
+    Возвращает:
+        data: Новый DataFrame с компактными типами столбцов.
+    """
+    columns = {}
+    for column in data.columns:
+        values = data[column]
+        if column == 'Volume':
+            if values.isna().any():
+                values = values.astype('UInt32' if values.max() < 2 ** 32 else 'Int64')
+            else:
+                values = pd.to_numeric(values.astype(np.int64), downcast='unsigned')
+                if values.dtype.itemsize < 4:
+                    values = values.astype(np.uint32)  # Одинаковый тип у всех порций, чтобы их можно было склеивать
+        elif column == 'Ticker':
+            values = values.astype('category')
+        elif pd.api.types.is_float_dtype(values):
+            values = values.astype(np.float32)
+        columns[column] = values
+    compact = pd.DataFrame(columns, index=data.index)
+    if ticker is not None:
+        compact['Ticker'] = pd.Categorical([ticker] * len(compact))
+    return compact
+
+
+def resample_ohlcv(data, rule, offset=None):
+    """
+    Передискретизирует бары OHLCV в более крупный интервал.
+
+    Open — первый бар интервала, High — максимум, Low — минимум, Close — последний бар, Volume — сумма.
+    Интервалы без баров (ночь, выходные) пропускаются.
+
+    Параметры:
+        data: DataFrame с барами OHLCV и индексом из дат.
+        rule (str): Новый интервал в формате pandas: '5min', '1h', '1D' и т. д.
+        offset (str, optional): Сдвиг границ интервалов, например '30min', чтобы часовые бары начинались
+            в 9:30, как у биржи (по умолчанию границы на целых часах).
+
+    Возвращает:
+        data: DataFrame с барами нового интервала.
+    """
+    aggregation = {column: OHLCV_AGGREGATION.get(column, 'last') for column in data.columns}
+    resampled = data.resample(rule, offset=offset).agg(aggregation)
+    if 'Close' in resampled.columns:
+        resampled = resampled[resampled['Close'].notna()]
+    else:
+        resampled = resampled.dropna(how='all')
+    if 'Ticker' in resampled.columns:
+        resampled['Ticker'] = resampled['Ticker'].astype(data['Ticker'].dtype)  # Остается категориальным
+    return resampled
+
+
+class OHLCVResampler:
+    """
+    Потоковая передискретизация баров OHLCV: порции исходных баров подаются по очереди, а готовые бары
+    нового интервала возвращаются по мере того, как интервал заканчивается.
+
+    В памяти хранятся только бары последнего незаконченного интервала, поэтому историю любой длины можно
+    обработать порциями, например при чтении файла функцией data_export.iter_exported_data.
+
+    Параметры:
+        rule (str): Новый интервал в формате pandas: '5min', '1h', '1D' и т. д.
+        offset (str, optional): Сдвиг границ интервалов (см. resample_ohlcv).
+    """
+
+    def __init__(self, rule, offset=None):
+        self.rule = rule
+        self.offset = offset
+        self._pending = None  # Исходные бары последнего, возможно незаконченного, интервала
+
+    def update(self, chunk):
+        """
+        Добавляет порцию исходных баров (по возрастанию времени, после уже переданных).
+
+        Возвращает:
+            data: DataFrame с барами тех интервалов, которые закончились (может быть пустым).
+        """
+        if self._pending is not None and not self._pending.empty:
+            chunk = pd.concat([self._pending, chunk])
+        if chunk.empty:
+            self._pending = chunk
+            return chunk
+        resampled = resample_ohlcv(chunk, self.rule, self.offset)
+        if resampled.empty:
+            self._pending = chunk  # Ни одной цены закрытия: ждем следующую порцию
+            return resampled
+        # Последний интервал может продолжиться в следующей порции: его исходные бары откладываем
+        last_label = resampled.index[-1]
+        self._pending = chunk[chunk.index >= last_label]
+        return resampled.iloc[:-1]
+
+    def flush(self):
+        """
+        Завершает поток и возвращает бар последнего интервала.
+
+        Возвращает:
+            data: DataFrame с последним баром (или пустой, если баров не было).
+        """
+        pending, self._pending = self._pending, None
+        if pending is None or pending.empty:
+            return pd.DataFrame()
+        return resample_ohlcv(pending, self.rule, self.offset)
+
+
+def resample_stream(chunks, rule, offset=None):
+    """
+    Передискретизирует поток порций баров OHLCV, не загружая его в память целиком.
+
+    Параметры:
+        chunks: Итерируемый объект с порциями баров (DataFrame) в порядке времени.
+        rule (str): Новый интервал в формате pandas: '5min', '1h', '1D' и т. д.
+        offset (str, optional): Сдвиг границ интервалов (см. resample_ohlcv).
+
+    Возвращает:
+        generator: Порции баров нового интервала.
+    """
+    resampler = OHLCVResampler(rule, offset)
+    for chunk in chunks:
+        bars = resampler.update(chunk)
+        if not bars.empty:
+            yield bars
+    last = resampler.flush()
+    if not last.empty:
+        yield last
@@ -1,7 +1,10 @@
-import data_download as dd
-import data_plotting as dplt
+import sys
+
 from datetime import datetime  # Добавляем модуль для работы с датой и временем
-import matplotlib.pyplot as plt  # Для запроса видов стиля графика
+import tracing
+
+# Тяжелые библиотеки (pandas, yfinance, matplotlib, plotly) импортируются не здесь, а на том этапе, где они нужны,
+# чтобы первый вопрос появлялся сразу после запуска
 
 
 def main():
@@ -26,6 +29,9 @@ def main():
         "макс.")
 
     ticker = input("Введите тикер акции (например, «AAPL» для Apple Inc): ")
+    import data_download as dd  # pandas нужен только после первого ответа
+    from price_statistics import compute_price_statistics
+
     # period = input("Введите период для данных (например, '1mo' для одного месяца): ")
     use_date_range = input("Хотите указать диапазон дат (да/нет)? ").lower()
     if use_date_range == "да":
@@ -54,15 +60,18 @@ def main():
     # Add moving average to the data
     stock_data = dd.add_moving_average(stock_data)
 
+    # Статистика цен закрытия рассчитывается один раз и используется всеми функциями вывода
+    stats = compute_price_statistics(stock_data)
+
     # Вызов функции для рассчета средней цены закрытия
-    dd.calculate_and_display_average_price(stock_data)
+    dd.calculate_and_display_average_price(stock_data, stats=stats)
 
     # Вызов функции для рассчёта стандартного отклонения цены закрытия акции
-    dd.calculate_and_display_standard_deviation(stock_data)
+    dd.calculate_and_display_standard_deviation(stock_data, stats=stats)
 
     threshold = float(input("Введите пороговое значение для колебаний цены в процентах (например, 10 для 10%): "))
     # Вызов функции для рассчета колебаний цены акции
-    dd.notify_if_strong_fluctuations(stock_data, threshold)
+    dd.notify_if_strong_fluctuations(stock_data, threshold, stats=stats)
 
     # Вызываем функцию add_rsi для расчета RSI
     stock_data = dd.add_rsi(stock_data)
@@ -83,7 +92,8 @@ def main():
     # dd.export_data_to_csv(stock_data, csv_filename)
 
     # Получение доступных стилей графиков
-    available_styles = plt.style.available
+    import matplotlib.style  # Импортируем matplotlib только на этапе построения графиков
+    available_styles = matplotlib.style.available
     print("Доступные стили графиков:", available_styles)
 
     # Запрос выбора стиля у пользователя
@@ -92,6 +102,7 @@ def main():
         selected_style = 'default'
 
     # Plot the data
+    import data_plotting as dplt
     # dplt.create_and_save_plot(stock_data, ticker, period)
     if use_date_range == "да":
         dplt.create_and_save_plot(stock_data, ticker, period=None, use_date_range=True, plot_style=selected_style)
@@ -100,4 +111,9 @@ def main():
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:  # С аргументами командной строки работаем в пакетном режиме без диалога
+        import pipeline
+        sys.exit(pipeline.main(sys.argv[1:]))
     main()
+    if tracing.is_tracing():  # Трассировка включена переменной окружения STOCKS_TRACE или STOCKS_PROFILE
+        tracing.print_trace_summary()
@@ -0,0 +1,330 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+# Параметры задания по умолчанию; любое из них можно переопределить в файле задания или для отдельного тикера
+DEFAULT_JOB = {
+    'tickers': [],
+    'period': '1mo',
+    'start_date': None,
+    'end_date': None,
+    'interval': '1d',
+    'compact': False,
+    'indicator_cache': None,
+    'window_size': 5,
+    'rsi_period': 14,
+    'fast_period': 12,
+    'slow_period': 26,
+    'signal_period': 9,
+    'threshold': 10.0,
+    'outputs': ['csv', 'plot'],
+    'output_dir': 'output',
+    'plot_style': 'default',
+    'max_points': None,
+    'downsample_method': 'lttb',
+    'html_layout': 'separate',
+    'workers': os.cpu_count() or 1,
+    'provider': 'yahoo',
+    'summary': None,
+    'trace': None,
+    'trace_memory': False,
+    'profile': None,
+}
+
+
+def load_job(path):
+    """
+    Читает файл задания в формате JSON или YAML.
+
+    Параметры:
+        path (str): Путь к файлу задания (.json, .yaml или .yml).
+
+    Возвращает:
+        dict: Параметры задания.
+    """
+    with open(path, encoding='utf-8') as f:
+        if path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise RuntimeError("Для файлов задания в формате YAML установите пакет PyYAML.")
+            return yaml.safe_load(f) or {}
+        return json.load(f)
+
+
+def build_tasks(job):
+    """
+    Разворачивает задание в список задач, по одной на тикер.
+
+    Элемент списка tickers может быть строкой с тикером или словарем {'ticker': 'AAPL', ...}
+    с параметрами, переопределяющими общие параметры задания.
+
+    Возвращает:
+        list: Список словарей с полными параметрами для каждого тикера.
+    """
+    tasks = []
+    for entry in job['tickers']:
+        overrides = {'ticker': entry} if isinstance(entry, str) else dict(entry)
+        task = {key: value for key, value in job.items()
+                if key not in ('tickers', 'workers', 'summary', 'trace', 'trace_memory')}
+        task.update(overrides)
+        tasks.append(task)
+    return tasks
+
+
+def _init_worker(provider, trace=False, trace_memory=False):
+    """
+    Настраивает процесс пула: графики строятся без экрана, при необходимости используется FakeProvider
+    и включается трассировка этапов.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    if provider == 'fake':
+        import data_providers
+        data_providers.set_default_provider(data_providers.FakeProvider())
+    if trace:
+        import tracing
+        tracing.enable_tracing(memory=trace_memory)  # Записи возвращаются в основной процесс вместе с результатом
+
+
+def process_ticker(task):
+    """
+    Выполняет цепочку загрузка → индикаторы → статистика → экспорт → графики для одного тикера.
+
+    Все исключения перехватываются, чтобы ошибка одного тикера не прерывала остальные.
+
+    Параметры:
+        task (dict): Параметры задачи (см. build_tasks).
+
+    Возвращает:
+        dict: Итог обработки тикера: статус, число строк, статистика, созданные файлы, время и журнал вывода.
+    """
+    import data_download as dd
+    import data_export
+    import indicator_cache
+    import tracing
+    from price_statistics import compute_price_statistics
+
+    ticker = task['ticker']
+    result = {'ticker': ticker, 'status': 'ok', 'rows': 0, 'stats': {}, 'files': [], 'error': None}
+    started = time.perf_counter()
+    log = io.StringIO()
+    tracing.clear_trace()
+    profiler = None
+    if task.get('profile'):
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        with contextlib.redirect_stdout(log), tracing.trace_stage('pipeline.process_ticker'):
+            use_date_range = bool(task.get('start_date') and task.get('end_date'))
+            fetch_kwargs = {'interval': task['interval'], 'compact': task['compact']}
+            if use_date_range:
+                stock_data = dd.fetch_stock_data(ticker, start_date=task['start_date'], end_date=task['end_date'],
+                                                 **fetch_kwargs)
+            else:
+                stock_data = dd.fetch_stock_data(ticker, period=task['period'], **fetch_kwargs)
+            if stock_data.empty:
+                raise ValueError("Не удалось получить данные для указанных параметров.")
+            result['rows'] = len(stock_data)
+
+            if task['indicator_cache']:
+                # Каждый тикер обрабатывается один раз, поэтому полезны только записи на диске от прошлых запусков
+                # с той же датой начала; объем каталога ограничен max_disk_bytes
+                cache = indicator_cache.IndicatorCache(max_bytes=0, cache_dir=task['indicator_cache'])
+                stock_data = cache.indicators(stock_data, window_size=task['window_size'],
+                                              rsi_period=task['rsi_period'], fast_period=task['fast_period'],
+                                              slow_period=task['slow_period'],
+                                              signal_period=task['signal_period'])
+                result['indicator_cache'] = cache.metrics()
+            else:
+                stock_data = dd.add_moving_average(stock_data, window_size=task['window_size'])
+                stock_data = dd.add_rsi(stock_data, period=task['rsi_period'])
+                stock_data = dd.add_macd(stock_data, fast_period=task['fast_period'], slow_period=task['slow_period'],
+                                         signal_period=task['signal_period'])
+
+            stats = compute_price_statistics(stock_data)
+            dd.calculate_and_display_average_price(stock_data, stats=stats)
+            dd.calculate_and_display_standard_deviation(stock_data, stats=stats)
+            dd.notify_if_strong_fluctuations(stock_data, task['threshold'], stats=stats)
+            if stats is None:
+                result['stats'] = None  # В столбце 'Close' нет ни одного значения
+            else:
+                result['stats'] = stats.to_dict()
+                result['stats']['strong_fluctuation'] = stats.fluctuation_percent > task['threshold']
+
+            output_dir = task['output_dir']
+            os.makedirs(output_dir, exist_ok=True)
+            if 'csv' in task['outputs']:
+                current_date = datetime.now().strftime("%Y-%m-%d")
+                filename = os.path.join(output_dir, f"{ticker}_{current_date}_data.csv")
+                dd.export_data_to_csv(stock_data, filename)
+                result['files'].append(filename)
+            for fmt in ('parquet', 'feather'):
+                if fmt in task['outputs']:
+                    # Колоночные файлы ведутся без даты в имени: при каждом запуске дописываются только новые строки
+                    filename = os.path.join(output_dir, f"{ticker}_data.{fmt}")
+                    if data_export.export_data(stock_data, filename, fmt=fmt, append=True) is None:
+                        raise RuntimeError(f"Не удалось сохранить данные в файл {filename}")
+                    result['files'].append(filename)
+
+            if 'plot' in task['outputs']:
+                import data_plotting as dplt
+                files = dplt.create_and_save_plot(stock_data, ticker,
+                                                  period=None if use_date_range else task['period'],
+                                                  use_date_range=use_date_range, plot_style=task['plot_style'],
+                                                  show=False, output_dir=output_dir,
+                                                  max_points=task['max_points'],
+                                                  downsample_method=task['downsample_method'],
+                                                  html_layout=task['html_layout'])
+                result['files'] += files or []
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = f"{type(e).__name__}: {e}"
+        result['traceback'] = traceback.format_exc()
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            os.makedirs(task['profile'], exist_ok=True)
+            profile_path = os.path.join(task['profile'], f"{ticker}.prof")
+            profiler.dump_stats(profile_path)
+            result['profile'] = profile_path
+
+    result['elapsed'] = time.perf_counter() - started
+    result['log'] = log.getvalue()
+    if tracing.is_tracing():
+        result['trace'] = tracing.get_trace_records()
+    return result
+
+
+def run_job(job):
+    """
+    Обрабатывает все тикеры задания в пуле процессов и записывает сводку запуска в JSON.
+
+    Параметры:
+        job (dict): Параметры задания (отсутствующие параметры берутся из DEFAULT_JOB).
+
+    Возвращает:
+        dict: Сводка запуска: время, число успешных и неудачных тикеров, результаты по каждому тикеру
+        и записи трассировки (trace_records, если задан параметр trace).
+    """
+    job = {**DEFAULT_JOB, **job}
+    tasks = build_tasks(job)
+    workers = max(1, min(int(job['workers']), len(tasks) or 1))
+
+    started_at = datetime.now().isoformat(timespec='seconds')
+    started = time.perf_counter()
+    trace = bool(job['trace'])
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(job['provider'], trace, job['trace_memory'])) as pool:
+        results = list(pool.map(process_ticker, tasks))
+
+    trace_records = [record for result in results for record in result.pop('trace', [])]
+    if trace:
+        import tracing
+        tracing.write_trace(trace_records, job['trace'])
+
+    summary = {
+        'started_at': started_at,
+        'elapsed': time.perf_counter() - started,
+        'workers': workers,
+        'succeeded': sum(result['status'] == 'ok' for result in results),
+        'failed': sum(result['status'] != 'ok' for result in results),
+        'results': results,
+    }
+
+    summary_path = job['summary'] or os.path.join(job['output_dir'], 'run_summary.json')
+    os.makedirs(os.path.dirname(summary_path) or '.', exist_ok=True)
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    summary['summary_path'] = summary_path
+    summary['trace_records'] = trace_records
+    return summary
+
+
+def parse_args(argv=None):
+    """
+    Разбирает аргументы командной строки пакетного режима.
+    """
+    parser = argparse.ArgumentParser(description="Пакетная обработка биржевых данных без диалога с пользователем")
+    parser.add_argument('--job', help="Файл задания в формате JSON или YAML")
+    parser.add_argument('--tickers', nargs='+', help="Тикеры акций, например AAPL MSFT")
+    parser.add_argument('--period', help="Период для данных, например 1mo, 1y")
+    parser.add_argument('--start-date', help="Дата начала в формате ГГГГ-ММ-ДД")
+    parser.add_argument('--end-date', help="Дата окончания в формате ГГГГ-ММ-ДД")
+    parser.add_argument('--interval', help="Интервал баров: 1d или внутридневной, например 1m, 5m, 1h")
+    parser.add_argument('--compact', action='store_true', default=None,
+                        help="Компактные типы данных: цены float32, целочисленный объем")
+    parser.add_argument('--indicator-cache',
+                        help="Каталог кэша индикаторов: повторный запуск с той же датой начала пересчитывает "
+                             "только новые бары (при скользящем периоде записи не переиспользуются)")
+    parser.add_argument('--window-size', type=int, help="Размер окна скользящего среднего")
+    parser.add_argument('--rsi-period', type=int, help="Период для расчета RSI")
+    parser.add_argument('--fast-period', type=int, help="Период для быстрого EMA")
+    parser.add_argument('--slow-period', type=int, help="Период для медленного EMA")
+    parser.add_argument('--signal-period', type=int, help="Период для сигнальной линии EMA")
+    parser.add_argument('--threshold', type=float, help="Порог колебаний цены в процентах")
+    parser.add_argument('--outputs', nargs='+', choices=['csv', 'parquet', 'feather', 'plot'],
+                        help="Какие файлы создавать")
+    parser.add_argument('--output-dir', help="Каталог для результатов")
+    parser.add_argument('--plot-style', help="Стиль графиков matplotlib")
+    parser.add_argument('--max-points', type=int, help="Наибольшее число точек на линии графика")
+    parser.add_argument('--downsample-method', choices=['lttb', 'minmax'], help="Метод прореживания графиков")
+    parser.add_argument('--html-layout', choices=['separate', 'combined'],
+                        help="Три HTML-файла на тикер или один файл с подграфиками")
+    parser.add_argument('--workers', type=int, help="Число процессов (по умолчанию число ядер)")
+    parser.add_argument('--provider', choices=['yahoo', 'fake'], help="Поставщик данных")
+    parser.add_argument('--summary', help="Путь к JSON-файлу со сводкой запуска")
+    parser.add_argument('--trace', help="Файл трассировки этапов (.json — формат Chrome trace, иначе JSON Lines)")
+    parser.add_argument('--trace-memory', action='store_true', default=None,
+                        help="Учитывать пиковую память этапов (замедляет выполнение)")
+    parser.add_argument('--profile', help="Каталог для профилей cProfile (по одному файлу .prof на тикер)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    Точка входа пакетного режима: загрузка данных, расчет индикаторов и статистики, экспорт и построение графиков
+    для списка тикеров в пуле процессов без диалога. Параметры командной строки переопределяют параметры
+    из файла задания.
+
+    Примеры запуска:
+        python main.py --tickers AAPL MSFT GOOGL --period 1y --workers 4
+        python main.py --job job.json
+
+    Возвращает:
+        int: Код завершения: 0, если все тикеры обработаны успешно, иначе 1.
+    """
+    args = parse_args(argv)
+    job = load_job(args.job) if args.job else {}
+    for key, value in vars(args).items():
+        if key != 'job' and value is not None:
+            job[key] = value
+    if not job.get('tickers'):
+        print("Ошибка: Не указаны тикеры (--tickers или поле tickers в файле задания).")
+        return 2
+
+    summary = run_job(job)
+    for result in summary['results']:
+        if result['status'] == 'ok':
+            print(f"{result['ticker']}: {result['rows']} строк, {result['elapsed']:.2f} с")
+        else:
+            print(f"{result['ticker']}: ошибка — {result['error']}")
+    print(f"Готово за {summary['elapsed']:.2f} с: успешно {summary['succeeded']}, с ошибками {summary['failed']}. "
+          f"Сводка: {summary['summary_path']}")
+    if job.get('trace'):
+        import tracing
+        tracing.print_trace_summary(summary['trace_records'])
+        print(f"Трассировка: {job['trace']}")
+    return 0 if summary['failed'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,240 @@
+import math
+import warnings
+from dataclasses import asdict, dataclass
+
+import numpy as np
+import pandas as pd
+
+from tracing import traced
+
+# Размер блока, который помещается в кэш процессора: все показатели считаются по блоку, пока он в кэше
+CHUNK_SIZE = 65536
+
+
+@dataclass
+class PriceStatistics:
+    """
+    Сводная статистика по ценам закрытия.
+
+    Атрибуты:
+        count (int): Число баров с ценой закрытия.
+        mean (float): Средняя цена закрытия.
+        std (float): Стандартное отклонение цены закрытия (выборочное, как pandas std).
+        min (float): Минимальная цена закрытия.
+        max (float): Максимальная цена закрытия.
+        first (float): Первая цена закрытия.
+        last (float): Последняя цена закрытия.
+        fluctuation_percent (float): Колебание цены (max - min) / min в процентах.
+        total_return_percent (float): Изменение цены от первого до последнего бара в процентах.
+        mean_return (float): Средняя доходность за бар (доля).
+        std_return (float): Стандартное отклонение доходности за бар (доля).
+        max_drawdown_percent (float): Максимальная просадка от предыдущего максимума в процентах.
+    """
+    count: int
+    mean: float
+    std: float
+    min: float
+    max: float
+    first: float
+    last: float
+    fluctuation_percent: float
+    total_return_percent: float
+    mean_return: float
+    std_return: float
+    max_drawdown_percent: float
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def _merge_moments(n_a, mean_a, m2_a, values):
+    """
+    Объединяет накопленные среднее и сумму квадратов отклонений с новой порцией значений
+    (алгоритм Уэлфорда в параллельной форме Чана).
+    """
+    n_b = len(values)
+    if n_b == 0:
+        return n_a, mean_a, m2_a
+    mean_b = float(values.mean())
+    m2_b = float(((values - mean_b) ** 2).sum())
+    n = n_a + n_b
+    delta = mean_b - mean_a
+    return n, mean_a + delta * n_b / n, m2_a + m2_b + delta * delta * n_a * n_b / n
+
+
+class StatisticsAccumulator:
+    """
+    Накопитель статистики цен закрытия для потока порций данных.
+
+    Каждая порция просматривается один раз, в памяти хранится только несколько чисел, поэтому
+    статистику можно считать по истории, которая не помещается в память целиком.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._min = math.inf
+        self._max = -math.inf
+        self._first = math.nan
+        self._last = math.nan
+        self._peak = -math.inf
+        self._drawdown = 0.0
+        self._return_count = 0
+        self._return_mean = 0.0
+        self._return_m2 = 0.0
+
+    def update(self, close):
+        """
+        Добавляет порцию цен закрытия (DataFrame со столбцом 'Close', Series или массив). NaN пропускаются.
+
+        Возвращает:
+            StatisticsAccumulator: Этот же накопитель, чтобы вызовы можно было объединять в цепочку.
+        """
+        if isinstance(close, pd.DataFrame):
+            close = close['Close']
+        values = np.asarray(close, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+
+        self.count, self._mean, self._m2 = _merge_moments(self.count, self._mean, self._m2, values)
+        self._min = min(self._min, float(values.min()))
+        self._max = max(self._max, float(values.max()))
+        if self._first != self._first:
+            self._first = float(values[0])
+
+        # Доходности считаем и через границу порций, поэтому берем последнюю цену предыдущей порции
+        previous = values if self._last != self._last else np.concatenate(([self._last], values))
+        returns = previous[1:] / previous[:-1] - 1
+        self._return_count, self._return_mean, self._return_m2 = _merge_moments(
+            self._return_count, self._return_mean, self._return_m2, returns)
+        self._last = float(values[-1])
+
+        peaks = np.maximum.accumulate(np.maximum(values, self._peak))
+        self._drawdown = min(self._drawdown, float((values / peaks - 1).min()))
+        self._peak = float(peaks[-1])
+        return self
+
+    def result(self):
+        """
+        Возвращает накопленную статистику.
+
+        Возвращает:
+            PriceStatistics: Статистика или None, если не было ни одной цены.
+        """
+        if self.count == 0:
+            return None
+        return PriceStatistics(
+            count=self.count,
+            mean=self._mean,
+            std=math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else math.nan,
+            min=self._min,
+            max=self._max,
+            first=self._first,
+            last=self._last,
+            fluctuation_percent=(self._max - self._min) / self._min * 100,
+            total_return_percent=(self._last / self._first - 1) * 100,
+            mean_return=self._return_mean if self._return_count else math.nan,
+            std_return=math.sqrt(self._return_m2 / (self._return_count - 1)) if self._return_count > 1 else math.nan,
+            max_drawdown_percent=-self._drawdown * 100,
+        )
+
+
+@traced()
+def compute_price_statistics(data):
+    """
+    Вычисляет статистику цен закрытия за один проход по данным.
+
+    Параметры:
+        data: DataFrame с данными о ценах акций.
+
+    Возвращает:
+        PriceStatistics: Среднее, стандартное отклонение, минимум, максимум, колебание, доходности и просадка.
+        Или None, если произошла ошибка.
+    """
+    if not isinstance(data, pd.DataFrame):
+        print("Ошибка: Переданные данные не являются DataFrame.")
+        return None
+
+    if 'Close' not in data.columns:
+        print("Ошибка: В DataFrame отсутствует колонка 'Close'.")
+        return None
+
+    values = data['Close'].to_numpy(dtype=np.float64)
+    accumulator = StatisticsAccumulator()
+    for start in range(0, len(values), CHUNK_SIZE):
+        accumulator.update(values[start:start + CHUNK_SIZE])
+    return accumulator.result()
+
+
+def compute_price_statistics_stream(chunks):
+    """
+    Вычисляет статистику цен закрытия по потоку порций данных, не загружая историю в память целиком.
+
+    Параметры:
+        chunks: Итерируемый объект с порциями (DataFrame со столбцом 'Close', Series или массивы) в порядке времени.
+
+    Возвращает:
+        PriceStatistics: Статистика или None, если в потоке не было цен.
+    """
+    accumulator = StatisticsAccumulator()
+    for chunk in chunks:
+        accumulator.update(chunk)
+    return accumulator.result()
+
+
+@traced()
+def compute_price_statistics_batch(prices):
+    """
+    Вычисляет статистику цен закрытия сразу для многих тикеров векторизованно.
+
+    Параметры:
+        prices: Широкий DataFrame цен закрытия (строки — даты, столбцы — тикеры; NaN — нет бара)
+            или словарь {тикер: DataFrame}.
+
+    Возвращает:
+        data: DataFrame, в котором строки — тикеры, а столбцы — поля PriceStatistics.
+    """
+    if isinstance(prices, dict):
+        prices = pd.concat({ticker: data['Close'] for ticker, data in prices.items()}, axis=1).sort_index()
+    values = prices.to_numpy(dtype=np.float64)
+    valid = ~np.isnan(values)
+    count = valid.sum(axis=0)
+    rows = np.arange(len(values))[:, None]
+
+    # Первая и последняя цена каждого тикера
+    first_row = np.where(valid, rows, len(values)).min(axis=0)
+    last_row = np.where(valid, rows, -1).max(axis=0)
+    columns = np.arange(values.shape[1])
+    has_data = count > 0
+    first = np.where(has_data, values[np.minimum(first_row, len(values) - 1), columns], np.nan)
+    last = np.where(has_data, values[np.maximum(last_row, 0), columns], np.nan)
+
+    # Доходность считается относительно предыдущего существующего бара тикера
+    previous = pd.DataFrame(values).ffill().shift(1).to_numpy()
+    returns = np.where(valid, values / previous - 1, np.nan)
+
+    # Пики с пропуском NaN: fmax игнорирует NaN
+    peaks = np.fmax.accumulate(values, axis=0)
+    drawdown = np.where(valid, values / peaks - 1, np.nan)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # Тикеры без данных дают NaN
+        minimum = np.nanmin(values, axis=0)
+        maximum = np.nanmax(values, axis=0)
+        result = pd.DataFrame({
+            'count': count,
+            'mean': np.nanmean(values, axis=0),
+            'std': np.nanstd(values, axis=0, ddof=1),
+            'min': minimum,
+            'max': maximum,
+            'first': first,
+            'last': last,
+            'fluctuation_percent': (maximum - minimum) / minimum * 100,
+            'total_return_percent': (last / first - 1) * 100,
+            'mean_return': np.nanmean(returns, axis=0),
+            'std_return': np.nanstd(returns, axis=0, ddof=1),
+            'max_drawdown_percent': -np.nanmin(drawdown, axis=0) * 100,
+        }, index=prices.columns)
+    return result
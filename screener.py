@@ -0,0 +1,322 @@
+import functools
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from indicators_batch import _pack, _unpack, to_wide
+from tracing import traced
+
+RULES = ('fluctuation', 'rsi', 'macd_cross', 'bands')
+
+# Имена событий в таблице результатов; столбец rule — категориальный с этими категориями
+EVENT_RULES = ('fluctuation', 'rsi_overbought', 'rsi_oversold', 'macd_cross_up', 'macd_cross_down', 'above_band',
+               'below_band')
+EVENT_COLUMNS = ['ticker', 'timestamp', 'rule', 'value']
+
+# Сколько элементов окон обрабатывается за один шаг скользящей агрегации
+BLOCK_ELEMENTS = 1 << 20
+
+
+def _rolling(values, window, reduce):
+    """
+    Скользящая агрегация по строкам: значение каждой строки считается по своему окну из window строк.
+
+    В отличие от pandas rolling, который проходит столбцы по очереди и накапливает суммы вдоль всей истории,
+    окна считаются сразу для всех тикеров и независимо друг от друга. Поэтому результат не зависит от того,
+    с какого бара начат расчет, и инкрементальный проход дает те же значения, что и полный. Окно с NaN дает NaN.
+
+    Параметры:
+        values: Массив время × тикеры.
+        window (int): Размер окна.
+        reduce: Функция вида np.mean(windows, axis=-1).
+
+    Возвращает:
+        array: Массив той же формы; первые window - 1 строк равны NaN.
+    """
+    result = np.full(values.shape, np.nan)
+    if len(values) < window:
+        return result
+    windows = sliding_window_view(values, window, axis=0)
+    # Блоками строк, чтобы промежуточные массивы reduce (например, у std) помещались в кэш
+    step = max(1, BLOCK_ELEMENTS // max(1, values.shape[1] * window))
+    for start in range(0, len(windows), step):
+        result[window - 1 + start:window - 1 + start + step] = reduce(windows[start:start + step], axis=-1)
+    return result
+
+
+def _rsi(close, period):
+    # Те же формулы, что и в data_download.add_rsi, но окна считаются функцией _rolling
+    delta = np.vstack([np.full((1, close.shape[1]), np.nan), np.diff(close, axis=0)])
+    up = np.clip(delta, 0, None)
+    down = -1 * np.clip(delta, None, 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = _rolling(up, period, np.mean) / _rolling(down, period, np.mean)
+        return 100 - (100 / (1 + rs))
+
+
+def _ema_continue(previous, values, span):
+    """
+    Продолжает EMA (как pandas ewm(span, adjust=False).mean()) с сохраненного значения по новым барам.
+
+    Бары без значения (NaN) пропускаются для каждого тикера, как в compute_indicators_batch. Значения
+    совпадают с add_macd до бита.
+
+    Возвращает:
+        array: Массив (1 + число новых баров) × тикеры; первая строка — сохраненное значение.
+    """
+    if len(values) > max(16, values.shape[1]):
+        # Длинная история: pandas ewm; при adjust=False EMA первого значения равна самому значению,
+        # поэтому сохраненное значение ставится первой строкой
+        packed, order, mask = _pack(np.vstack([previous[None, :], values]))
+        ema = pd.DataFrame(packed).ewm(span=span, adjust=False).mean().to_numpy()
+        return _unpack(ema, order, mask)
+
+    # Несколько новых баров: цикл по строкам сразу для всех тикеров с формулой pandas
+    # (см. streaming_indicators.StreamingEMA)
+    alpha = 1.0 / (1.0 + (span - 1) / 2.0)
+    old_wt = 1.0 - alpha
+    result = np.full((len(values) + 1, values.shape[1]), np.nan)
+    result[0] = ema = previous
+    with np.errstate(invalid='ignore'):
+        for row, close in enumerate(values, start=1):
+            weighted = (old_wt * ema + alpha * close) / (old_wt + alpha)
+            weighted = np.where(ema == close, ema, weighted)
+            weighted = np.where(np.isnan(ema), close, weighted)
+            has_close = ~np.isnan(close)
+            ema = np.where(has_close, weighted, ema)
+            result[row] = np.where(has_close, ema, np.nan)
+    return result
+
+
+def _last_valid(values, previous):
+    """
+    Возвращает последнее значение каждого столбца, не равное NaN (или previous, если таких нет).
+    """
+    rows = np.where(~np.isnan(values), np.arange(len(values))[:, None], -1).max(axis=0)
+    columns = np.arange(values.shape[1])
+    return np.where(rows >= 0, values[np.maximum(rows, 0), columns], previous)
+
+
+def _states(condition, valid, previous):
+    """
+    Состояние условия на каждом баре и на предыдущем баре того же тикера.
+
+    На барах без значения (valid == False) состояние не меняется. Состояния хранятся как float:
+    1 — условие выполнено, 0 — не выполнено, NaN — еще неизвестно (у тикера не было значений).
+
+    Возвращает:
+        tuple: (state, before) — массивы того же размера, что и condition.
+    """
+    state = np.vstack([previous[None, :], np.where(valid, condition, np.nan)])
+    state = pd.DataFrame(state).ffill().to_numpy()
+    return state[1:], state[:-1]
+
+
+class Screener:
+    """
+    Векторизованный скринер тикеров с сохранением состояния между вызовами.
+
+    Правила:
+        fluctuation — колебание цены (max - min) / min за последние N баров превышает порог в процентах
+            (как notify_if_strong_fluctuations, но в скользящем окне);
+        rsi — RSI выше верхней (rsi_overbought) или ниже нижней (rsi_oversold) границы;
+        macd_cross — MACD пересекает сигнальную линию снизу вверх (macd_cross_up) или сверху вниз (macd_cross_down);
+        bands — цена закрытия выше (above_band) или ниже (below_band) полосы скользящее среднее ± k стандартных
+            отклонений.
+
+    Первый вызов scan обрабатывает всю переданную историю, следующие — только бары новее уже обработанных.
+    Для продолжения расчета хранятся последние бары каждого тикера (столько, сколько нужно самому длинному
+    окну) и текущие значения EMA, поэтому время повторного вызова зависит от числа тикеров и новых баров,
+    а не от длины истории. Инкрементальные проходы находят те же события с теми же значениями, что и один
+    проход по всей истории. MACD совпадает с add_macd до бита, RSI и полосы — с add_rsi и pandas rolling
+    с точностью до округления.
+
+    По умолчанию событие создается, когда условие становится выполненным (например, RSI поднялся выше 70),
+    а не на каждом баре, пока оно выполняется. Пересечение MACD фиксируется только после того, как у тикера
+    было хотя бы одно значение гистограммы.
+
+    Параметры:
+        rules (tuple, optional): Какие правила проверять (по умолчанию все: RULES).
+        fluctuation_window (int, optional): Окно для колебания цены в барах (по умолчанию 20).
+        fluctuation_threshold (float, optional): Порог колебания в процентах (по умолчанию 10).
+        rsi_period (int, optional): Период для расчета RSI (по умолчанию 14).
+        rsi_upper (float, optional): Верхняя граница RSI (по умолчанию 70).
+        rsi_lower (float, optional): Нижняя граница RSI (по умолчанию 30).
+        fast_period (int, optional): Период для быстрого EMA (по умолчанию 12).
+        slow_period (int, optional): Период для медленного EMA (по умолчанию 26).
+        signal_period (int, optional): Период для сигнальной линии EMA (по умолчанию 9).
+        band_window (int, optional): Окно среднего и стандартного отклонения для полос (по умолчанию 20).
+        band_std (float, optional): Ширина полосы в стандартных отклонениях (по умолчанию 1).
+        only_changes (bool, optional): Создавать событие только при смене состояния условия; если False —
+            на каждом баре, где условие выполнено (по умолчанию True).
+    """
+
+    def __init__(self, rules=RULES, fluctuation_window=20, fluctuation_threshold=10.0, rsi_period=14, rsi_upper=70.0,
+                 rsi_lower=30.0, fast_period=12, slow_period=26, signal_period=9, band_window=20, band_std=1.0,
+                 only_changes=True):
+        unknown = set(rules) - set(RULES)
+        if unknown:
+            raise ValueError(f"Неизвестные правила: {', '.join(sorted(unknown))}. "
+                             f"Доступные правила: {', '.join(RULES)}.")
+        self.rules = tuple(rules)
+        self.fluctuation_window = fluctuation_window
+        self.fluctuation_threshold = fluctuation_threshold
+        self.rsi_period = rsi_period
+        self.rsi_upper = rsi_upper
+        self.rsi_lower = rsi_lower
+        self.fast_period = fast_period
+        self.slow_period = slow_period
+        self.signal_period = signal_period
+        self.band_window = band_window
+        self.band_std = band_std
+        self.only_changes = only_changes
+
+        self.tickers = pd.Index([], dtype=object)
+        self.last_timestamp = None
+        # Сколько последних баров тикера нужно, чтобы посчитать окна на новых барах (RSI использует разность цен)
+        self._lookback = max(fluctuation_window, band_window, rsi_period + 1)
+        self._tail = np.empty((self._lookback, 0))
+        self._ema = {'fast': np.empty(0), 'slow': np.empty(0), 'signal': np.empty(0)}
+        self._flags = {rule: np.empty(0) for rule in EVENT_RULES}
+
+    def _add_tickers(self, tickers):
+        new = pd.Index(tickers).difference(self.tickers, sort=False)
+        if new.empty:
+            return
+        self.tickers = self.tickers.append(new)
+        nan = np.full(len(new), np.nan)
+        self._tail = np.hstack([self._tail, np.full((self._lookback, len(new)), np.nan)])
+        self._ema = {name: np.concatenate([values, nan]) for name, values in self._ema.items()}
+        self._flags = {rule: np.concatenate([values, nan]) for rule, values in self._flags.items()}
+
+    def _prepare(self, prices):
+        """
+        Приводит входные данные к широкому DataFrame цен закрытия только с новыми барами.
+        """
+        if isinstance(prices, dict):
+            prices = to_wide(prices)
+        elif 'Ticker' in prices.columns:
+            prices = prices.pivot_table(index=prices.index, columns='Ticker', values='Close', aggfunc='last',
+                                        observed=True)
+        prices = prices.sort_index()
+        if self.last_timestamp is not None:
+            prices = prices[prices.index > self.last_timestamp]
+        return prices
+
+    @traced()
+    def scan(self, prices):
+        """
+        Проверяет правила на новых барах и возвращает найденные события.
+
+        Параметры:
+            prices: Широкий DataFrame цен закрытия (строки — время, столбцы — тикеры; NaN — нет бара),
+                словарь {тикер: DataFrame} или DataFrame в длинном формате со столбцами 'Ticker' и 'Close'
+                (например, результат batch_download.to_long_format). Бары не новее уже обработанных
+                пропускаются, поэтому можно передавать и всю обновленную историю.
+
+        Возвращает:
+            data: DataFrame событий со столбцами ticker (категориальный), timestamp, rule (категориальный
+            с категориями EVENT_RULES) и value (значение показателя: колебание в процентах, RSI, MACD или
+            цена закрытия), упорядоченный по времени.
+        """
+        prices = self._prepare(prices)
+        self._add_tickers(prices.columns)
+        index = prices.index
+        if len(index) == 0:
+            return self._events(index, [])
+        values = prices.reindex(columns=self.tickers).to_numpy(dtype=np.float64)
+        valid = ~np.isnan(values)
+
+        # Окна считаются по последним сохраненным барам и новым барам; NaN убираются для каждого тикера
+        n_tail = len(self._tail)
+        packed, order, mask = _pack(np.vstack([self._tail, values]))
+
+        def recent(result):
+            return _unpack(result, order, mask)[n_tail:]
+
+        checks = []  # (событие, условие, бар со значением, значение, нужно ли известное предыдущее состояние)
+        if 'fluctuation' in self.rules:
+            low = _rolling(packed, self.fluctuation_window, np.min)
+            fluctuation = recent((_rolling(packed, self.fluctuation_window, np.max) - low) / low * 100)
+            checks.append(('fluctuation', fluctuation > self.fluctuation_threshold, ~np.isnan(fluctuation),
+                           fluctuation, False))
+        if 'rsi' in self.rules:
+            rsi = recent(_rsi(packed, self.rsi_period))
+            has_rsi = ~np.isnan(rsi)
+            checks.append(('rsi_overbought', rsi > self.rsi_upper, has_rsi, rsi, False))
+            checks.append(('rsi_oversold', rsi < self.rsi_lower, has_rsi, rsi, False))
+        if 'bands' in self.rules:
+            mean = recent(_rolling(packed, self.band_window, np.mean))
+            width = recent(_rolling(packed, self.band_window, functools.partial(np.std, ddof=1))) * self.band_std
+            has_band = valid & ~np.isnan(width)
+            checks.append(('above_band', values > mean + width, has_band, values, False))
+            checks.append(('below_band', values < mean - width, has_band, values, False))
+        if 'macd_cross' in self.rules:
+            fast = _ema_continue(self._ema['fast'], values, self.fast_period)
+            slow = _ema_continue(self._ema['slow'], values, self.slow_period)
+            macd = (fast - slow)[1:]
+            signal = _ema_continue(self._ema['signal'], macd, self.signal_period)[1:]
+            histogram = macd - signal
+            has_histogram = ~np.isnan(histogram)
+            checks.append(('macd_cross_up', histogram > 0, has_histogram, macd, True))
+            checks.append(('macd_cross_down', histogram < 0, has_histogram, macd, True))
+            self._ema = {
+                'fast': _last_valid(fast, self._ema['fast']),
+                'slow': _last_valid(slow, self._ema['slow']),
+                'signal': _last_valid(signal, self._ema['signal']),
+            }
+
+        found = []
+        for rule, condition, has_value, rule_values, needs_previous in checks:
+            condition &= has_value
+            state, before = _states(condition, has_value, self._flags[rule])
+            self._flags[rule] = state[-1]
+            events = condition
+            if needs_previous:
+                events = events & (before == 0)
+            elif self.only_changes:
+                events = events & (before != 1)
+            rows, columns = np.nonzero(events)
+            found.append((EVENT_RULES.index(rule), rows, columns, rule_values[rows, columns]))
+
+        # Сохраняем последние lookback баров каждого тикера: в упакованном массиве они идут подряд
+        counts = mask.sum(axis=0)
+        positions = counts - self._lookback + np.arange(self._lookback)[:, None]
+        tail = np.take_along_axis(packed, np.maximum(positions, 0), axis=0)
+        self._tail = np.where(positions >= 0, tail, np.nan)
+        self.last_timestamp = index[-1]
+        return self._events(index, found)
+
+    def _events(self, index, found):
+        if found:
+            codes = np.concatenate([np.full(len(rows), code) for code, rows, _, _ in found])
+            rows = np.concatenate([rows for _, rows, _, _ in found])
+            columns = np.concatenate([columns for _, _, columns, _ in found])
+            values = np.concatenate([values for _, _, _, values in found])
+        else:
+            codes = rows = columns = np.empty(0, dtype=np.int64)
+            values = np.empty(0)
+        # По времени, затем по тикеру; внутри каждого правила события уже идут в этом порядке, поэтому
+        # устойчивая сортировка оставляет правила в порядке EVENT_RULES
+        order = np.argsort(rows * len(self.tickers) + columns, kind='stable')
+        return pd.DataFrame({
+            'ticker': pd.Categorical.from_codes(columns[order], categories=self.tickers),
+            'timestamp': index[rows[order]],
+            'rule': pd.Categorical.from_codes(codes[order], categories=EVENT_RULES),
+            'value': values[order],
+        }, columns=EVENT_COLUMNS)
+
+
+def screen(prices, **params):
+    """
+    Однократно проверяет правила скринера по всей истории.
+
+    Параметры:
+        prices: Цены закрытия (см. Screener.scan).
+        **params: Параметры правил, как в конструкторе Screener.
+
+    Возвращает:
+        data: DataFrame событий (ticker, timestamp, rule, value).
+    """
+    return Screener(**params).scan(prices)
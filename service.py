@@ -0,0 +1,465 @@
+import argparse
+import asyncio
+import functools
+import json
+import math
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlsplit
+
+import data_download as dd
+import indicator_cache
+from price_statistics import compute_price_statistics
+
+# Параметры точек доступа: имя → (тип, значение по умолчанию)
+COMMON_PARAMETERS = {
+    'ticker': (str, None),
+    'period': (str, '1mo'),
+    'start': (str, None),
+    'end': (str, None),
+    'interval': (str, '1d'),
+    'format': (str, 'json'),
+}
+ENDPOINT_PARAMETERS = {
+    'data': {},
+    'indicators': {
+        'window_size': (int, 5),
+        'rsi_period': (int, 14),
+        'fast_period': (int, 12),
+        'slow_period': (int, 26),
+        'signal_period': (int, 9),
+    },
+    'statistics': {},
+}
+CONTENT_TYPES = {'json': 'application/json', 'arrow': 'application/vnd.apache.arrow.stream'}
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           422: 'Unprocessable Entity', 500: 'Internal Server Error'}
+MAX_HEADER_BYTES = 65536
+KEEPALIVE_TIMEOUT = 15.0
+
+
+class RequestError(Exception):
+    """
+    Ошибка запроса с кодом ответа HTTP.
+    """
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class TTLCache:
+    """
+    LRU-кэш с ограниченным числом записей и временем жизни записи.
+
+    При переполнении удаляется запись, к которой дольше всего не обращались; запись старше ttl секунд
+    считается отсутствующей и удаляется при обращении к ней или при добавлении новых записей.
+
+    Параметры:
+        max_entries (int, optional): Наибольшее число записей (по умолчанию 256).
+        ttl (float, optional): Время жизни записи в секундах (по умолчанию 300).
+        clock (callable, optional): Источник времени в секундах (по умолчанию time.monotonic); для тестов
+            можно передать управляемые часы.
+    """
+
+    def __init__(self, max_entries=256, ttl=300.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0}
+        self._entries = OrderedDict()  # Ключ → (время истечения, значение); в конце — последние использованные
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Возвращает значение по ключу или None, если записи нет или она устарела.
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] <= self.clock():
+            del self._entries[key]
+            self.stats['expired'] += 1
+            entry = None
+        if entry is None:
+            self.stats['misses'] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats['hits'] += 1
+        return entry[1]
+
+    def put(self, key, value):
+        """
+        Добавляет запись, удаляя устаревшие и, при переполнении, давно не использованные записи.
+        """
+        now = self.clock()
+        self._entries[key] = (now + self.ttl, value)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            for stale in [stale for stale, (expires, _) in self._entries.items() if expires <= now]:
+                del self._entries[stale]
+                self.stats['expired'] += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def clear(self):
+        """
+        Удаляет все записи.
+        """
+        self._entries.clear()
+
+
+def parse_params(endpoint, query):
+    """
+    Проверяет параметры запроса и дополняет их значениями по умолчанию.
+
+    Параметры:
+        endpoint (str): Имя точки доступа ('data', 'indicators' или 'statistics').
+        query (dict): Параметры из строки запроса.
+
+    Возвращает:
+        tuple: Упорядоченные пары (параметр, значение) — ключ кэша вместе с именем точки доступа.
+    """
+    if endpoint not in ENDPOINT_PARAMETERS:
+        raise RequestError(404, f"Неизвестная точка доступа: /{endpoint}")
+    spec = {**COMMON_PARAMETERS, **ENDPOINT_PARAMETERS[endpoint]}
+    unknown = set(query) - set(spec)
+    if unknown:
+        raise RequestError(400, f"Неизвестные параметры: {', '.join(sorted(unknown))}")
+
+    params = {}
+    for name, (kind, default) in spec.items():
+        value = query.get(name, default)
+        if value is not None and kind is int:
+            try:
+                value = int(value)
+            except ValueError:
+                raise RequestError(400, f"Параметр {name} должен быть целым числом")
+            if value < 1:
+                raise RequestError(400, f"Параметр {name} должен быть положительным")
+        params[name] = value
+
+    if not params['ticker']:
+        raise RequestError(400, "Не указан параметр ticker")
+    params['ticker'] = params['ticker'].upper()
+    if params['format'] not in CONTENT_TYPES:
+        raise RequestError(400, f"Неизвестный формат '{params['format']}'. Доступные форматы: json, arrow.")
+    if bool(params['start']) != bool(params['end']):
+        raise RequestError(400, "Параметры start и end указываются вместе")
+    if params['start']:
+        params['period'] = None  # Диапазон дат важнее периода; так одинаковые запросы получают один ключ
+    return tuple(sorted(params.items()))
+
+
+def _json_value(value):
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if hasattr(value, 'item'):  # Числа NumPy
+        return _json_value(value.item())
+    return value
+
+
+def _encode(result, params):
+    """
+    Переводит результат в тело ответа в формате json или arrow.
+    """
+    import pandas as pd
+
+    if params['format'] == 'arrow':
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise RequestError(400, "Для формата arrow установите пакет pyarrow.")
+        frame = result if isinstance(result, pd.DataFrame) else pd.DataFrame([result])
+        table = pa.Table.from_pandas(frame)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+    if isinstance(result, pd.DataFrame):
+        # Таблица в формате split: columns, index (время в UTC) и data; NaN записывается как null
+        table = result.to_json(orient='split', date_format='iso')
+        return f'{{"ticker": {json.dumps(params["ticker"])}, "rows": {len(result)}, "data": {table}}}'.encode()
+    return json.dumps({'ticker': params['ticker'], **{key: _json_value(value) for key, value in result.items()}},
+                      ensure_ascii=False).encode()
+
+
+def compute(endpoint, params, provider=None, store=None, use_cache=True):
+    """
+    Выполняет запрос к точке доступа и возвращает тело ответа. Вызывается в пуле потоков.
+
+    Параметры:
+        endpoint (str): Имя точки доступа ('data', 'indicators' или 'statistics').
+        params (dict): Параметры запроса (см. parse_params).
+        provider (DataProvider, optional): Поставщик данных (по умолчанию поставщик по умолчанию).
+        store (OHLCVStore, optional): Хранилище котировок (по умолчанию хранилище по умолчанию).
+        use_cache (bool, optional): Использовать ли локальное хранилище котировок (по умолчанию True).
+
+    Возвращает:
+        bytes: Тело ответа.
+    """
+    data = dd.fetch_stock_data(params['ticker'], period=params['period'], start_date=params['start'],
+                               end_date=params['end'], use_cache=use_cache, provider=provider, store=store,
+                               interval=params['interval'])
+    if data is None or data.empty:
+        raise RequestError(404, f"Нет данных для тикера {params['ticker']}")
+
+    if endpoint == 'indicators':
+        # Кэш индикаторов не изменяет data и пересчитывает только новые бары, если история не изменилась
+        result = indicator_cache.get_default_cache().indicators(
+            data, params['window_size'], params['rsi_period'], params['fast_period'], params['slow_period'],
+            params['signal_period'])
+    elif endpoint == 'statistics':
+        stats = compute_price_statistics(data)
+        if stats is None:
+            raise RequestError(422, f"Нет цен закрытия для расчета статистики по тикеру {params['ticker']}")
+        result = stats.to_dict()
+    else:
+        result = data
+    return _encode(result, params)
+
+
+class IndicatorService:
+    """
+    HTTP-сервис индикаторов с кэшем ответов и объединением одинаковых запросов.
+
+    Точки доступа (метод GET, параметры в строке запроса):
+        /data?ticker=AAPL&period=1mo — котировки (fetch_stock_data);
+        /indicators?ticker=AAPL&period=1y&rsi_period=14 — котировки со столбцами Moving_Average, RSI, MACD, Signal
+            и Histogram (параметры window_size, rsi_period, fast_period, slow_period, signal_period);
+        /statistics?ticker=AAPL&period=1y — статистика цен закрытия (compute_price_statistics);
+        /health — проверка работы сервиса;
+        /metrics — счетчики запросов и кэша.
+    Общие параметры: ticker, period или start и end (ГГГГ-ММ-ДД), interval (по умолчанию 1d) и format: json
+    (по умолчанию) или arrow (поток Arrow IPC, нужен пакет pyarrow).
+
+    Готовые ответы хранятся в LRU-кэше с ограниченным числом записей и временем жизни. Одинаковые запросы,
+    пришедшие, пока ответ еще считается, ждут один общий расчет. Загрузка и расчеты выполняются в пуле
+    потоков, поэтому цикл событий не блокируется.
+
+    Параметры:
+        provider (DataProvider, optional): Поставщик данных, например FakeProvider для тестов
+            (по умолчанию поставщик по умолчанию).
+        store (OHLCVStore, optional): Хранилище котировок (по умолчанию хранилище по умолчанию).
+        use_cache (bool, optional): Использовать ли локальное хранилище котировок (по умолчанию True).
+        cache_entries (int, optional): Наибольшее число ответов в кэше (по умолчанию 256).
+        cache_ttl (float, optional): Время жизни ответа в кэше в секундах (по умолчанию 300).
+        workers (int, optional): Число потоков для загрузки и расчетов (по умолчанию, как у ThreadPoolExecutor,
+            min(32, число ядер + 4): загрузка по сети большую часть времени ждет ответа).
+        executor (Executor, optional): Готовый пул вместо создания своего; например ProcessPoolExecutor,
+            если расчеты упираются в GIL (тогда provider и store передаются процессам копированием).
+        clock (callable, optional): Источник времени для кэша (по умолчанию time.monotonic).
+    """
+
+    def __init__(self, provider=None, store=None, use_cache=True, cache_entries=256, cache_ttl=300.0, workers=None,
+                 executor=None, clock=time.monotonic):
+        self.provider = provider
+        self.store = store
+        self.use_cache = use_cache
+        self.cache = TTLCache(cache_entries, cache_ttl, clock)
+        self.stats = {'requests': 0, 'computations': 0, 'coalesced': 0, 'errors': 0}
+        self._own_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(max_workers=workers, thread_name_prefix='indicator-service')
+        self._inflight = {}  # Ключ → Future расчета, который еще выполняется
+
+    def _start(self, key, endpoint, params):
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, functools.partial(
+            compute, endpoint, params, self.provider, self.store, self.use_cache))
+        self._inflight[key] = future
+        self.stats['computations'] += 1
+
+        def finished(future):
+            del self._inflight[key]
+            if not future.cancelled() and future.exception() is None:
+                self.cache.put(key, future.result())
+
+        future.add_done_callback(finished)
+        return future
+
+    async def get(self, endpoint, query):
+        """
+        Возвращает ответ точки доступа из кэша или рассчитывает его.
+
+        Параметры:
+            endpoint (str): Имя точки доступа ('data', 'indicators' или 'statistics').
+            query (dict): Параметры запроса.
+
+        Возвращает:
+            tuple: (тело ответа, тип содержимого, источник: 'hit', 'miss' или 'coalesced').
+        """
+        self.stats['requests'] += 1
+        key = (endpoint, parse_params(endpoint, query))
+        params = dict(key[1])
+        content_type = CONTENT_TYPES[params['format']]
+        body = self.cache.get(key)
+        if body is not None:
+            return body, content_type, 'hit'
+
+        future = self._inflight.get(key)
+        source = 'coalesced'
+        if future is None:
+            future = self._start(key, endpoint, params)
+            source = 'miss'
+        else:
+            self.stats['coalesced'] += 1
+        # shield: если клиент отключится, расчет продолжится для остальных ожидающих и попадет в кэш
+        return await asyncio.shield(future), content_type, source
+
+    def metrics(self):
+        """
+        Возвращает счетчики запросов, расчетов и кэша.
+        """
+        indicators = indicator_cache.get_default_cache().metrics()
+        return {**self.stats, 'inflight': len(self._inflight), 'cache_entries': len(self.cache),
+                **{f"cache_{name}": value for name, value in self.cache.stats.items()},
+                **{f"indicator_cache_{name}": value for name, value in indicators.items()}}
+
+    async def respond(self, method, target):
+        """
+        Обрабатывает один HTTP-запрос.
+
+        Возвращает:
+            tuple: (код ответа, тело, тип содержимого, дополнительные заголовки).
+        """
+        url = urlsplit(target)
+        endpoint = url.path.strip('/')
+        if method != 'GET':
+            return 405, json.dumps({'error': "Поддерживается только метод GET"}).encode(), 'application/json', {}
+        if endpoint == 'health':
+            return 200, b'{"status": "ok"}', 'application/json', {}
+        if endpoint == 'metrics':
+            return 200, json.dumps(self.metrics()).encode(), 'application/json', {}
+        try:
+            body, content_type, source = await self.get(endpoint, dict(parse_qsl(url.query)))
+            return 200, body, content_type, {'X-Cache': source}
+        except RequestError as e:
+            status, message = e.status, str(e)
+        except ValueError as e:  # Неизвестный период или интервал
+            status, message = 400, str(e)
+        except Exception as e:
+            status, message = 500, f"{type(e).__name__}: {e}"
+        return self._error(status, message)
+
+    def _error(self, status, message):
+        self.stats['errors'] += 1
+        return status, json.dumps({'error': message}, ensure_ascii=False).encode(), 'application/json', {}
+
+    async def handle_connection(self, reader, writer):
+        """
+        Обслуживает соединение HTTP/1.1; соединение остается открытым для следующих запросов (keep-alive).
+        """
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), KEEPALIVE_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, asyncio.LimitOverrunError,
+                        ConnectionError):
+                    break
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, target, version = lines[0].split(' ')
+                except ValueError:
+                    break
+                headers = {name.strip().lower(): value.strip()
+                           for name, _, value in (line.partition(':') for line in lines[1:] if line)}
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                try:
+                    length = int(headers.get('content-length') or 0)
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    # Граница тела неизвестна, поэтому после ответа соединение закрывается
+                    status, body, content_type, extra = self._error(400, "Некорректный заголовок Content-Length")
+                    keep_alive = False
+                else:
+                    if length:
+                        await reader.readexactly(length)  # Тело запроса не используется
+                    status, body, content_type, extra = await self.respond(method, target)
+                response_headers = {'Content-Type': content_type, 'Content-Length': len(body),
+                                    'Connection': 'keep-alive' if keep_alive else 'close', **extra}
+                head = f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n" + ''.join(
+                    f"{name}: {value}\r\n" for name, value in response_headers.items()) + "\r\n"
+                writer.write(head.encode('latin-1') + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # Отмена приходит только при остановке сервера: соединение просто закрывается (в Python 3.11
+            # отмененная задача обработчика приводит к лишней трассировке в asyncio.streams)
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host='127.0.0.1', port=8765):
+        """
+        Запускает сервер и возвращает объект asyncio.Server (порт 0 — выбрать свободный порт).
+        """
+        return await asyncio.start_server(self.handle_connection, host, port, limit=MAX_HEADER_BYTES)
+
+    def close(self):
+        """
+        Останавливает собственный пул потоков сервиса.
+        """
+        if self._own_executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def serve(host='127.0.0.1', port=8765, **options):
+    """
+    Запускает сервис и обслуживает запросы до остановки процесса.
+
+    Параметры:
+        host (str, optional): Адрес (по умолчанию '127.0.0.1' — только локальные подключения).
+        port (int, optional): Порт (по умолчанию 8765).
+        **options: Параметры IndicatorService.
+    """
+    service = IndicatorService(**options)
+    server = await service.start(host, port)
+    address = server.sockets[0].getsockname()
+    print(f"Сервис индикаторов запущен: http://{address[0]}:{address[1]}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main(argv=None):
+    """
+    Запускает сервис из командной строки.
+
+    Примеры запуска:
+        python service.py --port 8765
+        python service.py --provider fake  # синтетические данные без сети
+
+    Возвращает:
+        int: Код завершения 0.
+    """
+    parser = argparse.ArgumentParser(description="Локальный HTTP-сервис индикаторов")
+    parser.add_argument('--host', default='127.0.0.1', help="Адрес (по умолчанию 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8765, help="Порт (по умолчанию 8765)")
+    parser.add_argument('--provider', choices=['yahoo', 'fake'], default='yahoo', help="Поставщик данных")
+    parser.add_argument('--workers', type=int, help="Число потоков для загрузки и расчетов")
+    parser.add_argument('--cache-entries', type=int, default=256, help="Наибольшее число ответов в кэше")
+    parser.add_argument('--cache-ttl', type=float, default=300.0, help="Время жизни ответа в кэше, секунд")
+    args = parser.parse_args(argv)
+
+    provider = None
+    if args.provider == 'fake':
+        from data_providers import FakeProvider
+        provider = FakeProvider()
+    try:
+        asyncio.run(serve(args.host, args.port, provider=provider, workers=args.workers,
+                          cache_entries=args.cache_entries, cache_ttl=args.cache_ttl))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
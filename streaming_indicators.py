@@ -0,0 +1,352 @@
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+NAN = float('nan')
+
+
+def _divide(a, b):
+    """
+    Деление по правилам NumPy: при делении на ноль возвращает ±inf или NaN вместо исключения.
+    """
+    if b == 0:
+        if a == 0 or a != a:
+            return NAN
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+    return a / b
+
+
+def _closes(data):
+    """
+    Возвращает цены закрытия из DataFrame, Series или последовательности чисел.
+    """
+    if isinstance(data, pd.DataFrame):
+        if 'Close' not in data.columns:
+            raise ValueError("В DataFrame отсутствует колонка 'Close'.")
+        data = data['Close']
+    return [float(value) for value in data]
+
+
+def _close_series(data):
+    """
+    Возвращает цены закрытия из DataFrame, Series или последовательности чисел в виде Series float64.
+    """
+    if isinstance(data, pd.DataFrame):
+        if 'Close' not in data.columns:
+            raise ValueError("В DataFrame отсутствует колонка 'Close'.")
+        data = data['Close']
+    return pd.Series(np.asarray(data, dtype=np.float64))
+
+
+class StreamingSMA:
+    """
+    Скользящее среднее, обновляемое по одному бару за O(1).
+
+    Повторяет алгоритм pandas rolling().mean() (сумма с компенсацией Кэхэна, отдельной для добавляемых
+    и удаляемых значений), поэтому значения совпадают с add_moving_average на тех же данных.
+
+    Параметры:
+        window_size (int, optional): Размер окна для расчета скользящего среднего (по умолчанию 5).
+    """
+    __slots__ = ('window_size', 'value', '_window', '_nobs', '_sum', '_compensation_add',
+                 '_compensation_remove', '_neg_ct', '_same_count', '_prev')
+
+    def __init__(self, window_size=5):
+        self.window_size = window_size
+        self.value = NAN
+        self._window = deque(maxlen=window_size)
+        self._nobs = 0
+        self._sum = 0.0
+        self._compensation_add = 0.0
+        self._compensation_remove = 0.0
+        self._neg_ct = 0
+        self._same_count = 0
+        self._prev = NAN
+
+    @classmethod
+    def from_history(cls, data, window_size=5):
+        """
+        Создает калькулятор и прогоняет через него историю цен закрытия.
+
+        Параметры:
+            data: DataFrame со столбцом 'Close', Series или последовательность цен.
+            window_size (int, optional): Размер окна (по умолчанию 5).
+        """
+        calculator = cls(window_size)
+        calculator.update_many(data)
+        return calculator
+
+    def _add(self, value):
+        if value == value:
+            self._nobs += 1
+            y = value - self._compensation_add
+            t = self._sum + y
+            self._compensation_add = t - self._sum - y
+            self._sum = t
+            if math.copysign(1.0, value) < 0:
+                self._neg_ct += 1
+            if value == self._prev:
+                self._same_count += 1
+            else:
+                self._same_count = 1
+            self._prev = value
+
+    def _remove(self, value):
+        if value == value:
+            self._nobs -= 1
+            y = -value - self._compensation_remove
+            t = self._sum + y
+            self._compensation_remove = t - self._sum - y
+            self._sum = t
+            if math.copysign(1.0, value) < 0:
+                self._neg_ct -= 1
+
+    def update(self, close):
+        """
+        Добавляет новый бар и возвращает текущее значение скользящего среднего (NaN, пока окно не заполнено).
+        """
+        close = float(close)
+        if len(self._window) == self.window_size:
+            self._remove(self._window[0])
+        self._window.append(close)
+        self._add(close)
+
+        if self._nobs >= self.window_size and self._nobs > 0:
+            result = self._sum / self._nobs
+            if self._same_count >= self._nobs:
+                result = self._prev
+            elif self._neg_ct == 0 and result < 0:
+                result = 0.0
+            elif self._neg_ct == self._nobs and result > 0:
+                result = 0.0
+        else:
+            result = NAN
+        self.value = result
+        return result
+
+    def update_many(self, data):
+        """
+        Добавляет несколько баров и возвращает список значений для каждого из них.
+        """
+        return [self.update(close) for close in _closes(data)]
+
+
+class StreamingEMA:
+    """
+    Экспоненциальное скользящее среднее (как pandas ewm(span, adjust=False).mean()), обновляемое за O(1).
+
+    Параметры:
+        span (int): Период EMA.
+    """
+    __slots__ = ('span', 'value', '_alpha', '_old_wt')
+
+    def __init__(self, span):
+        self.span = span
+        self.value = NAN
+        com = (span - 1) / 2.0  # pandas переводит span в com и считает alpha так же
+        self._alpha = 1.0 / (1.0 + com)
+        self._old_wt = 1.0
+
+    @classmethod
+    def from_history(cls, data, span):
+        """
+        Создает калькулятор по истории значений одним расчетом pandas ewm, без прогона по одному значению.
+
+        Параметры:
+            data: DataFrame со столбцом 'Close', Series или последовательность значений.
+            span (int): Период EMA.
+        """
+        calculator = cls(span)
+        values = _close_series(data)
+        calculator._restore(values, values.ewm(span=span, adjust=False).mean())
+        return calculator
+
+    def _restore(self, values, ema):
+        """
+        Устанавливает состояние после values по уже рассчитанному pandas ewm(span, adjust=False).mean().
+        """
+        valid = np.flatnonzero(values.notna().to_numpy())
+        if len(valid) == 0:
+            return  # Значений еще не было: состояние начальное
+        self.value = float(ema.iloc[-1])  # На пропусках pandas повторяет последнее значение EMA
+        for _ in range(len(values) - 1 - valid[-1]):
+            self._old_wt *= 1.0 - self._alpha  # Как в update для каждого пропуска после последнего значения
+
+    def update(self, close):
+        """
+        Добавляет новое значение и возвращает текущее значение EMA.
+        """
+        close = float(close)
+        weighted = self.value
+        if weighted == weighted:
+            self._old_wt *= 1.0 - self._alpha
+            if close == close:
+                if weighted != close:
+                    weighted = self._old_wt * weighted + self._alpha * close
+                    weighted /= self._old_wt + self._alpha
+                self._old_wt = 1.0
+        elif close == close:
+            weighted = close
+        self.value = weighted
+        return weighted
+
+    def update_many(self, data):
+        """
+        Добавляет несколько значений и возвращает список значений EMA для каждого из них.
+        """
+        return [self.update(close) for close in _closes(data)]
+
+
+class StreamingRSI:
+    """
+    Индекс относительной силы, обновляемый по одному бару за O(1). Совпадает с add_rsi на тех же данных.
+
+    Параметры:
+        period (int, optional): Период для расчета RSI (по умолчанию 14).
+    """
+    __slots__ = ('period', 'value', '_prev_close', '_average_up', '_average_down')
+
+    def __init__(self, period=14):
+        self.period = period
+        self.value = NAN
+        self._prev_close = NAN
+        self._average_up = StreamingSMA(period)
+        self._average_down = StreamingSMA(period)
+
+    @classmethod
+    def from_history(cls, data, period=14):
+        """
+        Создает калькулятор и прогоняет через него историю цен закрытия.
+        """
+        calculator = cls(period)
+        calculator.update_many(data)
+        return calculator
+
+    def update(self, close):
+        """
+        Добавляет новый бар и возвращает текущее значение RSI.
+        """
+        close = float(close)
+        delta = close - self._prev_close
+        self._prev_close = close
+        # Так же, как delta.clip(lower=0) и -1 * delta.clip(upper=0) в add_rsi (NaN сохраняется)
+        up = delta if delta >= 0 or delta != delta else 0.0
+        down = -1 * (delta if delta <= 0 or delta != delta else 0.0)
+        rs = _divide(self._average_up.update(up), self._average_down.update(down))
+        self.value = 100 - _divide(100, 1 + rs)
+        return self.value
+
+    def update_many(self, data):
+        """
+        Добавляет несколько баров и возвращает список значений RSI для каждого из них.
+        """
+        return [self.update(close) for close in _closes(data)]
+
+
+class StreamingMACD:
+    """
+    MACD, сигнальная линия и гистограмма, обновляемые по одному бару за O(1). Совпадают с add_macd.
+
+    Параметры:
+        fast_period (int, optional): Период для быстрого EMA (по умолчанию 12).
+        slow_period (int, optional): Период для медленного EMA (по умолчанию 26).
+        signal_period (int, optional): Период для сигнальной линии EMA (по умолчанию 9).
+    """
+    __slots__ = ('value', '_fast', '_slow', '_signal')
+
+    def __init__(self, fast_period=12, slow_period=26, signal_period=9):
+        self.value = (NAN, NAN, NAN)
+        self._fast = StreamingEMA(fast_period)
+        self._slow = StreamingEMA(slow_period)
+        self._signal = StreamingEMA(signal_period)
+
+    @classmethod
+    def from_history(cls, data, fast_period=12, slow_period=26, signal_period=9):
+        """
+        Создает калькулятор по истории цен закрытия. Состояние EMA восстанавливается одним расчетом pandas ewm
+        для всей истории, как в add_macd, без прогона по одному бару.
+        """
+        calculator = cls(fast_period, slow_period, signal_period)
+        close = _close_series(data)
+        if close.empty:
+            return calculator
+        fast = close.ewm(span=fast_period, adjust=False).mean()
+        slow = close.ewm(span=slow_period, adjust=False).mean()
+        macd = fast - slow
+        signal = macd.ewm(span=signal_period, adjust=False).mean()
+        calculator._fast._restore(close, fast)
+        calculator._slow._restore(close, slow)
+        calculator._signal._restore(macd, signal)
+        calculator.value = (float(macd.iloc[-1]), float(signal.iloc[-1]), float(macd.iloc[-1] - signal.iloc[-1]))
+        return calculator
+
+    def update(self, close):
+        """
+        Добавляет новый бар и возвращает кортеж (MACD, Signal, Histogram).
+        """
+        macd = self._fast.update(close) - self._slow.update(close)
+        signal = self._signal.update(macd)
+        self.value = (macd, signal, macd - signal)
+        return self.value
+
+    def update_many(self, data):
+        """
+        Добавляет несколько баров и возвращает список кортежей (MACD, Signal, Histogram).
+        """
+        return [self.update(close) for close in _closes(data)]
+
+
+class StreamingIndicators:
+    """
+    Все индикаторы проекта для одного тикера: скользящее среднее, RSI и MACD, обновляемые по одному бару.
+
+    Параметры:
+        window_size (int, optional): Размер окна скользящего среднего (по умолчанию 5).
+        rsi_period (int, optional): Период для расчета RSI (по умолчанию 14).
+        fast_period (int, optional): Период для быстрого EMA (по умолчанию 12).
+        slow_period (int, optional): Период для медленного EMA (по умолчанию 26).
+        signal_period (int, optional): Период для сигнальной линии EMA (по умолчанию 9).
+    """
+    __slots__ = ('_sma', '_rsi', '_macd')
+
+    def __init__(self, window_size=5, rsi_period=14, fast_period=12, slow_period=26, signal_period=9):
+        self._sma = StreamingSMA(window_size)
+        self._rsi = StreamingRSI(rsi_period)
+        self._macd = StreamingMACD(fast_period, slow_period, signal_period)
+
+    @classmethod
+    def from_history(cls, data, **params):
+        """
+        Создает калькулятор и прогоняет через него историю цен закрытия.
+
+        Параметры:
+            data: DataFrame со столбцом 'Close', Series или последовательность цен.
+            **params: Параметры индикаторов, как в конструкторе.
+        """
+        calculator = cls(**params)
+        for close in _closes(data):
+            calculator.update(close)
+        return calculator
+
+    def update(self, close):
+        """
+        Добавляет новый бар и возвращает словарь со значениями индикаторов
+        ('Moving_Average', 'RSI', 'MACD', 'Signal', 'Histogram').
+        """
+        macd, signal, histogram = self._macd.update(close)
+        return {
+            'Moving_Average': self._sma.update(close),
+            'RSI': self._rsi.update(close),
+            'MACD': macd,
+            'Signal': signal,
+            'Histogram': histogram,
+        }
+
+    def update_many(self, data):
+        """
+        Добавляет несколько баров и возвращает DataFrame со значениями индикаторов для каждого из них.
+        """
+        index = data.index if isinstance(data, (pd.DataFrame, pd.Series)) else None
+        return pd.DataFrame([self.update(close) for close in _closes(data)], index=index)
@@ -0,0 +1,82 @@
+from unittest import mock
+
+import pandas as pd
+import pytest
+
+from data_cache import OHLCVStore
+from data_providers import FakeProvider
+
+
+def at(moment):
+    return mock.patch('pandas.Timestamp.now', return_value=pd.Timestamp(moment))
+
+
+def test_incremental_update_fetches_only_new_bars(tmp_path):
+    provider = FakeProvider(base_date='2019-01-02', today='2020-03-02')
+    store = OHLCVStore(tmp_path)
+    with at('2020-03-02 12:00'):
+        first = store.get('AAA', provider, start='2020-01-01', end='2020-02-01')
+        second = store.get('AAA', provider, start='2020-01-01', end='2020-03-01')
+
+    assert provider.calls == [('AAA', pd.Timestamp('2020-01-01'), pd.Timestamp('2020-02-01')),
+                              ('AAA', pd.Timestamp('2020-02-01'), pd.Timestamp('2020-03-01'))]
+    assert store.stats['misses'] == 1 and store.stats['partial_hits'] == 1
+    expected = FakeProvider(base_date='2019-01-02', today='2020-03-02').history('AAA', start='2020-01-01',
+                                                                                end='2020-03-01')
+    pd.testing.assert_frame_equal(second, expected)
+    pd.testing.assert_frame_equal(first, expected[expected.index.tz_localize(None) < '2020-02-01'])
+
+
+def test_cached_range_is_not_refetched(tmp_path):
+    provider = FakeProvider(base_date='2019-01-02', today='2020-03-02')
+    with at('2020-03-02 12:00'):
+        first = OHLCVStore(tmp_path).get('AAA', provider, start='2020-01-01', end='2020-02-01')
+        store = OHLCVStore(tmp_path)  # Новый процесс читает данные с диска
+        again = store.get('AAA', provider, start='2020-01-10', end='2020-01-20')
+
+    assert len(provider.calls) == 1
+    assert store.stats['hits'] == 1
+    pd.testing.assert_frame_equal(again, first['2020-01-10':'2020-01-19'])
+
+
+def test_failed_fetch_is_not_cached(tmp_path):
+    provider = FakeProvider(base_date='2019-01-02', today='2020-03-02', failures={'AAA': 1})
+    store = OHLCVStore(tmp_path)
+    with at('2020-03-02 12:00'):
+        with pytest.raises(ConnectionError):
+            store.get('AAA', provider, start='2020-01-01', end='2020-02-01')
+        assert store.load('AAA') == (None, None)
+        data = store.get('AAA', provider, start='2020-01-01', end='2020-02-01')
+
+    assert not data.empty
+    assert store.stats['misses'] == 2
+
+
+def test_empty_leading_range_is_remembered_across_processes(tmp_path):
+    # До начала торгов поставщик возвращает пустой ответ: повторно его не запрашиваем
+    provider = FakeProvider(base_date='2020-01-02', today='2020-03-02')
+    with at('2020-03-02 12:00'):
+        OHLCVStore(tmp_path).get('AAA', provider, start='2020-01-02', end='2020-02-01')
+        OHLCVStore(tmp_path).get('AAA', provider, start='2019-06-01', end='2020-02-01')
+        data = OHLCVStore(tmp_path).get('AAA', provider, start='2019-09-01', end='2020-02-01')
+    assert len(provider.calls) == 2
+    assert data.index[0].tz_localize(None) == pd.Timestamp('2020-01-02')
+
+    with at('2020-03-10 12:00'):  # Отметка устарела: диапазон запрашивается снова
+        OHLCVStore(tmp_path).get('AAA', provider, start='2019-09-01', end='2020-02-01')
+    assert len(provider.calls) == 3
+
+
+def test_empty_trailing_range_is_remembered_across_processes(tmp_path):
+    # Поставщик не отдает бары после 2020-02-28, как после праздника
+    provider = FakeProvider(base_date='2019-01-02', today='2020-02-28')
+    with at('2020-03-04 12:00'):
+        OHLCVStore(tmp_path).get('AAA', provider, start='2020-02-01', end='2020-03-04')
+        OHLCVStore(tmp_path).get('AAA', provider, start='2020-02-01', end='2020-03-04')
+        data = OHLCVStore(tmp_path).get('AAA', provider, start='2020-02-01', end='2020-03-04')
+    assert len(provider.calls) == 2
+    assert data.index[-1].tz_localize(None) == pd.Timestamp('2020-02-28')
+
+    with at('2020-03-04 12:00'):  # Более широкий диапазон отметкой не покрыт
+        OHLCVStore(tmp_path).get('AAA', provider, start='2020-02-01', end='2020-03-05')
+    assert len(provider.calls) == 3
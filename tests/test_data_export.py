@@ -0,0 +1,30 @@
+import pandas as pd
+import pytest
+
+import data_export
+from data_providers import FakeProvider
+
+
+@pytest.fixture
+def data():
+    return FakeProvider(today='2021-06-01').history('AAA', start='2020-01-01', end='2021-01-01')
+
+
+@pytest.mark.parametrize('filename', ['data.csv', 'data.parquet', 'data.feather'])
+def test_round_trip_keeps_exchange_timezone(tmp_path, data, filename):
+    path = str(tmp_path / filename)
+    assert data_export.export_data(data.iloc[:100], path) == 100
+    assert data_export.export_data(data, path, append=True) == len(data) - 100
+
+    loaded = data_export.load_exported_data(path)
+    pd.testing.assert_frame_equal(loaded, data, check_freq=False)
+    chunks = pd.concat(data_export.iter_exported_data(path, chunk_rows=50))
+    pd.testing.assert_frame_equal(chunks, data, check_freq=False)
+
+
+def test_csv_without_timezone_file_is_read_in_utc(tmp_path, data):
+    path = str(tmp_path / 'data.csv')
+    data.to_csv(path)  # Как export_data_to_csv
+    loaded = data_export.load_exported_data(path)
+    assert str(loaded.index.tz) == 'UTC'
+    pd.testing.assert_index_equal(loaded.index, data.index.tz_convert('UTC'))
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_download as dd
+import streaming_indicators as si
+from indicator_cache import REPLAY_MAX_BARS, IndicatorCache
+
+
+def with_indicators(data):
+    return dd.add_macd(dd.add_rsi(dd.add_moving_average(data.copy())))
+
+
+@pytest.fixture
+def data():
+    close = 100 + np.random.default_rng(0).normal(0, 1, REPLAY_MAX_BARS * 4).cumsum()
+    close[::97] = np.nan
+    return pd.DataFrame({'Close': close}, index=pd.date_range('2020-01-01', periods=len(close), freq='min'))
+
+
+@pytest.mark.parametrize('cache_dir', [False, True])
+def test_stream_of_new_bars_matches_full_recompute(tmp_path, data, cache_dir):
+    history = len(data) - 20
+    cache = IndicatorCache(cache_dir=str(tmp_path) if cache_dir else None)
+    cache.indicators(data.iloc[:history])
+    for length in range(history + 1, len(data) + 1):
+        if cache_dir:
+            cache = IndicatorCache(cache_dir=str(tmp_path))  # Каждое продление в новом процессе
+        pd.testing.assert_frame_equal(cache.indicators(data.iloc[:length]), with_indicators(data.iloc[:length]),
+                                      check_exact=True)
+
+
+def test_long_history_is_recomputed_on_first_extension(data):
+    cache = IndicatorCache()
+    cache.indicators(data.iloc[:-2])
+    cache.indicators(data.iloc[:-1])
+    metrics = cache.metrics()
+    # Скользящее среднее и RSI пересчитываются целиком, MACD восстанавливает состояние векторизованно
+    assert metrics['misses'] == 3 + 2 and metrics['extensions'] == 1
+    cache.indicators(data)
+    assert cache.metrics()['extensions'] == 1 + 3
+    assert cache.metrics()['entries'] == 3
+
+
+def test_macd_state_from_history_matches_replay(data):
+    close = data['Close'].to_numpy().copy()
+    close[-13:-10] = np.nan  # Пропуски в конце истории меняют вес предыдущего значения EMA
+    restored = si.StreamingMACD.from_history(close[:-10])
+    replayed = si.StreamingMACD()
+    replayed.update_many(close[:-10])
+    assert np.array_equal(restored.update_many(close[-10:]), replayed.update_many(close[-10:]), equal_nan=True)
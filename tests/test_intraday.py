@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_providers import FakeProvider
+from intraday import OHLCVResampler, resample_ohlcv, resample_stream
+
+
+@pytest.fixture
+def bars():
+    return FakeProvider(today='2024-03-08').history('AAA', start='2024-03-04', end='2024-03-09', interval='1m')
+
+
+def chunked(data, size):
+    return [data.iloc[start:start + size] for start in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize('rule, offset', [('5min', None), ('1h', '30min'), ('1D', None)])
+@pytest.mark.parametrize('size', [7, 100, 10_000])
+def test_chunked_resampling_matches_single_pass(bars, rule, offset, size):
+    expected = resample_ohlcv(bars, rule, offset)
+    result = pd.concat(resample_stream(chunked(bars, size), rule, offset))
+    pd.testing.assert_frame_equal(result, expected, check_freq=False)
+
+
+def test_chunk_without_close_prices(bars):
+    # Порция, в которой нет ни одной цены закрытия, не должна ломать поток
+    bars = bars.copy()
+    bars.iloc[100:150, bars.columns.get_loc('Close')] = np.nan
+    expected = resample_ohlcv(bars, '1h', '30min')
+    result = pd.concat(resample_stream([bars.iloc[:100], bars.iloc[100:150], bars.iloc[150:]], '1h', '30min'))
+    pd.testing.assert_frame_equal(result, expected, check_freq=False)
+
+    resampler = OHLCVResampler('5min')
+    assert resampler.update(bars.iloc[100:150]).empty
+    assert resampler.flush().empty
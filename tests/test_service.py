@@ -0,0 +1,142 @@
+import asyncio
+import json
+
+import pandas as pd
+import pytest
+
+from data_providers import FakeProvider
+from service import IndicatorService, TTLCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+async def request(port, raw):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(raw)
+    await writer.drain()
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    headers = {name.lower(): value.strip() for name, _, value in (line.partition(':') for line in lines[1:] if line)}
+    body = await reader.readexactly(int(headers['content-length']))
+    writer.close()
+    return int(lines[0].split(' ')[1]), headers, body
+
+
+def test_identical_requests_are_coalesced():
+    async def scenario():
+        service = IndicatorService(provider=FakeProvider(latency=0.2), use_cache=False)
+        try:
+            return await asyncio.gather(*(service.respond('GET', '/indicators?ticker=AAPL&period=1y')
+                                          for _ in range(10))), service.stats
+        finally:
+            service.close()
+
+    responses, stats = run(scenario())
+    assert {status for status, _, _, _ in responses} == {200}
+    assert len({body for _, body, _, _ in responses}) == 1
+    assert sorted(extra['X-Cache'] for _, _, _, extra in responses) == ['coalesced'] * 9 + ['miss']
+    assert stats['computations'] == 1 and stats['coalesced'] == 9
+
+
+def test_cached_response_expires():
+    clock = Clock()
+
+    async def scenario():
+        service = IndicatorService(provider=FakeProvider(), use_cache=False, cache_ttl=60, clock=clock)
+        try:
+            sources = []
+            for now in (0, 30, 61):
+                clock.now = now
+                _, _, _, extra = await service.respond('GET', '/statistics?ticker=AAPL')
+                sources.append(extra['X-Cache'])
+            return sources, service.stats
+        finally:
+            service.close()
+
+    sources, stats = run(scenario())
+    assert sources == ['miss', 'hit', 'miss']
+    assert stats['computations'] == 2
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    clock = Clock()
+    cache = TTLCache(max_entries=2, ttl=10, clock=clock)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1  # 'b' становится давно не использованной записью
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    assert cache.stats['evictions'] == 1
+
+    clock.now = 10
+    assert cache.get('a') is None
+    assert cache.stats['expired'] == 1
+
+
+@pytest.mark.parametrize('target', ['/data?ticker=AAPL&period=2weeks', '/indicators?ticker=AAPL&rsi_period=abc',
+                                    '/indicators?ticker=AAPL&rsi_period=0', '/data?period=1y'])
+def test_bad_parameters_return_400(target):
+    async def scenario():
+        service = IndicatorService(provider=FakeProvider(), use_cache=False)
+        try:
+            return await service.respond('GET', target)
+        finally:
+            service.close()
+
+    status, body, content_type, _ = run(scenario())
+    assert status == 400
+    assert content_type == 'application/json'
+    assert json.loads(body)['error']
+
+
+@pytest.mark.parametrize('length', ['abc', '-1'])
+def test_invalid_content_length_returns_400(length):
+    async def scenario():
+        service = IndicatorService(provider=FakeProvider(), use_cache=False)
+        server = await service.start(port=0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            return await request(port, f"GET /health HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode())
+        finally:
+            server.close()
+            await server.wait_closed()
+            service.close()
+
+    status, headers, body = run(scenario())
+    assert status == 400
+    assert headers['connection'] == 'close'
+    assert 'Content-Length' in json.loads(body)['error']
+
+
+def test_arrow_format_matches_json():
+    pa = pytest.importorskip('pyarrow')
+
+    async def scenario():
+        service = IndicatorService(provider=FakeProvider(), use_cache=False)
+        try:
+            arrow = await service.respond('GET', '/indicators?ticker=AAPL&period=1y&format=arrow')
+            plain = await service.respond('GET', '/indicators?ticker=AAPL&period=1y')
+            return arrow, plain
+        finally:
+            service.close()
+
+    (status, body, content_type, _), (_, json_body, _, _) = run(scenario())
+    assert status == 200
+    assert content_type == 'application/vnd.apache.arrow.stream'
+    frame = pa.ipc.open_stream(body).read_all().to_pandas()
+    expected = json.loads(json_body)
+    assert len(frame) == expected['rows']
+    # JSON хранит числа с 10 значащими цифрами, Arrow — без потерь
+    expected = pd.DataFrame(expected['data']['data'], columns=expected['data']['columns'], dtype=float)
+    pd.testing.assert_frame_equal(frame.reset_index(drop=True).astype(float), expected, rtol=1e-8)
@@ -0,0 +1,335 @@
+import atexit
+import cProfile
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+TRACE_FORMATS = ('jsonl', 'chrome')
+
+_enabled = False
+_records = []
+_lock = threading.Lock()
+_local = threading.local()
+_options = {'path': None, 'fmt': 'jsonl', 'memory': False, 'profile': None}
+_profiler = None
+_stop_tracemalloc = False
+_atexit_registered = False
+
+
+def _infer_trace_format(path):
+    return 'chrome' if path and path.endswith('.json') else 'jsonl'
+
+
+def enable_tracing(path=None, fmt=None, memory=False, profile=None):
+    """
+    Включает трассировку этапов: загрузка → индикаторы → статистика → экспорт → графики.
+
+    Для каждого этапа записываются время выполнения, процессорное время, число обработанных строк и, если
+    включено, пиковая память. Формат Chrome trace открывается в chrome://tracing или https://ui.perfetto.dev.
+    Вместо вызова можно задать переменную окружения STOCKS_TRACE с путем к файлу трассировки;
+    STOCKS_TRACE_MEMORY=1 включает учет памяти, STOCKS_PROFILE с путем к файлу — запись профиля cProfile.
+
+    Параметры:
+        path (str, optional): Файл трассировки. Для JSON Lines записи дописываются по мере выполнения этапов,
+            для Chrome trace файл записывается при выключении трассировки (по умолчанию записи только
+            накапливаются в памяти).
+        fmt (str, optional): 'jsonl' или 'chrome' (по умолчанию определяется по расширению: .json — Chrome trace).
+        memory (bool, optional): Учитывать пиковую память этапов через tracemalloc (по умолчанию False). Учет
+            памяти заметно замедляет выполнение.
+        profile (str, optional): Файл для профиля cProfile всего трассируемого участка; открывается модулем
+            pstats или, например, snakeviz (по умолчанию профиль не записывается).
+    """
+    global _enabled, _profiler, _stop_tracemalloc, _atexit_registered
+    fmt = fmt or _infer_trace_format(path)
+    if fmt not in TRACE_FORMATS:
+        raise ValueError(f"Неизвестный формат трассировки '{fmt}'. Доступные форматы: {', '.join(TRACE_FORMATS)}.")
+    if _enabled:
+        disable_tracing()
+
+    _options.update(path=path, fmt=fmt, memory=memory, profile=profile)
+    if path and fmt == 'jsonl':
+        open(path, 'w').close()  # Каждый запуск начинает файл заново
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _stop_tracemalloc = True
+    if profile:
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+    if not _atexit_registered:
+        atexit.register(disable_tracing)
+        _atexit_registered = True
+    _enabled = True
+
+
+def disable_tracing():
+    """
+    Выключает трассировку, записывает файл Chrome trace и профиль cProfile, если они были запрошены.
+    Накопленные записи остаются доступны через get_trace_records до следующего enable_tracing или clear_trace.
+    """
+    global _enabled, _profiler, _stop_tracemalloc
+    if not _enabled:
+        return
+    _enabled = False
+    if _profiler is not None:
+        _profiler.disable()
+        _profiler.dump_stats(_options['profile'])
+        _profiler = None
+    if _stop_tracemalloc:
+        tracemalloc.stop()
+        _stop_tracemalloc = False
+    if _options['path'] and _options['fmt'] == 'chrome':
+        write_trace(_records, _options['path'], 'chrome')
+
+
+def is_tracing():
+    """
+    Возвращает True, если трассировка включена.
+    """
+    return _enabled
+
+
+def clear_trace():
+    """
+    Удаляет накопленные записи трассировки.
+    """
+    with _lock:
+        _records.clear()
+
+
+def get_trace_records():
+    """
+    Возвращает копию накопленных записей трассировки (список словарей).
+    """
+    with _lock:
+        return list(_records)
+
+
+def add_trace_records(records):
+    """
+    Добавляет записи, полученные в другом процессе (например, в процессе пула), к записям этого процесса.
+    """
+    with _lock:
+        _records.extend(records)
+        if _options['path'] and _options['fmt'] == 'jsonl':
+            _append_jsonl(records, _options['path'])
+
+
+def _append_jsonl(records, path):
+    with open(path, 'a', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+
+
+def write_trace(records, path, fmt=None):
+    """
+    Записывает записи трассировки в файл.
+
+    Параметры:
+        records (list): Записи трассировки (см. get_trace_records).
+        path (str): Имя файла.
+        fmt (str, optional): 'jsonl' или 'chrome' (по умолчанию определяется по расширению).
+    """
+    fmt = fmt or _infer_trace_format(path)
+    if fmt == 'jsonl':
+        open(path, 'w').close()
+        _append_jsonl(records, path)
+        return
+    events = [{
+        'name': record['name'],
+        'cat': 'stage',
+        'ph': 'X',  # Событие с длительностью
+        'ts': record['start_us'],
+        'dur': record['wall'] * 1e6,
+        'pid': record['pid'],
+        'tid': record['tid'],
+        'args': {key: record[key] for key in ('cpu', 'rows', 'peak_memory_mb', 'error') if record.get(key) is not None},
+    } for record in records]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False, default=str)
+
+
+class _Span:
+    """
+    Открытый этап трассировки. Число строк можно задать внутри блока with через атрибут rows.
+    """
+    __slots__ = ('name', 'rows', 'error', '_start', '_cpu', '_memory', '_peak')
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+        self.error = None
+        self._peak = 0
+
+    def __enter__(self):
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        if _options['memory'] and tracemalloc.is_tracing():
+            # Сброс пика глобальный, поэтому пик, накопленный до этого момента, сохраняем во внешнем этапе
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1]._peak = max(stack[-1]._peak, peak)
+            tracemalloc.reset_peak()
+            self._memory = current
+            self._peak = current
+        else:
+            self._memory = None
+        stack.append(self)
+        self._start = time.perf_counter()
+        self._cpu = time.thread_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self._start
+        cpu = time.thread_time() - self._cpu
+        stack = _local.stack
+        stack.pop()
+        peak_memory_mb = None
+        if self._memory is not None and tracemalloc.is_tracing():
+            peak = max(self._peak, tracemalloc.get_traced_memory()[1])
+            peak_memory_mb = (peak - self._memory) / 2 ** 20
+            if stack:
+                stack[-1]._peak = max(stack[-1]._peak, peak)
+        if exc is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+
+        record = {
+            'name': self.name,
+            'start_us': (time.time() - wall) * 1e6,
+            'wall': wall,
+            'cpu': cpu,
+            'rows': self.rows,
+            'peak_memory_mb': peak_memory_mb,
+            'depth': len(stack),
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'error': self.error,
+        }
+        with _lock:
+            _records.append(record)
+            if _options['path'] and _options['fmt'] == 'jsonl':
+                _append_jsonl([record], _options['path'])
+        return False
+
+
+class _NullSpan:
+    """
+    Этап, который ничего не записывает: возвращается trace_stage, пока трассировка выключена.
+    """
+    __slots__ = ('rows', 'error')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def trace_stage(name, rows=None):
+    """
+    Контекстный менеджер для трассировки участка кода.
+
+    Пример:
+        with trace_stage('savefig') as stage:
+            fig.savefig(filename)
+
+    Параметры:
+        name (str): Имя этапа.
+        rows (int, optional): Число обработанных строк; можно задать и позже через stage.rows.
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, rows)
+
+
+def _count_rows(value):
+    pd = sys.modules.get('pandas')  # Если pandas еще не импортирован, значение не может быть DataFrame
+    if pd is not None and isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    return None
+
+
+def traced(name=None):
+    """
+    Декоратор для трассировки функции. Число строк берется из результата, если это DataFrame или Series,
+    иначе из первого аргумента. Пока трассировка выключена, обертка проверяет один флаг и сразу вызывает функцию.
+
+    Параметры:
+        name (str, optional): Имя этапа (по умолчанию модуль.функция).
+    """
+    def decorator(function):
+        stage_name = name or f"{function.__module__}.{function.__qualname__}"
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            with _Span(stage_name) as span:
+                result = function(*args, **kwargs)
+                span.rows = _count_rows(result)
+                if span.rows is None and args:
+                    span.rows = _count_rows(args[0])
+                return result
+
+        return wrapper
+
+    return decorator
+
+
+def trace_summary(records=None):
+    """
+    Сводная таблица по этапам: число вызовов, суммарное и среднее время, процессорное время, строки и пиковая память.
+
+    Параметры:
+        records (list, optional): Записи трассировки (по умолчанию накопленные в этом процессе).
+
+    Возвращает:
+        data: DataFrame, строки которого — этапы, упорядоченные по суммарному времени.
+    """
+    import pandas as pd
+
+    records = get_trace_records() if records is None else records
+    columns = ['calls', 'wall_total', 'wall_mean', 'cpu_total', 'rows', 'peak_memory_mb']
+    if not records:
+        return pd.DataFrame(columns=columns)
+    frame = pd.DataFrame(records)
+    for column in ('rows', 'peak_memory_mb'):
+        frame[column] = pd.to_numeric(frame[column])
+    summary = frame.groupby('name').agg(
+        calls=('wall', 'size'),
+        wall_total=('wall', 'sum'),
+        wall_mean=('wall', 'mean'),
+        cpu_total=('cpu', 'sum'),
+        rows=('rows', lambda rows: rows.sum(min_count=1)),
+        peak_memory_mb=('peak_memory_mb', 'max'),
+    )
+    summary['rows'] = summary['rows'].astype('Int64')
+    return summary.sort_values('wall_total', ascending=False)[columns]
+
+
+def print_trace_summary(records=None):
+    """
+    Выводит сводную таблицу по этапам (см. trace_summary).
+    """
+    summary = trace_summary(records)
+    if summary.empty:
+        print("Записей трассировки нет.")
+        return
+    print(summary.to_string(float_format=lambda value: f"{value:.4f}"))
+
+
+def _enable_from_environment():
+    path = os.environ.get('STOCKS_TRACE')
+    profile = os.environ.get('STOCKS_PROFILE')
+    if path or profile:
+        enable_tracing(path, memory=os.environ.get('STOCKS_TRACE_MEMORY') == '1', profile=profile)
+
+
+_enable_from_environment()